@@ -9,7 +9,8 @@ from .models import (
     Session,
     Sequence,
     BreakOut,
-    UserGoogleAuth
+    UserGoogleAuth,
+    ImportJob
 )
 
 @admin.register(Conversation)
@@ -66,4 +67,11 @@ class UserGoogleAuthAdmin(ModelAdmin):
     list_display = ('user', 'drive_enabled', 'token_expiry')
     list_filter = ('drive_enabled',)
     search_fields = ('user__username', 'user__email')
-    ordering = ('user',)
\ No newline at end of file
+    ordering = ('user',)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(ModelAdmin):
+    list_display = ('uuid', 'status', 'processed', 'total', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('errors', 'result')
+    ordering = ('-created_at',)
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class AiMiddlewareConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'ai_middleware'
\ No newline at end of file
+    name = 'ai_middleware'
+
+    def ready(self):
+        # Connecte les signaux d'invalidation des caches et de mise à jour de l'index de recherche
+        from . import signals
+        post_migrate.connect(signals.install_search_index, sender=self)
@@ -0,0 +1,26 @@
+from rest_framework.filters import BaseFilterBackend
+from .services import search
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Paramètre `q` des listes : recherche plein texte dans les entités de la hiérarchie.
+    Les résultats sont triés par pertinence, y compris d'une page à l'autre.
+    Sans effet sur les modèles qui ne sont pas indexés.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query or queryset.model not in search.SEARCH_FIELDS:
+            return queryset
+        return search.filter_queryset(queryset, query)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Recherche plein texte, résultats triés par pertinence',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,239 @@
+import json
+import re
+import time
+import tracemalloc
+import uuid
+from argparse import BooleanOptionalAction
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from ...models import Client
+from ...services.markdown_format import tokenize_line
+from ...services.markdown_import import import_markdown, parse_markdown
+from ...services.markdown_service import to_markdown
+
+SCENARIOS = ['parse', 'tokenizer', 'import', 'reimport', 'dry-run', 'export', 'round-trip']
+
+# Analyse par expressions régulières remplacée par tokenize_line, conservée pour le scénario tokenizer
+LEGACY_HEADER_RE = re.compile(r'^(#+)\s+\[@(\w+)::(\S+?)\]\s*(.+)?$')
+LEGACY_FIELD_RE = re.compile(r'\*\*(\w+)\*\*:\s*([^*]+?)(?=\s+\*\*|$)')
+
+
+class Rollback(Exception):
+    pass
+
+
+def generate_tree_lines(clients=1, programmes=1, sessions=1, sequences=4, breakouts=2):
+    """
+    Génère ligne par ligne un arbre clients > programmes > sessions > séquences > breakouts,
+    avec des UUID explicites. Le nombre d'enfants est donné pour chaque parent.
+    """
+    for c in range(clients):
+        yield (
+            f"# [@Client::{uuid.uuid4()}] **name**: Benchmark Client **context**: Contexte "
+            f"**objectives**: Objectifs"
+        )
+        for p in range(programmes):
+            yield (
+                f"## [@Programme::{uuid.uuid4()}] **name**: Benchmark Programme "
+                f"**description**: Description"
+            )
+            for s in range(sessions):
+                yield (
+                    f"### [@Session::{uuid.uuid4()}] **title**: Session {s} **context**: Contexte "
+                    f"**objectives**: Objectifs **inputs**: Inputs **outputs**: Outputs "
+                    f"**participants**: Participants **design_principles**: Principes "
+                    f"**deliverables**: Livrables"
+                )
+                for q in range(sequences):
+                    yield (
+                        f"#### [@Sequence::{uuid.uuid4()}] **title**: Sequence {q} **objective**: Objectif "
+                        f"**input_text**: Inputs **output_text**: Outputs **order**: {q + 1}"
+                    )
+                    for b in range(breakouts):
+                        yield (
+                            f"##### [@BreakOut::{uuid.uuid4()}] **title**: Breakout {b} "
+                            f"**description**: Description **objective**: Objectif"
+                        )
+
+
+def legacy_tokenize_line(line):
+    """Ancienne analyse d'une ligne, au même format de résultat que tokenize_line"""
+    match = LEGACY_HEADER_RE.match(line.strip())
+    if not match:
+        return None
+    hashes, model_name, obj_uuid, fields_text = match.groups()
+    fields = [(name, value.strip()) for name, value in LEGACY_FIELD_RE.findall(fields_text or '')]
+    return len(hashes), model_name, obj_uuid, fields
+
+
+def lengthen_values(lines, length):
+    """Allonge la première valeur de chaque ligne jusqu'à `length` caractères, en mots séparés"""
+    padding = ('lorem ipsum ' * (length // 12 + 1))[:length].strip()
+    return [line.replace('**: ', f'**: {padding} ', 1) for line in lines]
+
+
+def generate_programme_markdown(sessions, sequences=4, breakouts=2):
+    """Génère un document client > programme > sessions > séquences > breakouts"""
+    return '\n'.join(generate_tree_lines(sessions=sessions, sequences=sequences, breakouts=breakouts))
+
+
+class QueryCounter:
+    """Compte les requêtes sans conserver leur SQL, qui fausserait la mesure mémoire"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ("Mesure la durée, le nombre de requêtes, la mémoire et le débit des imports et "
+            "exports Markdown sur des arbres générés, et les compare à une référence")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1)
+        parser.add_argument('--programmes', type=int, default=1, help='Programmes par client')
+        parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 100, 500],
+                            help='Sessions par programme ; une série de mesures par valeur')
+        parser.add_argument('--sequences', type=int, default=4, help='Séquences par session')
+        parser.add_argument('--breakouts', type=int, default=2, help='Breakouts par séquence')
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--value-length', type=int, default=2000,
+                            help='Longueur des valeurs comparées par le scénario tokenizer')
+        parser.add_argument('--memory', action=BooleanOptionalAction, default=True,
+                            help='Mesurer le pic mémoire avec tracemalloc (ralentit les mesures)')
+        parser.add_argument('--save-baseline', metavar='FICHIER',
+                            help='Enregistre les résultats comme référence JSON')
+        parser.add_argument('--baseline', metavar='FICHIER',
+                            help='Compare les résultats à une référence JSON')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Écart relatif toléré sur la durée et la mémoire avant régression')
+
+    def handle(self, *args, **options):
+        self.options = options
+        baseline = self.load_baseline(options['baseline'])
+        results = {}
+
+        self.stdout.write(f"Base de données : {connection.vendor}")
+        self.stdout.write(
+            f"{'scenario':>10} {'lines':>8} {'seconds':>8} {'queries':>8} {'peak MB':>8} {'lines/s':>10}"
+        )
+        for sessions in options['sessions']:
+            markdown = '\n'.join(generate_tree_lines(
+                options['clients'], options['programmes'], sessions,
+                options['sequences'], options['breakouts']
+            ))
+            try:
+                # Les données générées ne sont jamais conservées
+                with transaction.atomic():
+                    for scenario, measure in self.run_scenarios(markdown):
+                        key = f"{connection.vendor}:{scenario}:{measure['lines']}"
+                        results[key] = measure
+                        self.report(scenario, measure, baseline.get(key))
+                    raise Rollback()
+            except Rollback:
+                pass
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Référence enregistrée dans {options['save_baseline']}")
+        if self.regressions:
+            raise CommandError(f"{self.regressions} régression(s) par rapport à {options['baseline']}")
+
+    def load_baseline(self, path):
+        self.regressions = 0
+        if not path:
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def run_scenarios(self, markdown):
+        """Exécute les scénarios demandés dans l'ordre, sur le même arbre"""
+        scenarios = self.options['scenarios']
+        batch_size = self.options['batch_size']
+        lines = markdown.count('\n') + 1
+
+        if 'parse' in scenarios:
+            # Analyse seule, sans accès à la base
+            yield 'parse', self.measure(lambda: list(parse_markdown(markdown.split('\n'))), lines)[0]
+        if 'tokenizer' in scenarios:
+            # Ancienne et nouvelle analyse des champs, sur les mêmes lignes aux valeurs longues
+            long_lines = lengthen_values(markdown.split('\n'), self.options['value_length'])
+            yield 'tokenizer', self.measure(lambda: [tokenize_line(line) for line in long_lines], lines)[0]
+            yield 'regex', self.measure(lambda: [legacy_tokenize_line(line) for line in long_lines], lines)[0]
+
+        # L'import initial est nécessaire aux autres scénarios, même s'il n'est pas mesuré
+        measure, result = self.measure(lambda: import_markdown(markdown, batch_size=batch_size), lines)
+        if 'import' in scenarios:
+            yield 'import', measure
+        clients = [obj for obj in result.created if isinstance(obj, Client)]
+
+        if 'reimport' in scenarios:
+            yield 'reimport', self.measure(
+                lambda: import_markdown(markdown, batch_size=batch_size), lines
+            )[0]
+        if 'dry-run' in scenarios:
+            yield 'dry-run', self.measure(
+                lambda: import_markdown(markdown, batch_size=batch_size, dry_run=True), lines
+            )[0]
+        if 'export' in scenarios:
+            cache.clear()
+            yield 'export', self.measure(lambda: [to_markdown(client) for client in clients], lines)[0]
+        if 'round-trip' in scenarios:
+            def round_trip():
+                cache.clear()
+                exported = ''.join(to_markdown(client) for client in clients)
+                return import_markdown(exported, batch_size=batch_size)
+            yield 'round-trip', self.measure(round_trip, lines)[0]
+
+    def measure(self, function, lines):
+        counter = QueryCounter()
+        if self.options['memory']:
+            tracemalloc.start()
+        try:
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                value = function()
+                elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.options['memory'] else None
+        finally:
+            if self.options['memory']:
+                tracemalloc.stop()
+        return {
+            'lines': lines,
+            'seconds': round(elapsed, 4),
+            'queries': counter.count,
+            'peak_mb': round(peak / 2 ** 20, 2) if peak is not None else None,
+            'lines_per_second': round(lines / elapsed) if elapsed else None,
+        }, value
+
+    def report(self, scenario, measure, reference):
+        peak = f"{measure['peak_mb']:.1f}" if measure['peak_mb'] is not None else '-'
+        line = (
+            f"{scenario:>10} {measure['lines']:>8} {measure['seconds']:>8.3f} "
+            f"{measure['queries']:>8} {peak:>8} {measure['lines_per_second'] or 0:>10}"
+        )
+        if reference:
+            line += '  ' + self.compare(measure, reference)
+        self.stdout.write(line)
+
+    def compare(self, measure, reference):
+        """Écarts par rapport à la référence ; toute requête en plus est une régression"""
+        tolerance = self.options['tolerance']
+        changes, regression = [], measure['queries'] > reference['queries']
+        changes.append(f"queries {measure['queries'] - reference['queries']:+d}")
+        for name in ('seconds', 'peak_mb'):
+            if measure[name] is None or not reference.get(name):
+                continue
+            ratio = measure[name] / reference[name] - 1
+            changes.append(f"{name} {ratio:+.0%}")
+            regression = regression or ratio > tolerance
+        if regression:
+            self.regressions += 1
+            changes.append('REGRESSION')
+        return ', '.join(changes)
@@ -0,0 +1,118 @@
+import bisect
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from ...services.markdown_import import ImportResult, MarkdownImporter, iter_text_lines, parse_markdown
+
+
+def parse_file(path):
+    """
+    Analyse un fichier Markdown (éventuellement compressé en gzip) dans un processus du pool.
+    Les enregistrements reviennent au processus principal avec leurs liens de parenté,
+    accompagnés du nombre de lignes lues, lignes vides comprises.
+    """
+    line_count = 0
+
+    def count(lines):
+        nonlocal line_count
+        for line in lines:
+            line_count += 1
+            yield line
+
+    with open(path, 'rb') as source:
+        records = list(parse_markdown(count(iter_text_lines(source))))
+    return path, records, line_count
+
+
+def get_context():
+    # fork évite de réinitialiser Django dans chaque processus lorsqu'il est disponible
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class Command(BaseCommand):
+    help = ("Charge un répertoire de fichiers Markdown : analyse en parallèle, "
+            "déduplication des UUID et écriture par lots depuis un seul processus")
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Répertoire contenant les fichiers Markdown')
+        parser.add_argument('--pattern', default='*.md',
+                            help='Motif des fichiers à charger, recherchés récursivement')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Nombre de processus d'analyse")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        directory = Path(options['directory'])
+        if not directory.is_dir():
+            raise CommandError(f"{directory} n'est pas un répertoire")
+        paths = sorted(str(path) for path in directory.rglob(options['pattern']))
+        if not paths:
+            raise CommandError(f"Aucun fichier {options['pattern']} dans {directory}")
+
+        importer = MarkdownImporter(batch_size=options['batch_size'])
+        progress = {'lines': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+        declared = {}  # (modèle, UUID) -> première ligne qui déclare l'objet
+        duplicates = 0
+        # Les lignes sont numérotées à la suite sur tous les fichiers, pour situer les erreurs
+        offsets, names = [], []
+        records = []
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=get_context()) as pool:
+            # Les fichiers sont écrits dans l'ordre trié, quel que soit l'ordre de fin d'analyse
+            for path, parsed, line_count in pool.map(parse_file, paths):
+                # Les lignes vides ne produisent pas d'enregistrement : le décalage du fichier
+                # suivant vient du nombre de lignes lues
+                offsets.append(progress['lines'])
+                names.append(os.path.relpath(path, directory))
+                progress['lines'] += line_count
+                for line_number, record, error in parsed:
+                    if error:
+                        progress['errors'].append({'line': offsets[-1] + line_number, 'error': error})
+                        continue
+                    if record is None:
+                        continue
+                    record.line_number += offsets[-1]
+                    record.parents = {
+                        field_name: declared.get((parent.model, parent.uuid), parent)
+                        for field_name, parent in record.parents.items()
+                    }
+                    key = (record.model, record.uuid)
+                    if record.uuid and (record.fields or record.references):
+                        if key in declared:
+                            # Le premier fichier qui déclare un UUID l'emporte
+                            duplicates += 1
+                            continue
+                        declared[key] = record
+                    elif record.uuid and key in declared:
+                        continue
+                    records.append(record)
+
+                    if len(records) >= importer.batch_size:
+                        importer.flush(records, ImportResult(), progress)
+                        records = []
+            if records:
+                importer.flush(records, ImportResult(), progress)
+
+        elapsed = time.perf_counter() - start
+        rows = progress['created'] + progress['updated'] + progress['unchanged']
+        for error in sorted(progress['errors'], key=lambda e: e['line'])[:20]:
+            index = bisect.bisect_left(offsets, error['line']) - 1
+            self.stderr.write(f"{names[index]}:{error['line'] - offsets[index]}: {error['error']}")
+        if len(progress['errors']) > 20:
+            self.stderr.write(f"... {len(progress['errors']) - 20} autres erreurs")
+
+        self.stdout.write(
+            f"{len(paths)} fichiers, {progress['lines']} lignes, "
+            f"{progress['created']} créés, {progress['updated']} mis à jour, "
+            f"{progress['unchanged']} inchangés, {duplicates} doublons ignorés, "
+            f"{len(progress['errors'])} erreurs"
+        )
+        self.stdout.write(
+            f"{elapsed:.2f} s, {progress['lines'] / elapsed:.0f} lignes/s, {rows / elapsed:.0f} objets/s"
+        )
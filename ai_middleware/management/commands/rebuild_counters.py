@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...models import Client, Programme
+from ...services import counters
+
+
+class Command(BaseCommand):
+    help = ("Recalcule les compteurs dénormalisés des clients et des programmes, "
+            "par exemple après une migration ou une écriture directe en base")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, action='append', dest='clients',
+                            help='Limite le recalcul à ce client et à ses programmes (répétable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        clients = Client.objects.order_by('pk')
+        programmes = Programme.objects.order_by('pk')
+        if options['clients']:
+            clients = clients.filter(pk__in=options['clients'])
+            programmes = programmes.filter(client__in=options['clients'])
+
+        batch_size = options['batch_size']
+        totals = {}
+        for name, queryset, rebuild in (('clients', clients, counters.rebuild_clients),
+                                        ('programmes', programmes, counters.rebuild_programmes)):
+            pks = list(queryset.values_list('pk', flat=True))
+            for start in range(0, len(pks), batch_size):
+                with transaction.atomic():
+                    rebuild(pks[start:start + batch_size])
+            totals[name] = len(pks)
+
+        self.stdout.write(f"{totals['clients']} clients et {totals['programmes']} programmes recalculés")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...models import SearchEntry, UuidIndex
+from ...services import search
+
+
+class Command(BaseCommand):
+    help = ("Reconstruit l'index de recherche plein texte des entités de la hiérarchie, "
+            "par exemple après une migration ou une écriture directe en base")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        search.install()
+        total = 0
+        for name, model in search.INDEXED_MODELS.items():
+            pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(pks), batch_size):
+                with transaction.atomic():
+                    search.index_pks(model, pks[start:start + batch_size], batch_size)
+            # Entrées d'objets supprimés sans passer par l'ORM
+            SearchEntry.objects.filter(
+                uuid__in=UuidIndex.objects.filter(model=name).values('uuid'),
+            ).exclude(uuid__in=model.objects.values('uuid')).delete()
+            total += len(pks)
+        SearchEntry.objects.exclude(uuid__in=UuidIndex.objects.values('uuid')).delete()
+
+        self.stdout.write(f"{total} entités indexées")
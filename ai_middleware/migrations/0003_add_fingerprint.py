@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai_middleware', '0002_add_uuid_and_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='programme',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='sequence',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='breakout',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown', max_length=32),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import uuid
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai_middleware', '0003_add_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('source', models.CharField(help_text='Fichier temporaire contenant le document à importer', max_length=500)),
+                ('dry_run', models.BooleanField(default=False)),
+                ('prune', models.BooleanField(default=False)),
+                ('total', models.IntegerField(default=0, help_text='Nombre de lignes du document')),
+                ('processed', models.IntegerField(default=0, help_text='Nombre de lignes déjà importées')),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+INDEXED_MODELS = ['Client', 'Programme', 'Sponsor', 'Session', 'Sequence', 'BreakOut']
+
+
+def fill_uuid_index(apps, schema_editor):
+    UuidIndex = apps.get_model('ai_middleware', 'UuidIndex')
+    for model_name in INDEXED_MODELS:
+        model = apps.get_model('ai_middleware', model_name)
+        UuidIndex.objects.bulk_create(
+            (UuidIndex(uuid=obj_uuid, model=model_name, object_id=pk)
+             for pk, obj_uuid in model.objects.values_list('pk', 'uuid').iterator()),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai_middleware', '0004_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UuidIndex',
+            fields=[
+                ('uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text="Nom du modèle de l'entité", max_length=20)),
+                ('object_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(fill_uuid_index, migrations.RunPython.noop),
+    ]
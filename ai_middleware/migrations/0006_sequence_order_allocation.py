@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def renumber_sequences(apps, schema_editor):
+    """Renumérote les séquences en double dans une session, puis initialise les compteurs"""
+    Session = apps.get_model('ai_middleware', 'Session')
+    Sequence = apps.get_model('ai_middleware', 'Sequence')
+
+    duplicated = (
+        Sequence.objects.values('session_id', 'order')
+        .annotate(count=models.Count('id'))
+        .filter(count__gt=1)
+        .values_list('session_id', flat=True)
+        .distinct()
+    )
+    for session_id in list(duplicated):
+        sequences = list(Sequence.objects.filter(session_id=session_id).order_by('order', 'id'))
+        for order, sequence in enumerate(sequences, start=1):
+            sequence.order = order
+        Sequence.objects.bulk_update(sequences, ['order'])
+
+    max_orders = Sequence.objects.values('session_id').annotate(max_order=models.Max('order'))
+    sessions = []
+    for row in max_orders.iterator():
+        sessions.append(Session(pk=row['session_id'], last_sequence_order=row['max_order'] or 0))
+        if len(sessions) >= 1000:
+            Session.objects.bulk_update(sessions, ['last_sequence_order'])
+            sessions = []
+    Session.objects.bulk_update(sessions, ['last_sequence_order'])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai_middleware', '0005_uuidindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='last_sequence_order',
+            field=models.IntegerField(default=0, editable=False, help_text='Dernier ordre attribué à une séquence de la session'),
+        ),
+        migrations.RunPython(renumber_sequences, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sequence',
+            constraint=models.UniqueConstraint(fields=('session', 'order'), name='unique_sequence_order'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Les compteurs des objets existants sont calculés à la première lecture,
+    # ou d'un coup avec `manage.py rebuild_counters`
+    dependencies = [
+        ('ai_middleware', '0006_sequence_order_allocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientCounters',
+            fields=[
+                ('sessions', models.IntegerField(default=0)),
+                ('sessions_normal', models.IntegerField(default=0)),
+                ('sessions_deleted', models.IntegerField(default=0)),
+                ('sessions_archived', models.IntegerField(default=0)),
+                ('sequences', models.IntegerField(default=0)),
+                ('breakouts', models.IntegerField(default=0)),
+                ('participants', models.IntegerField(default=0, help_text='Participants listés dans les sessions')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='ai_middleware.client')),
+                ('programmes', models.IntegerField(default=0)),
+                ('sponsors', models.IntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ProgrammeCounters',
+            fields=[
+                ('sessions', models.IntegerField(default=0)),
+                ('sessions_normal', models.IntegerField(default=0)),
+                ('sessions_deleted', models.IntegerField(default=0)),
+                ('sessions_archived', models.IntegerField(default=0)),
+                ('sequences', models.IntegerField(default=0)),
+                ('breakouts', models.IntegerField(default=0)),
+                ('participants', models.IntegerField(default=0, help_text='Participants listés dans les sessions')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('programme', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='ai_middleware.programme')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+INDEXED = ['conversation', 'client', 'programme', 'sponsor', 'session', 'sequence', 'breakout']
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai_middleware', '0007_hierarchy_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name=model_name,
+            index=models.Index(fields=['created_at', 'id'], name=f'{model_name}_created_id_idx'),
+        )
+        for model_name in INDEXED
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Table des textes indexés. L'index plein texte propre à la base est installé après chaque
+    migration par services.search.install ; `manage.py rebuild_search_index` remplit la table.
+    """
+    dependencies = [
+        ('ai_middleware', '0008_created_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text="Nom du modèle de l'entité", max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('status', models.CharField(default='normal', max_length=10)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id'], name='searchentry_object_idx')],
+            },
+        ),
+    ]
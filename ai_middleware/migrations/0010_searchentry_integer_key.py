@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+# Champs indexés par modèle, repris de services.search : (titre, champs du corps)
+SEARCH_FIELDS = {
+    'Client': ('name', ['context', 'objectives']),
+    'Programme': ('name', ['description']),
+    'Session': ('title', ['context', 'objectives']),
+    'Sequence': ('title', ['objective']),
+    'BreakOut': ('title', ['description', 'objective']),
+}
+
+FTS_STATEMENTS = [
+    'DROP TRIGGER IF EXISTS ai_middleware_searchentry_fts_insert',
+    'DROP TRIGGER IF EXISTS ai_middleware_searchentry_fts_delete',
+    'DROP TRIGGER IF EXISTS ai_middleware_searchentry_fts_update',
+    'DROP TABLE IF EXISTS ai_middleware_searchentry_fts',
+]
+
+
+def drop_fts_index(apps, schema_editor):
+    """La table FTS5 suivait le rowid implicite : services.search.install la recrée sur la clé entière"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+def fill_search_entries(apps, schema_editor):
+    SearchEntry = apps.get_model('ai_middleware', 'SearchEntry')
+    for model_name, (title_field, body_fields) in SEARCH_FIELDS.items():
+        model = apps.get_model('ai_middleware', model_name)
+        rows = model.objects.values_list('uuid', 'status', title_field, *body_fields).iterator()
+        SearchEntry.objects.bulk_create(
+            (SearchEntry(uuid=obj_uuid, status=status, title=title or '',
+                         body='\n'.join(filter(None, body)))
+             for obj_uuid, status, title, *body in rows),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    SearchEntry prend une clé entière explicite, stable, qui porte l'index FTS5. Le modèle et
+    la clé de l'entité ne sont plus recopiés : ils se lisent dans UuidIndex.
+    """
+    dependencies = [
+        ('ai_middleware', '0009_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_fts_index, migrations.RunPython.noop),
+        migrations.DeleteModel(name='SearchEntry'),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(unique=True)),
+                ('status', models.CharField(default='normal', max_length=10)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(fill_search_entries, migrations.RunPython.noop),
+    ]
@@ -20,6 +20,10 @@ class Conversation(models.Model):
     completion_tokens = models.IntegerField(default=0)
     total_tokens = models.IntegerField(default=0)
 
+    class Meta:
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='conversation_created_id_idx')]
+
     def __str__(self):
         return f'Conversation {self.id} - {self.provider} - {self.created_at}'
 
@@ -36,9 +40,14 @@ class Client(models.Model):
     objectives = models.TextField(help_text='Objectifs du client')
     email = models.EmailField(blank=True, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='normal')
+    fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='client_created_id_idx')]
+
     def __str__(self):
         return self.name
 
@@ -54,9 +63,14 @@ class Programme(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='programmes')
     description = models.TextField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='normal')
+    fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='programme_created_id_idx')]
+
     def __str__(self):
         return f'{self.name} - {self.client.name}'
 
@@ -76,6 +90,10 @@ class Sponsor(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='sponsor_created_id_idx')]
+
     def __str__(self):
         return f'{self.name} - {self.job_title} ({self.client.name})'
 
@@ -100,9 +118,15 @@ class Session(models.Model):
     sponsors = models.ManyToManyField(Sponsor, related_name='sessions')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='normal')
+    last_sequence_order = models.IntegerField(default=0, editable=False, help_text='Dernier ordre attribué à une séquence de la session')
+    fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='session_created_id_idx')]
+
     def __str__(self):
         return f'{self.title} - {self.client.name}'
 
@@ -124,11 +148,17 @@ class Sequence(models.Model):
     order = models.IntegerField(help_text='Ordre de la séquence dans la session')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='normal')
+    fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order']
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='sequence_created_id_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'order'], name='unique_sequence_order'),
+        ]
 
     def __str__(self):
         return f'{self.title} - {self.session.title}'
@@ -146,9 +176,14 @@ class BreakOut(models.Model):
     description = models.TextField()
     objective = models.TextField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='normal')
+    fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text='Empreinte du contenu exporté en Markdown')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Pagination par curseur des listes
+        indexes = [models.Index(fields=['created_at', 'id'], name='breakout_created_id_idx')]
+
     def __str__(self):
         return f'{self.title} - {self.sequence.title}'
 
@@ -164,4 +199,85 @@ class UserGoogleAuth(models.Model):
         return self.token_expiry > timezone.now()
 
     def __str__(self):
-        return f'{self.user.email} - Google Auth'
\ No newline at end of file
+        return f'{self.user.email} - Google Auth'
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    source = models.CharField(max_length=500, help_text='Fichier temporaire contenant le document à importer')
+    dry_run = models.BooleanField(default=False)
+    prune = models.BooleanField(default=False)
+    total = models.IntegerField(default=0, help_text='Nombre de lignes du document')
+    processed = models.IntegerField(default=0, help_text='Nombre de lignes déjà importées')
+    errors = models.JSONField(default=list, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Import {self.uuid} - {self.status}'
+
+
+class UuidIndex(models.Model):
+    """Registre des UUID de toutes les entités : un UUID donne son modèle et sa clé en une requête"""
+    uuid = models.UUIDField(primary_key=True)
+    model = models.CharField(max_length=20, help_text="Nom du modèle de l'entité")
+    object_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} ({self.uuid})'
+
+
+class HierarchyCounters(models.Model):
+    """Compteurs dénormalisés d'un sous-arbre, tenus à jour à chaque écriture"""
+    sessions = models.IntegerField(default=0)
+    sessions_normal = models.IntegerField(default=0)
+    sessions_deleted = models.IntegerField(default=0)
+    sessions_archived = models.IntegerField(default=0)
+    sequences = models.IntegerField(default=0)
+    breakouts = models.IntegerField(default=0)
+    participants = models.IntegerField(default=0, help_text='Participants listés dans les sessions')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class ClientCounters(HierarchyCounters):
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+    programmes = models.IntegerField(default=0)
+    sponsors = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'Compteurs {self.client_id}'
+
+
+class ProgrammeCounters(HierarchyCounters):
+    programme = models.OneToOneField(Programme, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+
+    def __str__(self):
+        return f'Compteurs {self.programme_id}'
+
+
+class SearchEntry(models.Model):
+    """
+    Texte indexé d'une entité pour la recherche plein texte. L'index propre à la base
+    (table FTS5 sous SQLite, colonne tsvector sous PostgreSQL) est créé par services.search.
+    La clé entière est celle de l'index FTS5 ; le modèle et la clé de l'entité se lisent
+    dans UuidIndex.
+    """
+    id = models.BigAutoField(primary_key=True)
+    uuid = models.UUIDField(unique=True)
+    status = models.CharField(max_length=10, default='normal')
+    title = models.CharField(max_length=200, blank=True)
+    body = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'{self.title} ({self.uuid})'
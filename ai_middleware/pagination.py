@@ -0,0 +1,170 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .services import search
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur sur le tri de la liste, complété par l'id pour départager les égalités.
+
+    Chaque page est une requête `WHERE (tri, id) > curseur ORDER BY ... LIMIT n` : son coût
+    ne dépend pas de sa position dans la liste, contrairement à un OFFSET. Les pages restent
+    stables quand des objets sont créés entre deux appels. Le tri suivi est, dans l'ordre :
+    celui demandé (`?ordering=`), le rang d'une recherche plein texte, le `Meta.ordering` du
+    modèle, et à défaut la création, du plus récent au plus ancien.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    default_ordering = ('-created_at',)
+    invalid_cursor_message = 'Curseur invalide'
+    invalid_ordering_message = 'Tri non pris en charge par la pagination : {name}'
+
+    def get_ordering(self, queryset):
+        """
+        Returns:
+            list: couples (colonne, True si décroissante), terminés par la clé primaire
+        """
+        query = queryset.query
+        if query.order_by:
+            names = list(query.order_by)
+        elif search.POSITION in query.annotations:
+            names = [search.POSITION]
+        elif query.default_ordering and queryset.model._meta.ordering:
+            names = list(queryset.model._meta.ordering)
+        else:
+            names = list(self.default_ordering)
+
+        ordering = []
+        for name in names:
+            if not isinstance(name, str):
+                raise ValidationError({'ordering': [self.invalid_ordering_message.format(name=name)]})
+            descending, column = name.startswith('-'), name.lstrip('-')
+            if column == 'pk' or column == queryset.model._meta.pk.name:
+                ordering.append(('pk', descending))
+                return ordering
+            if column != search.POSITION:
+                self.get_field(queryset.model, column)
+            ordering.append((column, descending))
+        # L'id départage les égalités, dans le sens de la première colonne
+        ordering.append(('pk', ordering[0][1]))
+        return ordering
+
+    def get_field(self, model, column):
+        """
+        Seules les colonnes propres au modèle et non nulles peuvent porter un curseur :
+        une comparaison avec NULL ne sélectionne aucune ligne.
+        """
+        try:
+            field = model._meta.get_field(column)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.is_relation or field.null:
+            raise ValidationError({'ordering': [self.invalid_ordering_message.format(name=column)]})
+        return field
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+
+        reverse = cursor is not None and cursor['reverse']
+        if cursor is not None:
+            queryset = queryset.filter(self.get_cursor_filter(cursor['values'], reverse))
+        # Une page précédente se lit dans le sens inverse de la liste
+        results = list(queryset.order_by(*(
+            f'-{column}' if descending != reverse else column for column, descending in self.ordering
+        ))[:self.page_size + 1])
+
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_cursor_filter(self, values, reverse):
+        """
+        Objets placés après le curseur : égaux sur les premières colonnes du tri et au-delà
+        sur la suivante.
+        """
+        condition, equal = Q(), {}
+        for (column, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{column}__{lookup}': value})
+            equal[column] = value
+        return condition
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.page[-1], reverse=False) if self.has_next and self.page else None,
+            'previous': self.get_link(self.page[0], reverse=True) if self.has_previous and self.page else None,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_link(self, obj, reverse):
+        values = [getattr(obj, column) for column, _ in self.ordering]
+        cursor = json.dumps({
+            'o': [f'-{column}' if descending else column for column, descending in self.ordering],
+            'v': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values],
+            'r': reverse,
+        })
+        encoded = base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """
+        Un curseur n'est valable que pour le tri qui l'a produit.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        ordering = [f'-{column}' if descending else column for column, descending in self.ordering]
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor['o'] != ordering or len(cursor['v']) != len(ordering):
+                raise ValueError(cursor['o'])
+            values = [self.decode_value(column, value) for (column, _), value in zip(self.ordering, cursor['v'])]
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': values, 'reverse': bool(cursor.get('r'))}
+
+    def decode_value(self, column, value):
+        if column == search.POSITION:
+            return int(value)
+        field = self.model._meta.pk if column == 'pk' else self.model._meta.get_field(column)
+        return field.to_python(value)
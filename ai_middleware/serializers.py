@@ -1,32 +1,99 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Client, Programme, Session, Sequence, BreakOut, Conversation
+from .models import Client, Programme, Sponsor, Session, Sequence, BreakOut, Conversation, ImportJob
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Résout les clés parmi les objets préchargés par BulkListSerializer, sinon en base"""
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is not None:
+            try:
+                obj = self.prefetched.get(self.get_queryset().model._meta.pk.to_python(data))
+            except DjangoValidationError:
+                obj = None
+            if obj is not None:
+                return obj
+        return super().to_internal_value(data)
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Charge en une requête par relation les objets référencés par tous les éléments"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for name, field in self.child.fields.items():
+                relation = getattr(field, 'child_relation', field)
+                if field.read_only or not isinstance(relation, PrefetchedPrimaryKeyRelatedField):
+                    continue
+                values = [item.get(name) for item in data if isinstance(item, dict)]
+                if relation is not field:
+                    values = [value for value_list in values if isinstance(value_list, list)
+                              for value in value_list]
+                relation.prefetched = self.prefetch(relation, values)
+        return super().to_internal_value(data)
+
+    def prefetch(self, relation, values):
+        queryset = relation.get_queryset()
+        pks = set()
+        for value in values:
+            try:
+                pks.add(queryset.model._meta.pk.to_python(value))
+            except DjangoValidationError:
+                continue
+        pks.discard(None)
+        return queryset.in_bulk(list(pks)) if pks else {}
+
+class BulkModelSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
 
-class ClientSerializer(serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = BulkListSerializer
+
+class ClientSerializer(BulkModelSerializer):
+    class Meta(BulkModelSerializer.Meta):
         model = Client
         fields = '__all__'
 
-class ProgrammeSerializer(serializers.ModelSerializer):
+class ClientLightSerializer(serializers.ModelSerializer):
     class Meta:
+        model = Client
+        fields = ['id', 'uuid', 'name', 'email', 'status', 'created_at', 'updated_at']
+
+class ProgrammeSerializer(BulkModelSerializer):
+    class Meta(BulkModelSerializer.Meta):
         model = Programme
         fields = '__all__'
 
-class SessionSerializer(serializers.ModelSerializer):
-    class Meta:
+class SponsorSerializer(BulkModelSerializer):
+    class Meta(BulkModelSerializer.Meta):
+        model = Sponsor
+        fields = '__all__'
+
+class SessionSerializer(BulkModelSerializer):
+    class Meta(BulkModelSerializer.Meta):
         model = Session
         fields = '__all__'
 
-class SequenceSerializer(serializers.ModelSerializer):
-    class Meta:
+class SequenceSerializer(BulkModelSerializer):
+    class Meta(BulkModelSerializer.Meta):
         model = Sequence
         fields = '__all__'
+        # Sans ordre, la séquence est placée à la fin de sa session. L'unicité de
+        # (session, order) est garantie par la base, sans requête de validation par ligne.
+        extra_kwargs = {'order': {'required': False}}
+        validators = []
 
-class BreakOutSerializer(serializers.ModelSerializer):
-    class Meta:
+class BreakOutSerializer(BulkModelSerializer):
+    class Meta(BulkModelSerializer.Meta):
         model = BreakOut
         fields = '__all__'
 
 class ConversationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Conversation
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        exclude = ['id', 'source']
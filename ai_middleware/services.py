@@ -1,8 +1,15 @@
 import re
 import uuid
-from django.db.models import Q
 from .models import Client, Programme, Session, Sequence, BreakOut
 
+# Direct children of each model and the indexed foreign key pointing to the parent
+CHILD_RELATIONS = {
+    Client: (Programme, 'client'),
+    Programme: (Session, 'programme'),
+    Session: (Sequence, 'session'),
+    Sequence: (BreakOut, 'sequence'),
+}
+
 def model_to_markdown(model_instance, level=1):
     """Convert a model instance to markdown format"""
     model_name = model_instance.__class__.__name__
@@ -94,14 +101,6 @@ def from_markdown(markdown_text):
 
     sections = re.split(r'(?=^#+ \[@)', markdown_text, flags=re.MULTILINE)
     
-    processed_uuids = {
-        'client': set(),
-        'programme': set(),
-        'session': set(),
-        'sequence': set(),
-        'breakout': set()
-    }
-
     created_objects = []
     for section in sections:
         if not section.strip():
@@ -122,21 +121,33 @@ def from_markdown(markdown_text):
                     'status': 'normal'
                 }
             )
-            processed_uuids[parsed['model_type']].add(uuid_obj)
         else:
             obj = model_class.objects.create(
                 **parsed['fields'],
                 uuid=uuid.uuid4(),
                 status='normal'
             )
-            processed_uuids[parsed['model_type']].add(obj.uuid)
 
         created_objects.append(obj)
 
-    for model_type, uuids in processed_uuids.items():
-        models[model_type].objects.filter(
-            ~Q(uuid__in=uuids),
-            status='normal'
-        ).update(status='deleted')
+    reconcile_subtree(created_objects)
 
-    return created_objects
\ No newline at end of file
+    return created_objects
+
+def reconcile_subtree(objects):
+    """
+    Soft-delete stored children of imported objects that are missing from the document.
+    Only parents present in the document are looked up, through their foreign key, so the
+    cost follows the size of the imported subtree rather than the size of the tables.
+    """
+    imported = {(type(obj), obj.pk) for obj in objects}
+    for parent_model, (child_model, fk) in CHILD_RELATIONS.items():
+        parent_ids = [obj.pk for obj in objects if type(obj) is parent_model]
+        if not parent_ids:
+            continue
+        stored = child_model.objects.filter(
+            **{f'{fk}__in': parent_ids}, status='normal'
+        ).values_list('pk', flat=True)
+        stale = [pk for pk in stored if (child_model, pk) not in imported]
+        if stale:
+            child_model.objects.filter(pk__in=stale).update(status='deleted')
\ No newline at end of file
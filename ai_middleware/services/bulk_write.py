@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from . import counters, dashboard_cache, markdown_cache, search, uuid_registry, versions
+from .markdown_format import EXPORT_FIELDS, content_fingerprint
+from ..models import Client, Programme
+
+# Statuts propagés à tout le sous-arbre, et statuts laissés tels quels par chacun
+CASCADE_STATUSES = {
+    'archived': ('archived', 'deleted'),
+    'deleted': ('deleted',),
+}
+
+
+def get_batch_size():
+    return getattr(settings, 'BULK_CREATE_BATCH_SIZE', 500)
+
+
+def bulk_create(model, items, m2m_fields=(), validate=None, batch_size=None):
+    """
+    Crée des objets en lot, avec leurs relations many-to-many, dans une transaction.
+
+    Chaque élément est d'abord validé en Python : une erreur n'écarte que cet élément.
+    Les objets valides sont insérés par lots de `batch_size`, chaque lot dans un savepoint ;
+    si la base refuse un lot, ses lignes sont réinsérées une par une pour situer l'erreur.
+
+    Args:
+        model: Modèle des objets à créer
+        items: Données validées par le sérialiseur, une par objet
+        m2m_fields: Champs many-to-many à renseigner par insertion directe des lignes de liaison
+        validate: Fonction optionnelle (item, relations) qui lève ValueError ou ValidationError
+
+    Returns:
+        tuple: (objets créés, erreurs [{'index', 'error'}]) dans l'ordre des éléments
+    """
+    batch_size = batch_size or get_batch_size()
+    pending, errors = [], []
+
+    for index, item in enumerate(items):
+        item = dict(item)
+        relations = {name: item.pop(name) for name in m2m_fields if name in item}
+        try:
+            if validate:
+                validate(item, relations)
+            obj = model(**item)
+        except (ValueError, ValidationError, TypeError) as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        if hasattr(obj, 'fingerprint'):
+            # Les écritures en lot ne déclenchent pas le signal qui calcule l'empreinte
+            obj.fingerprint = content_fingerprint(obj)
+        pending.append((index, obj, relations))
+
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([obj for _, obj, _ in batch])
+                created += batch
+            except DatabaseError:
+                created += insert_one_by_one(batch, errors)
+
+        write_m2m(model, created, m2m_fields, batch_size)
+        after_bulk_create(model, [obj for _, obj, _ in created], batch_size)
+
+    errors.sort(key=lambda error: error['index'])
+    return [obj for _, obj, _ in created], errors
+
+
+def insert_one_by_one(batch, errors):
+    """Réinsère un lot refusé ligne par ligne, chacune dans son savepoint"""
+    inserted = []
+    for index, obj, relations in batch:
+        obj.pk = None
+        obj._state.adding = True
+        try:
+            with transaction.atomic():
+                type(obj).objects.bulk_create([obj])
+            inserted.append((index, obj, relations))
+        except DatabaseError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return inserted
+
+
+def write_m2m(model, created, m2m_fields, batch_size):
+    """Insère directement les lignes des tables de liaison, une requête par lot"""
+    for name in m2m_fields:
+        m2m_field = model._meta.get_field(name)
+        through = m2m_field.remote_field.through
+        source = f'{m2m_field.m2m_field_name()}_id'
+        target = f'{m2m_field.m2m_reverse_field_name()}_id'
+        rows = [
+            through(**{source: obj.pk, target: related.pk})
+            for _, obj, relations in created
+            for related in relations.get(name, [])
+        ]
+        if rows:
+            through.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+
+
+def after_bulk_create(model, objs, batch_size):
+    """Remplace les signaux post_save, que bulk_create ne déclenche pas"""
+    if not objs:
+        return
+    if model in uuid_registry.INDEXED_MODELS.values():
+        uuid_registry.register_many(model, objs, batch_size=batch_size)
+    if model in markdown_cache.ANCESTOR_PATHS:
+        for start in range(0, len(objs), batch_size):
+            markdown_cache.invalidate_tree_paths(model, [obj.uuid for obj in objs[start:start + batch_size]])
+    if model in counters.COUNTED_MODELS:
+        counters.refresh_objects(model, [obj.pk for obj in objs], batch_size=batch_size)
+    if model in search.SEARCH_FIELDS:
+        search.index(objs, batch_size=batch_size)
+
+
+def bulk_update(queryset, values, batch_size=None):
+    """
+    Applique la même modification partielle à tous les objets d'un queryset, en un seul UPDATE.
+    Les signaux des modèles ne sont pas déclenchés : empreintes, caches, compteurs et index
+    de recherche sont tenus à jour ici, selon les champs modifiés.
+
+    Args:
+        queryset: Objets à modifier
+        values: {champ: valeur} validés par le sérialiseur, sans relation many-to-many
+
+    Returns:
+        int: Nombre d'objets modifiés
+    """
+    batch_size = batch_size or get_batch_size()
+    model = queryset.model
+    fields = set(values)
+    # Un changement de parent touche aussi les caches et les compteurs des anciens ancêtres
+    moved = any(model._meta.get_field(name).is_relation for name in fields)
+    rendered = fields & set(EXPORT_FIELDS.get(model, []))
+    recount = counters.touches_counters(model, fields)
+    client_field = 'pk' if model is Client else 'client_id'
+
+    with transaction.atomic():
+        rows = list(queryset.order_by().values_list('pk', 'uuid'))
+        if not rows:
+            return 0
+        pks = [pk for pk, _ in rows]
+        uuids = [obj_uuid for _, obj_uuid in rows]
+        affected = {'clients': set(), 'programmes': set()}
+        dashboard_clients = set()
+        if moved:
+            markdown_cache.invalidate_tree_paths(model, uuids)
+        if recount and moved:
+            counters.collect_affected(affected, model, pks, batch_size)
+        if model in dashboard_cache.DASHBOARD_MODELS and moved:
+            dashboard_clients |= set(model.objects.filter(pk__in=pks).values_list(client_field, flat=True))
+
+        model.objects.filter(pk__in=pks).update(**values, updated_at=timezone.now())
+
+        if rendered:
+            refresh_fingerprints(model, pks, batch_size)
+        if (rendered or moved) and model in markdown_cache.ANCESTOR_PATHS:
+            markdown_cache.invalidate_tree_paths(model, uuids)
+        if search.touches_index(model, fields):
+            search.index_pks(model, pks, batch_size)
+        if recount:
+            counters.collect_affected(affected, model, pks, batch_size)
+        if model in dashboard_cache.DASHBOARD_MODELS:
+            dashboard_clients |= set(model.objects.filter(pk__in=pks).values_list(client_field, flat=True))
+        counters.rebuild_affected(affected)
+        dashboard_cache.invalidate(dashboard_clients)
+    return len(pks)
+
+
+def refresh_fingerprints(model, pks, batch_size):
+    """Recalcule l'empreinte d'objets modifiés par un UPDATE en lot ; une lecture et une écriture par lot"""
+    for start in range(0, len(pks), batch_size):
+        objs = list(model.objects.filter(pk__in=pks[start:start + batch_size]).only('uuid', *EXPORT_FIELDS[model]))
+        for obj in objs:
+            obj.fingerprint = content_fingerprint(obj)
+        model.objects.bulk_update(objs, ['fingerprint'], batch_size=batch_size)
+
+
+def cascade_status(instance, status):
+    """
+    Applique un statut à un objet et à tous ses descendants, en un UPDATE par niveau quel que
+    soit le nombre d'objets. Archiver laisse les objets déjà supprimés tels quels.
+
+    Le statut n'est pas exporté en Markdown : seuls l'index de recherche, les compteurs de
+    sessions et le tableau de bord du client sont à tenir à jour.
+
+    Returns:
+        dict: {nom du modèle: nombre d'objets modifiés}, de l'objet jusqu'aux breakouts
+    """
+    model = type(instance)
+    if model is Client:
+        descendants = versions.CLIENT_TREE_DESCENDANTS
+    else:
+        descendants = versions.get_tree_descendants(model)
+    unchanged = CASCADE_STATUSES[status]
+    now = timezone.now()
+
+    updated = {}
+    with transaction.atomic():
+        for level, path in [(model, 'pk'), *descendants]:
+            subtree = level.objects.filter(**{path: instance.pk})
+            updated[level.__name__] = subtree.exclude(status__in=unchanged).update(status=status, updated_at=now)
+            if updated[level.__name__]:
+                search.set_queryset_status(subtree, status)
+
+        if model is Client:
+            clients = {instance.pk}
+            programmes = set(Programme.objects.filter(client=instance.pk).values_list('pk', flat=True))
+        else:
+            clients, programmes = counters.get_affected(model, [instance.pk])
+        if updated.get('Session'):
+            # Seul le statut des sessions est compté ; la reconstruction périme le tableau de bord
+            counters.rebuild_affected({'clients': clients, 'programmes': programmes})
+        elif any(updated.values()):
+            dashboard_cache.invalidate(clients)
+    return updated
@@ -0,0 +1,118 @@
+from rest_framework.utils.encoders import JSONEncoder
+from .markdown_format import EXPORT_FIELDS
+from ..models import Client, Programme, Session, Sequence, BreakOut
+
+# Niveaux sous le client : (clé dans le parent, modèle, clé étrangère du parent, chemin vers le client, tri)
+LEVELS = [
+    ('programmes', Programme, 'client_id', 'client', ('pk',)),
+    ('sessions', Session, 'programme_id', 'client', ('pk',)),
+    ('sequences', Sequence, 'session_id', 'session__client', ('session_id', 'order', 'pk')),
+    ('breakouts', BreakOut, 'sequence_id', 'sequence__session__client', ('pk',)),
+]
+MAX_DEPTH = len(LEVELS)
+
+STATUSES = [status for status, _ in Client.STATUS_CHOICES]
+DEFAULT_STATUSES = [status for status in STATUSES if status != 'deleted']
+
+# Taille des morceaux de JSON envoyés en streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def parse_depth(value):
+    """
+    Returns:
+        int: Nombre de niveaux sous le client (0 à MAX_DEPTH), tous par défaut
+
+    Raises:
+        ValueError: Si la profondeur n'est pas un entier entre 0 et MAX_DEPTH
+    """
+    if value in (None, ''):
+        return MAX_DEPTH
+    depth = int(value)
+    if not 0 <= depth <= MAX_DEPTH:
+        raise ValueError(f"La profondeur doit être comprise entre 0 et {MAX_DEPTH}")
+    return depth
+
+
+def parse_statuses(value):
+    """
+    Returns:
+        list: Statuts retenus à chaque niveau, tous sauf 'deleted' par défaut
+
+    Raises:
+        ValueError: Si un statut est inconnu
+    """
+    if not value:
+        return list(DEFAULT_STATUSES)
+    statuses = [status.strip() for status in value.split(',') if status.strip()]
+    unknown = [status for status in statuses if status not in STATUSES]
+    if unknown:
+        raise ValueError(f"Statuts inconnus : {', '.join(unknown)}")
+    return statuses
+
+
+def get_fields(model):
+    return ['id', 'uuid', 'status', 'updated_at', *EXPORT_FIELDS[model]]
+
+
+def get_tree(client, depth=MAX_DEPTH, statuses=None):
+    """
+    Arbre d'un client en dictionnaires imbriqués, en une requête par niveau quel que soit
+    le nombre d'objets. Les sessions sans programme sont listées sous le client.
+
+    Un objet est omis si son statut n'est pas retenu, et avec lui tout son sous-arbre.
+
+    Args:
+        client: Client racine, déjà chargé
+        depth: Nombre de niveaux sous le client
+        statuses: Statuts retenus, DEFAULT_STATUSES par défaut
+
+    Returns:
+        dict: Le client et ses descendants
+    """
+    statuses = statuses or DEFAULT_STATUSES
+    root = {name: getattr(client, name) for name in get_fields(Client)}
+    # Objets placés dans l'arbre, par modèle puis par clé primaire
+    placed = {Client: {client.pk: root}}
+    parent_model = Client
+
+    for name, model, parent_fk, client_path, ordering in LEVELS[:depth]:
+        nodes = {}
+        rows = model.objects.filter(**{client_path: client, 'status__in': statuses}).order_by(
+            *ordering
+        ).values(parent_fk, *get_fields(model))
+        for parent in placed[parent_model].values():
+            parent[name] = []
+        if model is Session:
+            root['sessions'] = []
+        for row in rows:
+            parent_id = row.pop(parent_fk)
+            if model is Session and parent_id is None:
+                parent = root
+            else:
+                parent = placed[parent_model].get(parent_id)
+            if parent is None:
+                # Parent écarté par le filtre de statut
+                continue
+            parent[name].append(row)
+            nodes[row['id']] = row
+        placed[model] = nodes
+        parent_model = model
+    return root
+
+
+def iter_json(data, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode en JSON par morceaux, comme le rendu JSON de DRF. Seul le texte JSON n'est pas
+    construit en entier : `data`, par exemple l'arbre de get_tree, est déjà en mémoire.
+    """
+    buffer, size = [], 0
+    for part in JSONEncoder(ensure_ascii=False).iterencode(data):
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
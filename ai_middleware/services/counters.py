@@ -0,0 +1,287 @@
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Length, Replace
+from . import dashboard_cache
+from ..models import (Programme, Sponsor, Session, Sequence, BreakOut,
+                      ClientCounters, ProgrammeCounters)
+
+SESSION_STATUSES = [status for status, _ in Session.STATUS_CHOICES]
+
+# Champs communs aux compteurs d'un client et d'un programme
+HIERARCHY_FIELDS = (['sessions'] + [f'sessions_{status}' for status in SESSION_STATUSES]
+                    + ['sequences', 'breakouts', 'participants'])
+CLIENT_FIELDS = HIERARCHY_FIELDS + ['programmes', 'sponsors']
+
+COUNTED_MODELS = (Programme, Sponsor, Session, Sequence, BreakOut)
+
+# Champs dont la modification change les compteurs des ancêtres
+COUNTED_FIELDS = {
+    Programme: {'client'},
+    Sponsor: {'client'},
+    Session: {'client', 'programme', 'status', 'participants'},
+    Sequence: {'session'},
+    BreakOut: {'sequence'},
+}
+
+
+def count_participants(text):
+    """Nombre de participants d'une session, listés séparés par des virgules"""
+    return len(text.split(',')) if text else 0
+
+
+def participants_expression():
+    """Équivalent SQL de count_participants : nombre de virgules plus un, zéro si vide"""
+    return Case(
+        When(participants='', then=Value(0)),
+        When(participants__isnull=True, then=Value(0)),
+        default=Length('participants') - Length(Replace('participants', Value(','), Value(''))) + 1,
+        output_field=IntegerField(),
+    )
+
+
+# Ce qu'un objet ajoute aux compteurs de ses ancêtres, sans ses descendants
+
+def get_contribution(instance):
+    """
+    Returns:
+        tuple: (client_id, programme_id, {champ: valeur}) d'après l'état de l'objet en mémoire
+    """
+    if isinstance(instance, Session):
+        return instance.client_id, instance.programme_id, {
+            'sessions': 1,
+            f'sessions_{instance.status}': 1,
+            'participants': count_participants(instance.participants),
+        }
+    if isinstance(instance, Programme):
+        return instance.client_id, None, {'programmes': 1}
+    if isinstance(instance, Sponsor):
+        return instance.client_id, None, {'sponsors': 1}
+    if isinstance(instance, Sequence):
+        row = Session.objects.filter(pk=instance.session_id).values_list('client_id', 'programme_id').first()
+        return (*(row or (None, None)), {'sequences': 1})
+    if isinstance(instance, BreakOut):
+        row = Sequence.objects.filter(pk=instance.sequence_id).values_list(
+            'session__client_id', 'session__programme_id'
+        ).first()
+        return (*(row or (None, None)), {'breakouts': 1})
+    return None
+
+
+def get_stored_contribution(instance):
+    """Contribution de l'objet tel qu'il est enregistré en base, ou None s'il est nouveau"""
+    if instance.pk is None:
+        return None
+    fields = {
+        Session: ['client_id', 'programme_id', 'status', 'participants'],
+        Programme: ['client_id'],
+        Sponsor: ['client_id'],
+        Sequence: ['session_id'],
+        BreakOut: ['sequence_id'],
+    }[type(instance)]
+    row = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+    if row is None:
+        return None
+    return get_contribution(type(instance)(pk=instance.pk, **row))
+
+
+def get_descendants(instance):
+    """Compteurs des descendants d'un objet, qui le suivent quand il change de parent"""
+    if isinstance(instance, Session):
+        sequences = Sequence.objects.filter(session=instance)
+        return {
+            'sequences': sequences.count(),
+            'breakouts': BreakOut.objects.filter(sequence__session=instance).count(),
+        }
+    if isinstance(instance, Sequence):
+        return {'breakouts': instance.breakouts.count()}
+    return {}
+
+
+def apply(client_id, programme_id, deltas, sign=1):
+    """Ajoute les deltas aux compteurs existants, en un UPDATE par ligne de compteurs"""
+    deltas = {name: sign * value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    if client_id is not None:
+        ClientCounters.objects.filter(client_id=client_id).update(
+            **{name: F(name) + value for name, value in deltas.items() if name in CLIENT_FIELDS}
+        )
+        dashboard_cache.invalidate([client_id])
+    programme_deltas = {name: value for name, value in deltas.items() if name in HIERARCHY_FIELDS}
+    if programme_id is not None and programme_deltas:
+        ProgrammeCounters.objects.filter(programme_id=programme_id).update(
+            **{name: F(name) + value for name, value in programme_deltas.items()}
+        )
+
+
+def merge(*deltas):
+    merged = {}
+    for delta in deltas:
+        for name, value in delta.items():
+            merged[name] = merged.get(name, 0) + value
+    return merged
+
+
+def record_save(instance, previous, created):
+    """Reporte une création ou une modification sur les compteurs des ancêtres"""
+    current = get_contribution(instance)
+    if created or previous is None:
+        apply(*current)
+        return
+    if previous[:2] == current[:2]:
+        # Même parents : seule la différence de contenu est reportée
+        apply(*current[:2], merge(current[2], {name: -value for name, value in previous[2].items()}))
+        return
+    # Changement de parent : l'objet part avec ses descendants
+    descendants = get_descendants(instance)
+    apply(*previous[:2], merge(previous[2], descendants), sign=-1)
+    apply(*current[:2], merge(current[2], descendants))
+
+
+def record_delete(previous):
+    """Retire un objet supprimé ; ses descendants supprimés en cascade se retirent eux-mêmes"""
+    if previous is not None:
+        apply(*previous, sign=-1)
+
+
+def get_affected(model, pks):
+    """
+    Clients et programmes dont les compteurs dépendent des objets donnés, en une requête au plus.
+
+    Returns:
+        tuple: (ensemble des clients, ensemble des programmes)
+    """
+    paths = {
+        Programme: ('client_id', 'pk'),
+        Sponsor: ('client_id', None),
+        Session: ('client_id', 'programme_id'),
+        Sequence: ('session__client_id', 'session__programme_id'),
+        BreakOut: ('sequence__session__client_id', 'sequence__session__programme_id'),
+    }.get(model)
+    if paths is None or not pks:
+        return set(), set()
+    rows = model.objects.filter(pk__in=pks).values_list(paths[0], paths[1] or 'pk')
+    clients = {row[0] for row in rows if row[0] is not None}
+    programmes = {row[1] for row in rows if row[1] is not None} if paths[1] else set()
+    return clients, programmes
+
+
+def aggregate(model, parent_path, parent_ids, **annotations):
+    """Agrège un modèle par ancêtre, en une requête"""
+    rows = model.objects.filter(**{f'{parent_path}__in': parent_ids}).values(parent_path).annotate(
+        **annotations
+    )
+    return {row.pop(parent_path): row for row in rows}
+
+
+def compute(parent_ids, session_path, sequence_path, breakout_path):
+    """Recalcule les compteurs communs d'un ensemble de clients ou de programmes"""
+    session_counts = aggregate(
+        Session, session_path, parent_ids,
+        sessions=Count('id'),
+        participants=Sum(participants_expression()),
+        **{f'sessions_{status}': Count('id', filter=Q(status=status)) for status in SESSION_STATUSES},
+    )
+    sequence_counts = aggregate(Sequence, sequence_path, parent_ids, sequences=Count('id'))
+    breakout_counts = aggregate(BreakOut, breakout_path, parent_ids, breakouts=Count('id'))
+    values = {}
+    for parent_id in parent_ids:
+        row = dict.fromkeys(HIERARCHY_FIELDS, 0)
+        for counts in (session_counts, sequence_counts, breakout_counts):
+            row.update({name: value or 0 for name, value in counts.get(parent_id, {}).items()})
+        values[parent_id] = row
+    return values
+
+
+def rebuild_clients(client_ids, invalidate=True):
+    """
+    Recalcule entièrement les compteurs des clients donnés, en un nombre fixe de requêtes.
+    Sans `invalidate`, leurs tableaux de bord en cache ne sont pas périmés.
+    """
+    client_ids = list(client_ids)
+    if not client_ids:
+        return
+    values = compute(client_ids, 'client_id', 'session__client_id', 'sequence__session__client_id')
+    programmes = aggregate(Programme, 'client_id', client_ids, programmes=Count('id'))
+    sponsors = aggregate(Sponsor, 'client_id', client_ids, sponsors=Count('id'))
+    ClientCounters.objects.bulk_create(
+        [ClientCounters(
+            client_id=client_id,
+            programmes=programmes.get(client_id, {}).get('programmes', 0),
+            sponsors=sponsors.get(client_id, {}).get('sponsors', 0),
+            **row,
+        ) for client_id, row in values.items()],
+        update_conflicts=True,
+        unique_fields=['client'],
+        update_fields=CLIENT_FIELDS + ['updated_at'],
+    )
+    if invalidate:
+        dashboard_cache.invalidate(client_ids)
+
+
+def rebuild_programmes(programme_ids):
+    """Recalcule entièrement les compteurs des programmes donnés, en un nombre fixe de requêtes"""
+    programme_ids = list(programme_ids)
+    if not programme_ids:
+        return
+    values = compute(programme_ids, 'programme_id', 'session__programme_id', 'sequence__session__programme_id')
+    ProgrammeCounters.objects.bulk_create(
+        [ProgrammeCounters(programme_id=programme_id, **row) for programme_id, row in values.items()],
+        update_conflicts=True,
+        unique_fields=['programme'],
+        update_fields=HIERARCHY_FIELDS + ['updated_at'],
+    )
+
+
+def touches_counters(model, fields):
+    """Indique si la modification de ces champs peut changer les compteurs des ancêtres"""
+    counted = COUNTED_FIELDS.get(model, set())
+    return any(name in counted or name.removesuffix('_id') in counted for name in fields)
+
+
+def collect_affected(affected, model, pks, batch_size=500):
+    """Ajoute à `affected` ({'clients': set, 'programmes': set}) les ancêtres des objets donnés"""
+    pks = list(pks)
+    for start in range(0, len(pks), batch_size):
+        clients, programmes = get_affected(model, pks[start:start + batch_size])
+        affected['clients'] |= clients
+        affected['programmes'] |= programmes
+    return affected
+
+
+def rebuild_affected(affected):
+    rebuild_clients(affected['clients'])
+    rebuild_programmes(affected['programmes'])
+
+
+def refresh_objects(model, pks, batch_size=500):
+    """
+    Recalcule les compteurs touchés par des écritures en lot, qui ne déclenchent pas les signaux.
+    À appeler après l'écriture, pour les objets créés ou modifiés.
+    """
+    rebuild_affected(collect_affected({'clients': set(), 'programmes': set()}, model, pks, batch_size))
+
+
+def get_client_counters(client):
+    """Compteurs d'un client, calculés à la première lecture s'ils n'existent pas encore"""
+    counters = ClientCounters.objects.filter(client=client).first()
+    if counters is None:
+        # Les valeurs calculées sont celles de la base : rien n'a changé pour le tableau de bord
+        rebuild_clients([client.pk], invalidate=False)
+        counters = ClientCounters.objects.get(client=client)
+    return counters
+
+
+def get_programme_counters(programme):
+    """Compteurs d'un programme, calculés à la première lecture s'ils n'existent pas encore"""
+    counters = ProgrammeCounters.objects.filter(programme=programme).first()
+    if counters is None:
+        rebuild_programmes([programme.pk])
+        counters = ProgrammeCounters.objects.get(programme=programme)
+    return counters
+
+
+def sessions_by_status(counters):
+    return [
+        {'status': status, 'count': getattr(counters, f'sessions_{status}')}
+        for status in SESSION_STATUSES if getattr(counters, f'sessions_{status}')
+    ]
@@ -0,0 +1,136 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from ..models import Client, Programme, Sponsor, Session
+
+logger = logging.getLogger(__name__)
+
+STATS = ('hits', 'misses', 'stale')
+
+# Modèles dont l'écriture change le contenu du tableau de bord de leur client
+DASHBOARD_MODELS = (Client, Programme, Sponsor, Session)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 5 * 60)
+
+
+def is_stale_while_revalidate():
+    return getattr(settings, 'DASHBOARD_STALE_WHILE_REVALIDATE', False)
+
+
+def payload_key(client_id):
+    return f"dashboard:payload:{client_id}"
+
+
+def generation_key(client_id):
+    """Compteur incrémenté à chaque écriture qui touche le tableau de bord du client"""
+    return f"dashboard:generation:{client_id}"
+
+
+def refresh_key(client_id):
+    return f"dashboard:refresh:{client_id}"
+
+
+def stat_key(name):
+    return f"dashboard:stats:{name}"
+
+
+def incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Clé absente : la première écriture la crée, sans expiration
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_generation(client_id):
+    return cache.get(generation_key(client_id), 0)
+
+
+def invalidate(client_ids):
+    """
+    Périme le tableau de bord des clients donnés. Le rendu précédent reste en cache :
+    en mode stale-while-revalidate, il est encore servi pendant son recalcul.
+    """
+    for client_id in set(client_ids):
+        if client_id is not None:
+            incr(generation_key(client_id))
+
+
+def get_client_ids(model, objs):
+    """Clients concernés par des objets en mémoire, sans requête"""
+    if model is Client:
+        return {obj.pk for obj in objs}
+    return {obj.client_id for obj in objs}
+
+
+def get_dashboard(client_id, build):
+    """
+    Retourne le tableau de bord d'un client depuis le cache, ou le calcule avec `build()`.
+
+    Returns:
+        tuple: (contenu, 'hit', 'stale' ou 'miss')
+    """
+    entry = cache.get(payload_key(client_id))
+    generation = get_generation(client_id)
+    if entry is not None and entry['generation'] == generation:
+        incr(stat_key('hits'))
+        return entry['payload'], 'hit'
+    if entry is not None and is_stale_while_revalidate():
+        incr(stat_key('stale'))
+        schedule_refresh(client_id, build)
+        return entry['payload'], 'stale'
+    incr(stat_key('misses'))
+    return store(client_id, build, generation), 'miss'
+
+
+def store(client_id, build, generation):
+    """
+    Calcule et enregistre le tableau de bord. La génération est lue avant le calcul :
+    une écriture concurrente laisse donc le résultat périmé plutôt que faussement à jour.
+    """
+    payload = build()
+    cache.set(payload_key(client_id), {'generation': generation, 'payload': payload}, get_timeout())
+    return payload
+
+
+def get_executor():
+    """Thread du processus qui recalcule les tableaux de bord périmés"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard-refresh')
+    return _executor
+
+
+def schedule_refresh(client_id, build):
+    # Un seul recalcul à la fois par client, tous processus confondus
+    if cache.add(refresh_key(client_id), True, timeout=60):
+        get_executor().submit(refresh_in_worker, client_id, build)
+
+
+def refresh_in_worker(client_id, build):
+    try:
+        store(client_id, build, get_generation(client_id))
+    except Exception:
+        logger.exception("Dashboard refresh failed for client %s", client_id)
+    finally:
+        cache.delete(refresh_key(client_id))
+        connection.close()
+
+
+def get_stats():
+    """Compteurs de succès et d'échecs du cache, partagés par les processus qui utilisent le même cache"""
+    stats = {name: cache.get(stat_key(name), 0) for name in STATS}
+    total = sum(stats.values())
+    stats['hit_ratio'] = round((stats['hits'] + stats['stale']) / total, 4) if total else None
+    return stats
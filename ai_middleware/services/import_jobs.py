@@ -0,0 +1,152 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from ..models import ImportJob
+from .markdown_import import MarkdownImporter, iter_text_lines
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de threads du processus, créé au premier import asynchrone"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MARKDOWN_IMPORT_WORKERS', 2),
+                thread_name_prefix='markdown-import',
+            )
+    return _executor
+
+
+def get_stale_after():
+    return getattr(settings, 'MARKDOWN_IMPORT_STALE_AFTER', 15 * 60)
+
+
+def start_import_job(lines, dry_run=False, prune=False):
+    """
+    Recopie le document dans un fichier temporaire, enregistre un ImportJob et planifie
+    son exécution une fois la transaction validée.
+
+    Args:
+        lines: Itérable de lignes, par exemple `iter_text_lines(fichier)`
+
+    Returns:
+        ImportJob: Job en attente
+    """
+    total = 0
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.md', delete=False) as source:
+        for line in lines:
+            source.write(f"\n{line}" if total else line)
+            total += 1
+
+    job = ImportJob.objects.create(source=source.name, total=total, dry_run=dry_run, prune=prune)
+    transaction.on_commit(lambda: get_executor().submit(run_in_worker, job.pk))
+    return job
+
+
+def run_in_worker(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        # Chaque thread ouvre sa propre connexion : elle ne doit pas rester ouverte
+        connection.close()
+
+
+def run_import_job(job_id):
+    """Exécute un import et enregistre sa progression après chaque lot"""
+    job = ImportJob.objects.get(pk=job_id)
+    if job.status != 'pending':
+        # Déjà exécuté, ou marqué en échec par fail_interrupted_jobs ou fail_stale_jobs
+        return job
+    job.status = 'running'
+    job.save(update_fields=['status', 'updated_at'])
+
+    importer = MarkdownImporter(dry_run=job.dry_run, prune=job.prune)
+    try:
+        if job.dry_run or job.prune:
+            # Le changeset et les suppressions portent sur le document entier, lu ligne par ligne :
+            # la progression de l'analyse est enregistrée avant la transaction de l'import
+            def record_progress(lines):
+                job.processed = lines
+                job.save(update_fields=['processed', 'updated_at'])
+
+            with open(job.source, 'rb') as source:
+                result = importer.run_lines(iter_text_lines(source), on_progress=record_progress)
+            job.processed = job.total
+            job.errors = result.errors
+            job.result = {
+                'created': len(result.created),
+                'updated': len(result.updated),
+                'unchanged': len(result.unchanged),
+                'deleted': len(result.deleted),
+            }
+            if job.dry_run:
+                job.result['changes'] = result.changeset()
+        else:
+            with open(job.source, 'rb') as source:
+                for report in importer.run_stream(iter_text_lines(source)):
+                    job.processed = report['lines']
+                    job.result = {key: report[key] for key in ('created', 'updated', 'unchanged')}
+                    if report.get('done'):
+                        job.errors = report['errors']
+                    else:
+                        job.save(update_fields=['processed', 'result', 'updated_at'])
+        job.status = 'done'
+    except Exception as e:
+        logger.exception("Markdown import job %s failed", job.uuid)
+        job.status = 'failed'
+        job.result = {**(job.result or {}), 'error': str(e)}
+    finally:
+        job.save()
+        if os.path.exists(job.source):
+            os.remove(job.source)
+    return job
+
+
+def fail_interrupted_jobs():
+    """
+    Marque en échec tous les jobs en attente ou en cours. À appeler au démarrage du serveur,
+    avant que les workers ne lancent de nouveaux jobs : les threads qui exécutaient ces jobs
+    ont disparu avec l'ancien processus et leur fichier temporaire est perdu.
+
+    Returns:
+        int: Nombre de jobs marqués en échec
+    """
+    return fail_jobs(ImportJob.objects.filter(status__in=['pending', 'running']))
+
+
+def fail_stale_jobs():
+    """
+    Marque en échec les jobs en attente ou en cours dont la progression n'a pas été enregistrée
+    depuis MARKDOWN_IMPORT_STALE_AFTER secondes, par exemple ceux d'un worker tué en cours
+    d'exécution. Peut être appelé pendant que des imports tournent : un job en cours enregistre
+    sa progression pendant l'analyse et après chaque lot.
+
+    Returns:
+        int: Nombre de jobs marqués en échec
+    """
+    limit = timezone.now() - timedelta(seconds=get_stale_after())
+    return fail_jobs(ImportJob.objects.filter(status__in=['pending', 'running'], updated_at__lt=limit))
+
+
+def fail_jobs(queryset):
+    jobs = list(queryset)
+    for job in jobs:
+        job.status = 'failed'
+        job.result = {**(job.result or {}), 'error': "Import interrompu par l'arrêt du serveur"}
+        job.save(update_fields=['status', 'result', 'updated_at'])
+        if os.path.exists(job.source):
+            os.remove(job.source)
+    if jobs:
+        logger.warning("Marked %s interrupted markdown import jobs as failed", len(jobs))
+    return len(jobs)
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+from ..models import Client, Programme, Session, Sequence, BreakOut
+
+# Profondeur maximale de la hiérarchie : un sous-arbre peut être rendu de # à #####
+MAX_LEVEL = 5
+
+# Chemins vers les ancêtres de chaque modèle, du parent direct jusqu'au client
+ANCESTOR_PATHS = {
+    Client: [],
+    Programme: ['client'],
+    Session: ['programme', 'client'],
+    Sequence: ['session', 'session__programme', 'session__client'],
+    BreakOut: ['sequence', 'sequence__session', 'sequence__session__programme',
+               'sequence__session__client'],
+}
+
+
+def get_timeout():
+    return getattr(settings, 'MARKDOWN_CACHE_TIMEOUT', 60 * 60)
+
+
+def line_key(obj):
+    """Clé du rendu d'une ligne : change dès que l'objet est modifié"""
+    return f"markdown:line:{obj.uuid}:{obj.updated_at.timestamp()}"
+
+
+def subtree_key(obj_uuid, level):
+    """Clé du bloc rendu pour un sous-arbre complet à un niveau de titre donné"""
+    return f"markdown:subtree:{obj_uuid}:{level}"
+
+
+def get_ancestor_uuids(instance):
+    """
+    Retourne les UUID des ancêtres d'un objet tels qu'enregistrés en base, en une requête.
+    """
+    paths = ANCESTOR_PATHS.get(type(instance))
+    if not paths or instance.pk is None:
+        return []
+    row = type(instance).objects.filter(pk=instance.pk).values_list(
+        *[f'{path}__uuid' for path in paths]
+    ).first()
+    return [value for value in row or [] if value is not None]
+
+
+def invalidate(uuids):
+    """
+    Supprime les blocs de sous-arbre mis en cache pour les objets donnés.
+    Les lignes n'ont pas besoin d'être invalidées : leur clé dépend de updated_at.
+    """
+    keys = [
+        subtree_key(obj_uuid, level)
+        for obj_uuid in set(uuids)
+        for level in range(1, MAX_LEVEL + 1)
+    ]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_tree_path(instance):
+    """Invalide un objet et tous ses ancêtres"""
+    invalidate([instance.uuid, *get_ancestor_uuids(instance)])
+
+
+def invalidate_tree_paths(model, uuids):
+    """
+    Invalide un ensemble d'objets d'un même modèle et leurs ancêtres, en une requête.
+    À utiliser après des écritures en lot, qui ne déclenchent pas les signaux.
+    """
+    paths = ANCESTOR_PATHS.get(model, [])
+    related = set(uuids)
+    if paths:
+        rows = model.objects.filter(uuid__in=related).values_list(
+            *[f'{path}__uuid' for path in paths]
+        )
+        for row in rows:
+            related.update(value for value in row if value is not None)
+    invalidate(related)
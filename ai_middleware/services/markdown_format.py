@@ -0,0 +1,142 @@
+import hashlib
+import re
+from ..models import Client, Programme, Session, Sequence, BreakOut
+
+
+# Hiérarchie d'export : modèle parent -> (modèle enfant, clé étrangère vers le parent, tri)
+HIERARCHY = {
+    Client: (Programme, 'client', ('pk',)),
+    Programme: (Session, 'programme', ('pk',)),
+    Session: (Sequence, 'session', ('order', 'pk')),
+    Sequence: (BreakOut, 'sequence', ('pk',)),
+}
+
+# Champs exportés pour chaque type de modèle
+EXPORT_FIELDS = {
+    Client: ['name', 'context', 'objectives'],
+    Programme: ['name', 'description'],
+    Session: ['title', 'context', 'objectives', 'inputs', 'outputs',
+              'participants', 'design_principles', 'deliverables'],
+    Sequence: ['title', 'objective', 'input_text', 'output_text', 'order'],
+    BreakOut: ['title', 'description', 'objective'],
+}
+
+
+# Début d'un champ : **nom**: placé en début de texte ou après un espace
+FIELD_MARKER_RE = re.compile(r'\*\*(\w+)\*\*:')
+
+
+def escape_value(value):
+    """
+    Échappe une valeur exportée : `\\` devient `\\\\` et `*` devient `\\*`.
+    Une valeur échappée ne peut donc jamais contenir un marqueur de champ.
+    """
+    return value.replace('\\', '\\\\').replace('*', '\\*')
+
+
+def tokenize_fields(text, start=0):
+    """
+    Découpe `**champ**: valeur **champ2**: valeur2` en une seule passe, sans retour arrière.
+    Une valeur s'étend jusqu'au marqueur de champ suivant ; `\\*` et `\\\\` y sont
+    désechappés. Un `*` non échappé qui n'ouvre pas un marqueur est conservé tel quel,
+    pour les documents écrits à la main.
+
+    Returns:
+        list: Couples (nom, valeur) dans l'ordre du texte
+    """
+    fields = []
+    name, parts = None, []
+    length = len(text)
+    segment = scan = start
+    star = text.find('**', scan)
+    backslash = text.find('\\', scan)
+
+    while True:
+        if star != -1 and star < scan:
+            star = text.find('**', scan)
+        if backslash != -1 and backslash < scan:
+            backslash = text.find('\\', scan)
+
+        if backslash != -1 and (star == -1 or backslash < star):
+            if backslash + 1 < length and text[backslash + 1] in '\\*':
+                parts += [text[segment:backslash], text[backslash + 1]]
+                segment = backslash + 2
+            scan = backslash + 2
+            continue
+        if star == -1:
+            break
+
+        marker = FIELD_MARKER_RE.match(text, star)
+        if marker and (star == start or text[star - 1].isspace()):
+            if name is not None:
+                parts.append(text[segment:star])
+                fields.append((name, ''.join(parts).strip()))
+            name, parts = marker.group(1), []
+            segment = scan = marker.end()
+        else:
+            scan = star + 1
+
+    if name is not None:
+        parts.append(text[segment:])
+        fields.append((name, ''.join(parts).strip()))
+    return fields
+
+
+def tokenize_line(line):
+    """
+    Analyse une ligne `# [@Type::UUID] **champ**: valeur` sans expression régulière globale.
+
+    Returns:
+        tuple: (niveau, type, UUID, champs) ou None si la ligne ne déclare pas d'objet
+    """
+    line = line.strip()
+    body = line.lstrip('#')
+    level = len(line) - len(body)
+    if not level or not body[:1].isspace():
+        return None
+    body = body.lstrip()
+    if not body.startswith('[@'):
+        return None
+    separator = body.find('::', 2)
+    end = body.find(']', separator + 2) if separator != -1 else -1
+    if end == -1:
+        return None
+    model_name, obj_uuid = body[2:separator], body[separator + 2:end]
+    if not model_name.replace('_', 'a').isalnum() or obj_uuid.split() != [obj_uuid]:
+        return None
+    return level, model_name, obj_uuid, tokenize_fields(body, end + 1)
+
+
+def render_body(obj):
+    """
+    Génère le contenu d'une ligne Markdown, sans les marqueurs de niveau.
+    Format: [@Type::UUID] **champ**: valeur **champ2**: valeur2
+    """
+    line = f"[@{obj.__class__.__name__}::{str(obj.uuid)}] "
+
+    # Générer le contenu des champs sur la même ligne
+    for field in EXPORT_FIELDS.get(type(obj), []):
+        value = getattr(obj, field, None)
+        if value is not None:
+            # Nettoyer et formater la valeur
+            value = str(value).replace('\n', ' ').replace('\r', ' ')
+            value = re.sub(r'\s+', ' ', value).strip()
+            line += f"**{field}**: {escape_value(value)} "
+
+    return line.strip()
+
+
+def render_line(obj, level):
+    """
+    Génère la ligne Markdown d'un objet seul.
+    Format: # [@Type::UUID] **champ**: valeur **champ2**: valeur2
+    """
+    return f"{'#' * level} {render_body(obj)}\n"
+
+
+def content_fingerprint(obj):
+    """
+    Empreinte du contenu exporté d'un objet : deux objets dont les lignes Markdown
+    sont identiques ont la même empreinte.
+    """
+    return hashlib.md5(render_body(obj).encode('utf-8')).hexdigest()
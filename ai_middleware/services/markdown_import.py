@@ -0,0 +1,603 @@
+import codecs
+import logging
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from itertools import chain
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from . import counters, dashboard_cache, markdown_cache, ordering, search, uuid_registry
+from .markdown_format import HIERARCHY, EXPORT_FIELDS, content_fingerprint, tokenize_line
+from ..models import Client, Programme, Session, Sequence, BreakOut
+
+logger = logging.getLogger(__name__)
+
+# Modèles importables, dans l'ordre où ils doivent être écrits (parents avant enfants)
+IMPORT_MODELS = {
+    'Client': Client,
+    'Programme': Programme,
+    'Session': Session,
+    'Sequence': Sequence,
+    'BreakOut': BreakOut,
+}
+
+
+# Clés étrangères déduites de la position d'une ligne sous les titres qui la précèdent
+PARENT_FIELDS = {
+    Programme: ['client'],
+    Session: ['programme', 'client'],
+    Sequence: ['session'],
+    BreakOut: ['sequence'],
+}
+
+
+def get_batch_size():
+    return getattr(settings, 'MARKDOWN_IMPORT_BATCH_SIZE', 500)
+
+
+@dataclass
+class MarkdownRecord:
+    """Une ligne du document, analysée une seule fois"""
+    line_number: int
+    level: int
+    model: type
+    uuid: 'uuid.UUID' = None  # None pour [@Type::new]
+    fields: dict = field(default_factory=dict)
+    references: dict = field(default_factory=dict)  # nom de la clé étrangère -> UUID du parent
+    parents: dict = field(default_factory=dict)  # nom de la clé étrangère -> MarkdownRecord parent
+    position: int = 1  # rang parmi les lignes de même parent
+    children: int = 0  # nombre de lignes directement rattachées à celle-ci
+    instance: object = None  # objet créé ou mis à jour pour cette ligne
+
+
+@dataclass
+class ImportResult:
+    objects: list = field(default_factory=list)
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def details(self):
+        """Rapport au format renvoyé par MarkdownImportView"""
+        return {
+            'created': describe(self.created),
+            'updated': describe(self.updated),
+            'unchanged': describe(self.unchanged),
+        }
+
+    def changeset(self):
+        """Changements par UUID, tels que renvoyés par un import en dry_run"""
+        return {
+            'create': describe(self.created),
+            'update': describe(self.updated),
+            'unchanged': describe(self.unchanged),
+            'delete': describe(self.deleted),
+        }
+
+
+def describe(objs):
+    return [f"{obj.__class__.__name__} ({obj.uuid})" for obj in objs]
+
+
+def parse_line(line, line_number=0):
+    """
+    Analyse une ligne au format # [@Type::UUID] **champ**: valeur **champ2**: valeur2
+
+    Returns:
+        MarkdownRecord ou None si la ligne n'est pas une déclaration d'objet
+
+    Raises:
+        ValueError: Si l'UUID est invalide
+    """
+    tokens = tokenize_line(line)
+    if not tokens:
+        return None
+
+    level, model_name, obj_uuid, fields = tokens
+    model = IMPORT_MODELS.get(model_name)
+    if not model:
+        return None
+
+    record = MarkdownRecord(
+        line_number=line_number,
+        level=level,
+        model=model,
+        uuid=None if obj_uuid.lower() == 'new' else uuid.UUID(obj_uuid),
+    )
+    for field_name, value in fields:
+        if field_name.endswith('_id'):
+            record.references[field_name[:-3]] = value
+        else:
+            record.fields[field_name] = value
+    return record
+
+
+def parse_markdown(lines):
+    """
+    Analyse un document ligne par ligne, en une seule passe.
+    Le parent de chaque ligne est déduit du nombre de `#` grâce à la pile des titres ouverts :
+    une ligne de niveau N est rattachée aux lignes de niveau inférieur qui la précèdent.
+
+    Yields:
+        tuple: (numéro de ligne, MarkdownRecord ou None, message d'erreur ou None)
+    """
+    stack = []  # (niveau, MarkdownRecord ou None si la ligne est invalide)
+    root = MarkdownRecord(line_number=0, level=0, model=None)
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = parse_line(line, line_number)
+        except ValueError as e:
+            # Les descendants d'une ligne invalide ne sont rattachés à aucun parent
+            level = len(line.strip()) - len(line.strip().lstrip('#'))
+            close_headings(stack, level)
+            stack.append((level, None))
+            yield line_number, None, str(e)
+            continue
+        if record is None:
+            yield line_number, None, None
+            continue
+
+        close_headings(stack, record.level)
+        for name in PARENT_FIELDS.get(record.model, []):
+            related_model = record.model._meta.get_field(name).related_model
+            for _, ancestor in reversed(stack):
+                if ancestor is None:
+                    break
+                if ancestor.model is related_model:
+                    record.parents[name] = ancestor
+                    break
+
+        parent = (stack[-1][1] if stack else root) or root
+        parent.children += 1
+        record.position = parent.children
+        stack.append((record.level, record))
+        yield line_number, record, None
+
+
+def close_headings(stack, level):
+    """Retire de la pile les titres de niveau supérieur ou égal à `level`"""
+    while stack and stack[-1][0] >= level:
+        stack.pop()
+
+
+class MarkdownImporter:
+    """
+    Importe un document Markdown avec un nombre de requêtes qui ne dépend pas de sa taille :
+    une requête `uuid__in` par modèle pour résoudre les objets existants, puis des
+    `bulk_create`/`bulk_update` par lots de `batch_size` lignes.
+
+    Seules les lignes dont le contenu diffère de l'empreinte enregistrée (`fingerprint`)
+    sont réécrites. Avec `dry_run`, rien n'est écrit et le résultat décrit les changements
+    qui auraient été appliqués. Avec `prune`, les enfants enregistrés d'un objet du document
+    qui n'y figurent plus sont marqués comme supprimés.
+    """
+
+    def __init__(self, batch_size=None, dry_run=False, prune=False):
+        self.batch_size = batch_size or get_batch_size()
+        self.dry_run = dry_run
+        self.prune = prune
+
+    def run(self, markdown_text):
+        return self.run_lines(markdown_text.strip().split('\n'))
+
+    def run_lines(self, lines, on_progress=None):
+        """
+        Importe un document entier en une transaction, par exemple pour un changeset ou des
+        suppressions qui portent sur tout le document. L'analyse se fait avant la transaction.
+
+        Args:
+            lines: Itérable de lignes, par exemple `iter_text_lines(fichier)`
+            on_progress: Fonction appelée avec le nombre de lignes lues après chaque lot de
+                `batch_size` lignes, puis à la fin de l'analyse
+        """
+        result = ImportResult()
+        records = []
+        line_number = reported = 0
+        for line_number, record, error in parse_markdown(lines):
+            if error:
+                self.add_error(result, line_number, error)
+            elif record:
+                records.append(record)
+            if on_progress and line_number - reported >= self.batch_size:
+                on_progress(line_number)
+                reported = line_number
+        if on_progress:
+            on_progress(line_number)
+
+        with transaction.atomic():
+            self.import_records(records, result)
+            if self.prune or self.dry_run:
+                self.find_deleted(records, result)
+            if self.prune and not self.dry_run:
+                self.soft_delete(result.deleted)
+            return result
+
+    def run_stream(self, lines):
+        """
+        Importe un document de taille quelconque en le lisant ligne par ligne.
+        Chaque lot de `batch_size` lignes est écrit dans sa propre transaction, puis oublié :
+        la mémoire utilisée ne dépend pas de la taille du document.
+
+        Args:
+            lines: Itérable de lignes, par exemple `iter_text_lines(fichier)`
+
+        Yields:
+            dict: Progression après chaque lot, puis le résumé final avec 'done': True
+        """
+        progress = {'lines': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+        records = []
+        result = ImportResult()
+
+        for line_number, record, error in parse_markdown(lines):
+            progress['lines'] = line_number
+            if error:
+                self.add_error(result, line_number, error)
+            elif record:
+                records.append(record)
+            if len(records) >= self.batch_size:
+                self.flush(records, result, progress)
+                yield self.get_progress(progress)
+                records, result = [], ImportResult()
+
+        if records or result.errors:
+            self.flush(records, result, progress)
+        yield {**self.get_progress(progress), 'errors': progress['errors'], 'done': True}
+
+    def flush(self, records, result, progress):
+        with transaction.atomic():
+            self.import_records(records, result)
+        progress['created'] += len(result.created)
+        progress['updated'] += len(result.updated)
+        progress['unchanged'] += len(result.unchanged)
+        progress['errors'] += result.errors
+
+    def get_progress(self, progress):
+        return {
+            'lines': progress['lines'],
+            'created': progress['created'],
+            'updated': progress['updated'],
+            'unchanged': progress['unchanged'],
+            'errors': len(progress['errors']),
+        }
+
+    def import_records(self, records, result):
+        existing = self.resolve(records)
+        self.build(records, existing, result)
+        if not self.dry_run:
+            self.write(result)
+
+    def add_error(self, result, line_number, message):
+        logger.warning("Error processing markdown line %s: %s", line_number, message)
+        result.errors.append({'line': line_number, 'error': message})
+
+    def resolve(self, records):
+        """
+        Charge les objets déclarés et les parents référencés, en une requête par modèle.
+        Quand une ligne fournit exactement les champs exportés, seules la clé, l'empreinte
+        et les clés étrangères de l'objet sont lues : les longs champs texte restent en base.
+
+        Returns:
+            dict: Objets existants indexés par (modèle, UUID)
+        """
+        light = {model: set() for model in IMPORT_MODELS.values()}
+        full = {model: set() for model in IMPORT_MODELS.values()}
+        for record in records:
+            if record.uuid:
+                if set(record.fields) == set(EXPORT_FIELDS[record.model]):
+                    light[record.model].add(record.uuid)
+                else:
+                    full[record.model].add(record.uuid)
+            for name, value in record.references.items():
+                related_model = self.get_related_model(record.model, name)
+                if related_model in light:
+                    try:
+                        light[related_model].add(uuid.UUID(value))
+                    except ValueError:
+                        continue
+
+        existing = {}
+        for model in IMPORT_MODELS.values():
+            light_uuids = light[model] - full[model]
+            if light_uuids:
+                queryset = model.objects.filter(uuid__in=light_uuids).only(*self.get_light_fields(model))
+                for obj in queryset:
+                    existing[(model, obj.uuid)] = obj
+            if full[model]:
+                for obj in model.objects.filter(uuid__in=full[model]):
+                    existing[(model, obj.uuid)] = obj
+        return existing
+
+    def get_light_fields(self, model):
+        """Colonnes suffisantes pour comparer une ligne complète à l'objet enregistré"""
+        return ['uuid', 'fingerprint'] + (['order'] if model is Sequence else []) + [
+            model_field.attname for model_field in model._meta.concrete_fields
+            if model_field.is_relation
+        ]
+
+    def get_related_model(self, model, name):
+        try:
+            model_field = model._meta.get_field(name)
+        except Exception:
+            return None
+        return model_field.related_model if model_field.many_to_one else None
+
+    def build(self, records, existing, result):
+        """Applique les champs des lignes sur les instances, sans rien écrire en base"""
+        self.pending = {model: {'create': [], 'update': {}, 'fields': set()}
+                        for model in IMPORT_MODELS.values()}
+        seen = {}
+        touched = {}  # (modèle, pk) -> (objet existant, champs affectés)
+        orders = {}  # pk -> ordre enregistré des séquences existantes
+        self.auto_ordered = []  # nouvelles séquences sans ordre, dans une session existante
+        self.reordered = set()  # séquences existantes dont l'ordre change
+
+        for record in records:
+            declared = seen.get((record.model, record.uuid)) if record.uuid else None
+            obj = declared or existing.get((record.model, record.uuid))
+
+            if not record.fields and not record.references:
+                # Une ligne sans champ sert seulement de titre parent pour les lignes suivantes
+                record.instance = obj
+                continue
+
+            is_new = obj is None
+            if is_new:
+                obj = record.model(uuid=record.uuid or uuid.uuid4())
+            elif record.model is Sequence:
+                orders.setdefault(obj.pk, obj.order)
+
+            try:
+                changed = self.apply_fields(obj, record, existing, seen)
+            except ValidationError as e:
+                self.add_error(result, record.line_number, '; '.join(e.messages))
+                continue
+
+            if obj.pk is not None:
+                touched.setdefault((record.model, obj.pk), (obj, set()))[1].update(changed)
+            if declared is not None:
+                # Objet déjà déclaré plus haut dans le document : les champs sont fusionnés
+                record.instance = declared
+                continue
+
+            if is_new:
+                missing = self.missing_required_fields(obj)
+                if missing:
+                    self.add_error(result, record.line_number,
+                                   f"Missing required fields: {', '.join(missing)}")
+                    continue
+                obj.fingerprint = content_fingerprint(obj)
+                self.pending[record.model]['create'].append(obj)
+                result.created.append(obj)
+
+            seen[(record.model, obj.uuid)] = obj
+            record.instance = obj
+            result.objects.append(obj)
+
+        if self.auto_ordered and not self.dry_run:
+            # Les séquences ajoutées à une session existante sont placées à sa fin
+            for obj in self.auto_ordered:
+                obj.order = None
+            ordering.assign_sequence_orders(self.auto_ordered)
+            for obj in self.auto_ordered:
+                obj.fingerprint = content_fingerprint(obj)
+
+        # Les objets existants ne sont réécrits que si leur contenu a réellement changé
+        for (model, pk), (obj, changed) in touched.items():
+            fingerprint = content_fingerprint(obj)
+            other_changes = changed - {
+                model._meta.get_field(name).attname for name in EXPORT_FIELDS[model]
+            }
+            if fingerprint == obj.fingerprint and not other_changes:
+                result.unchanged.append(obj)
+                continue
+            if model is Sequence and obj.order != orders.get(pk):
+                self.reordered.add(pk)
+            obj.fingerprint = fingerprint
+            self.pending[model]['update'][pk] = obj
+            self.pending[model]['fields'].update(changed | {'fingerprint'})
+            result.updated.append(obj)
+
+    def apply_fields(self, obj, record, existing, seen):
+        """
+        Copie les valeurs converties des champs et des références parentes sur l'instance.
+        Les champs exportés sont toujours copiés, leur changement est détecté par l'empreinte ;
+        les autres champs ne sont retenus que si leur valeur diffère.
+
+        Returns:
+            set: Noms des colonnes affectées
+        """
+        changed = set()
+        export_fields = EXPORT_FIELDS[record.model]
+        for name, value in record.fields.items():
+            try:
+                model_field = record.model._meta.get_field(name)
+            except Exception:
+                continue
+            if (not model_field.concrete or model_field.is_relation
+                    or model_field.primary_key or name in ('uuid', 'fingerprint')):
+                continue
+            value = model_field.to_python(value)
+            if name in export_fields or obj.pk is None or getattr(obj, model_field.attname) != value:
+                setattr(obj, model_field.attname, value)
+                changed.add(model_field.attname)
+
+        for name, value in record.references.items():
+            related_model = self.get_related_model(record.model, name)
+            if related_model is None:
+                continue
+            try:
+                parent_uuid = uuid.UUID(value)
+            except ValueError:
+                raise ValidationError(f"Invalid UUID for {name}_id: {value}")
+            parent = seen.get((related_model, parent_uuid)) or existing.get((related_model, parent_uuid))
+            if parent is not None:
+                self.set_parent(obj, name, parent, changed)
+
+        # Les références explicites **parent_id** l'emportent sur la hiérarchie des titres
+        for name, parent_record in record.parents.items():
+            if name not in record.references and parent_record.instance is not None:
+                self.set_parent(obj, name, parent_record.instance, changed)
+
+        # Une nouvelle séquence sans ordre prend sa position sous sa session
+        if record.model is Sequence and obj.pk is None and obj.order is None:
+            obj.order = record.position * ordering.ORDER_GAP
+            if obj.session_id is not None:
+                self.auto_ordered.append(obj)
+        return changed
+
+    def set_parent(self, obj, name, parent, changed):
+        attname = f'{name}_id'
+        if parent.pk is None or getattr(obj, attname) != parent.pk:
+            setattr(obj, name, parent)
+            changed.add(attname)
+
+    def missing_required_fields(self, obj):
+        """Champs obligatoires sans valeur, qui feraient échouer tout le lot à l'insertion"""
+        missing = []
+        for model_field in obj._meta.concrete_fields:
+            if (model_field.primary_key or model_field.null or model_field.has_default()
+                    or getattr(model_field, 'auto_now', False)
+                    or getattr(model_field, 'auto_now_add', False)
+                    or (model_field.empty_strings_allowed and not model_field.is_relation)):
+                continue
+            if getattr(obj, model_field.attname) is not None:
+                continue
+            if model_field.is_relation and model_field.is_cached(obj):
+                continue
+            missing.append(model_field.name)
+        return missing
+
+    def write(self, result):
+        """Écrit les lots, parents d'abord pour que les enfants reçoivent leurs clés étrangères"""
+        now = timezone.now()
+        affected = {'clients': set(), 'programmes': set()}
+        dashboard_clients = set()
+        for model in IMPORT_MODELS.values():
+            pending = self.pending[model]
+            recount = model in counters.COUNTED_MODELS
+            if recount and pending['update'] and counters.touches_counters(model, pending['fields']):
+                # Anciens parents des objets déplacés, avant leur écriture
+                counters.collect_affected(affected, model, pending['update'], self.batch_size)
+            else:
+                recount = recount and bool(pending['create'])
+            if model is Sequence:
+                # Libère les ordres modifiés avant toute écriture, pour que la contrainte
+                # (session, order) tienne pendant les insertions et la mise à jour en lot
+                ordering.release_orders(self.reordered & pending['update'].keys())
+            if pending['create']:
+                model.objects.bulk_create(pending['create'], batch_size=self.batch_size)
+                uuid_registry.register_many(model, pending['create'], batch_size=self.batch_size)
+            if pending['update']:
+                objs = list(pending['update'].values())
+                for obj in objs:
+                    obj.updated_at = now
+                model.objects.bulk_update(
+                    objs, sorted(pending['fields'] | {'updated_at'}), batch_size=self.batch_size
+                )
+
+            # Les écritures en lot ne déclenchent pas les signaux des modèles
+            written = [obj.uuid for obj in pending['create']]
+            written += [obj.uuid for obj in pending['update'].values()]
+            if written:
+                markdown_cache.invalidate_tree_paths(model, written)
+            if pending['create']:
+                search.index(pending['create'], batch_size=self.batch_size)
+            if pending['update'] and search.touches_index(model, pending['fields']):
+                # Les objets mis à jour peuvent n'avoir chargé que les champs importés
+                search.index_pks(model, list(pending['update']), self.batch_size)
+            if recount:
+                pks = [obj.pk for obj in pending['create']] + list(pending['update'])
+                counters.collect_affected(affected, model, pks, self.batch_size)
+            if model in dashboard_cache.DASHBOARD_MODELS:
+                dashboard_clients |= dashboard_cache.get_client_ids(
+                    model, pending['create'] + list(pending['update'].values())
+                )
+        counters.rebuild_affected(affected)
+        dashboard_cache.invalidate(dashboard_clients)
+
+    def find_deleted(self, records, result):
+        """
+        Recherche les enfants enregistrés des objets du document qui n'y figurent plus,
+        en une requête par niveau limitée aux parents présents dans le document.
+        """
+        imported = {(type(record.instance), record.instance.uuid)
+                    for record in records if record.instance is not None}
+        for parent_model, (child_model, fk, _) in HIERARCHY.items():
+            parent_ids = {record.instance.pk for record in records
+                          if record.model is parent_model and record.instance is not None
+                          and record.instance.pk is not None}
+            if not parent_ids:
+                continue
+            stored = child_model.objects.filter(
+                **{f'{fk}__in': parent_ids}, status='normal'
+            ).only('uuid')
+            result.deleted += [child for child in stored
+                               if (child_model, child.uuid) not in imported]
+
+    def soft_delete(self, objs):
+        by_model = {}
+        for obj in objs:
+            by_model.setdefault(type(obj), []).append(obj.uuid)
+        affected = {'clients': set(), 'programmes': set()}
+        for model, uuids in by_model.items():
+            markdown_cache.invalidate_tree_paths(model, uuids)
+            model.objects.filter(uuid__in=uuids).update(status='deleted', updated_at=timezone.now())
+            search.set_status(uuids, 'deleted')
+            if model is Session:
+                # Seul le statut des sessions est compté
+                pks = Session.objects.filter(uuid__in=uuids).values_list('pk', flat=True)
+                counters.collect_affected(affected, model, pks, self.batch_size)
+            elif model in dashboard_cache.DASHBOARD_MODELS:
+                dashboard_cache.invalidate(
+                    model.objects.filter(uuid__in=uuids).values_list('client_id', flat=True)
+                )
+        counters.rebuild_affected(affected)
+
+
+def iter_text_lines(stream, chunk_size=64 * 1024):
+    """
+    Lit un flux binaire UTF-8, éventuellement compressé en gzip, et produit ses lignes.
+    Le flux est lu par blocs de `chunk_size` octets, sans jamais être chargé entièrement.
+    """
+    chunks = iter(lambda: stream.read(chunk_size), b'')
+    first = next(chunks, b'')
+    chunks = chain([first], chunks)
+    if first[:2] == b'\x1f\x8b':
+        chunks = iter_gunzip(chunks, chunk_size)
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        yield from lines
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_gunzip(chunks, chunk_size):
+    """Décompresse des blocs gzip sans produire de bloc plus grand que `chunk_size`"""
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk, chunk_size)
+            chunk = decompressor.unconsumed_tail
+    yield decompressor.flush()
+
+
+def import_markdown(markdown_text, batch_size=None, dry_run=False, prune=False):
+    """
+    Crée ou met à jour des objets à partir d'un texte Markdown.
+
+    Returns:
+        ImportResult: Objets traités, créés, mis à jour, inchangés, supprimés et erreurs par ligne
+    """
+    return MarkdownImporter(batch_size=batch_size, dry_run=dry_run, prune=prune).run(markdown_text)
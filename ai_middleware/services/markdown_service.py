@@ -1,14 +1,123 @@
-import re
-import uuid
-from django.db.models import Q
-from django.db import transaction
+from itertools import islice
+from django.core.cache import cache
+from . import markdown_cache
+from .markdown_format import HIERARCHY, EXPORT_FIELDS, render_body, render_line
+from .markdown_import import import_markdown
 from ..models import Client, Programme, Session, Sequence, BreakOut
 
+# Nombre d'enfants chargés par lot lors d'un export en streaming
+STREAM_BATCH_SIZE = 100
+
+
+def load_tree(roots):
+    """
+    Charge en mémoire tous les descendants des objets racines.
+    Une seule requête est émise par niveau de la hiérarchie et par type de racine,
+    quel que soit le nombre d'objets dans le sous-arbre.
+
+    Args:
+        roots (list): Instances racines (Client, Programme, Session, Sequence ou BreakOut)
+
+    Returns:
+        dict: Enfants ordonnés indexés par (modèle parent, pk parent)
+    """
+    children = {}
+    for root_model in EXPORT_FIELDS:
+        # Une racine déjà chargée comme descendant d'une autre n'est pas rechargée
+        root_ids = {
+            root.pk for root in roots
+            if type(root) is root_model and (root_model, root.pk) not in children
+        }
+        if not root_ids:
+            continue
+        for pk in root_ids:
+            children[(root_model, pk)] = []
+
+        parent_model = root_model
+        path = []
+        while parent_model in HIERARCHY:
+            child_model, fk, ordering = HIERARCHY[parent_model]
+            path.insert(0, fk)
+            lookup = '__'.join(path) + '__in'
+            queryset = child_model.objects.filter(**{lookup: root_ids}).order_by(*ordering)
+            for child in queryset:
+                children.setdefault((parent_model, getattr(child, f'{fk}_id')), []).append(child)
+                children.setdefault((child_model, child.pk), [])
+            parent_model = child_model
+
+    return children
+
+
+def get_ancestors(obj):
+    """
+    Retourne les ancêtres d'un objet avec leur niveau de titre, en une seule requête.
+
+    Returns:
+        list: Liste de tuples (ancêtre, niveau) du Client jusqu'au parent direct
+    """
+    if isinstance(obj, Session):
+        obj = Session.objects.select_related('client', 'programme').get(pk=obj.pk)
+        chain = [(obj.client, 1), (obj.programme, 2)]
+    elif isinstance(obj, Sequence):
+        obj = Sequence.objects.select_related(
+            'session__client', 'session__programme'
+        ).get(pk=obj.pk)
+        session = obj.session
+        chain = [(session.client, 1), (session.programme, 2), (session, 3)]
+    elif isinstance(obj, BreakOut):
+        obj = BreakOut.objects.select_related(
+            'sequence__session__client', 'sequence__session__programme'
+        ).get(pk=obj.pk)
+        session = obj.sequence.session
+        chain = [(session.client, 1), (session.programme, 2), (session, 3), (obj.sequence, 4)]
+    else:
+        chain = []
+    return [(ancestor, level) for ancestor, level in chain if ancestor is not None]
+
+
+def render_line_cached(obj, level):
+    """Comme `render_line`, en réutilisant le rendu mis en cache pour cette version de l'objet"""
+    key = markdown_cache.line_key(obj)
+    body = cache.get(key)
+    if body is None:
+        body = render_body(obj)
+        cache.set(key, body, markdown_cache.get_timeout())
+    return f"{'#' * level} {body}\n"
+
+
+def render_subtree_cached(obj, level, children):
+    """
+    Rend un sous-arbre déjà chargé par `load_tree` en réutilisant les blocs mis en cache.
+    Seuls les sous-arbres invalidés depuis le dernier rendu sont recalculés.
+    """
+    key = markdown_cache.subtree_key(obj.uuid, level)
+    block = cache.get(key)
+    if block is None:
+        block = render_line_cached(obj, level) + ''.join(
+            render_subtree_cached(child, level + 1, children)
+            for child in children.get((type(obj), obj.pk), [])
+        )
+        cache.set(key, block, markdown_cache.get_timeout())
+    return block
+
+
+def iter_subtree(obj, level, children):
+    """
+    Parcourt un sous-arbre déjà chargé par `load_tree` et produit ses lignes Markdown.
+    """
+    yield render_line(obj, level)
+    for child in children.get((type(obj), obj.pk), []):
+        yield from iter_subtree(child, level + 1, children)
+
 
 def to_markdown(obj, export_related=True, level=1, initial_level=1):
     """
     Convertit un objet en format Markdown sur une seule ligne avec ses parents et enfants.
     Format: # [@Type::UUID] **champ**: valeur **champ2**: valeur2
+
+    Le sous-arbre complet est chargé avec un nombre fixe de requêtes (une par niveau),
+    puis assemblé en mémoire. Les lignes et les sous-arbres rendus sont mis en cache
+    et invalidés par les signaux des modèles (voir `markdown_cache`).
     
     Args:
         obj: Instance de modèle Django à convertir
@@ -19,88 +128,89 @@ def to_markdown(obj, export_related=True, level=1, initial_level=1):
     Returns:
         str: Représentation Markdown de l'objet, ses parents et ses enfants
     """
-    model_name = obj.__class__.__name__
-    markdown = ""
-    
-    # Si ce n'est pas l'objet initial, adapter le niveau
-    is_parent = level < initial_level
-    
-    # Générer les parents d'abord si c'est l'objet initial
-    if level == initial_level:
-        if isinstance(obj, Session):
-            if obj.client:
-                markdown += to_markdown(obj.client, level=1, initial_level=initial_level)
-            if obj.programme:
-                markdown += to_markdown(obj.programme, level=2, initial_level=initial_level)
-        elif isinstance(obj, Sequence):
-            if obj.session and obj.session.client:
-                markdown += to_markdown(obj.session.client, level=1, initial_level=initial_level)
-            if obj.session and obj.session.programme:
-                markdown += to_markdown(obj.session.programme, level=2, initial_level=initial_level)
-            if obj.session:
-                markdown += to_markdown(obj.session, level=3, initial_level=initial_level)
-        elif isinstance(obj, BreakOut):
-            if obj.sequence and obj.sequence.session and obj.sequence.session.client:
-                markdown += to_markdown(obj.sequence.session.client, level=1, initial_level=initial_level)
-            if obj.sequence and obj.sequence.session and obj.sequence.session.programme:
-                markdown += to_markdown(obj.sequence.session.programme, level=2, initial_level=initial_level)
-            if obj.sequence and obj.sequence.session:
-                markdown += to_markdown(obj.sequence.session, level=3, initial_level=initial_level)
-            if obj.sequence:
-                markdown += to_markdown(obj.sequence, level=4, initial_level=initial_level)
-    
-    # Générer la ligne pour l'objet actuel
-    hashes = '#' * level
-    line = f"{hashes} [@{model_name}::{str(obj.uuid)}] "
-    
-    # Définir les champs à exporter pour chaque type de modèle
+    # Un objet parent n'exporte que sa propre ligne
+    if level < initial_level:
+        return render_line(obj, level)
+
+    sections = get_export_sections(obj, level, initial_level)
+
+    # Un export déjà rendu ne coûte que des lectures du cache
+    keys = [markdown_cache.subtree_key(section.uuid, section_level)
+            for section, section_level in sections]
+    blocks = cache.get_many(keys)
+    missing = [section for (section, _), key in zip(sections, keys) if key not in blocks]
+    children = load_tree(missing) if missing else {}
+
+    return ''.join(
+        blocks[key] if key in blocks else render_subtree_cached(section, section_level, children)
+        for (section, section_level), key in zip(sections, keys)
+    )
+
+
+def get_export_sections(obj, level=1, initial_level=1):
+    """
+    Retourne les sous-arbres à exporter pour un objet, dans l'ordre du document.
+    Les parents de l'objet initial sont exportés avec leurs propres enfants.
+
+    Returns:
+        list: Liste de tuples (objet racine du sous-arbre, niveau)
+    """
+    sections = get_ancestors(obj) if level == initial_level else []
+    sections.append((obj, level))
+    return sections
+
+
+def iter_markdown(obj, batch_size=STREAM_BATCH_SIZE):
+    """
+    Produit le même document que `to_markdown`, ligne par ligne, sans le construire en mémoire.
+    Les enfants sont lus par curseur côté serveur et leurs sous-arbres chargés par lots,
+    de sorte que la mémoire utilisée dépend de `batch_size` et non de la taille de l'export.
+
+    Args:
+        obj: Instance de modèle Django à convertir
+        batch_size (int): Nombre d'enfants chargés avec leur sous-arbre à chaque lot
+
+    Yields:
+        str: Lignes Markdown terminées par un saut de ligne
+    """
+    for section, level in get_export_sections(obj):
+        yield from iter_subtree_streaming(section, level, batch_size)
+
+
+def iter_subtree_streaming(obj, level, batch_size=STREAM_BATCH_SIZE):
+    """
+    Parcourt le sous-arbre d'un objet en lisant ses enfants par curseur.
+    """
+    yield render_line(obj, level)
+    if type(obj) not in HIERARCHY:
+        return
+
+    child_model, fk, ordering = HIERARCHY[type(obj)]
+    queryset = child_model.objects.filter(**{fk: obj}).order_by(*ordering)
+    rows = queryset.iterator(chunk_size=batch_size)
+
     if isinstance(obj, Client):
-        fields = ['name', 'context', 'objectives']
-    elif isinstance(obj, Programme):
-        fields = ['name', 'description']
-    elif isinstance(obj, Session):
-        fields = ['title', 'context', 'objectives', 'inputs', 'outputs',
-                 'participants', 'design_principles', 'deliverables']
-    elif isinstance(obj, Sequence):
-        fields = ['title', 'objective', 'input_text', 'output_text', 'order']
-    elif isinstance(obj, BreakOut):
-        fields = ['title', 'description', 'objective']
-    else:
-        fields = []
-    
-    # Générer le contenu des champs sur la même ligne
-    for field in fields:
-        value = getattr(obj, field, None)
-        if value is not None:
-            # Nettoyer et formater la valeur
-            value = str(value).replace('\n', ' ').replace('\r', ' ')
-            value = re.sub(r'\s+', ' ', value).strip()
-            line += f"**{field}**: {value} "
-    
-    markdown += line.strip() + '\n'
-    
-    # Gérer les enfants si c'est l'objet initial ou un parent
-    if level >= initial_level:
-        if isinstance(obj, Client):
-            for prog in Programme.objects.filter(client=obj):
-                markdown += to_markdown(prog, level=level+1, initial_level=initial_level)
-        elif isinstance(obj, Programme):
-            for session in Session.objects.filter(programme=obj):
-                markdown += to_markdown(session, level=level+1, initial_level=initial_level)
-        elif isinstance(obj, Session):
-            for sequence in Sequence.objects.filter(session=obj).order_by('order'):
-                markdown += to_markdown(sequence, level=level+1, initial_level=initial_level)
-        elif isinstance(obj, Sequence):
-            for breakout in BreakOut.objects.filter(sequence=obj):
-                markdown += to_markdown(breakout, level=level+1, initial_level=initial_level)
-    
-    return markdown
+        # Les programmes sont peu nombreux : chacun est parcouru séparément
+        # pour que ses sessions soient elles aussi lues par lots
+        for child in rows:
+            yield from iter_subtree_streaming(child, level + 1, batch_size)
+        return
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        children = load_tree(batch)
+        for child in batch:
+            yield from iter_subtree(child, level + 1, children)
 
 
 def from_markdown(markdown_text):
     """
     Crée ou met à jour des objets à partir d'un texte Markdown.
     Format attendu: # [@Type::UUID] **champ**: valeur **champ2**: valeur2
+
+    L'import est délégué à `MarkdownImporter`, qui écrit par lots.
     
     Args:
         markdown_text (str): Texte Markdown à convertir
@@ -108,83 +218,13 @@ def from_markdown(markdown_text):
     Returns:
         list: Liste des objets créés ou mis à jour
     """
-    with transaction.atomic():
-        objects = []
-        model_objects = {}
-        lines = [line.strip() for line in markdown_text.strip().split('\n') if line.strip()]
-
-        # Première passe : Créer ou mettre à jour les objets
-        for line in lines:
-            header_match = re.match(r'^#+\s+\[@(\w+)::(\S+?)\]\s*(.+)?$', line)
-            if not header_match:
-                continue
-
-            model_name, obj_uuid, fields_text = header_match.groups()
-            model_class = globals().get(model_name)
-            if not model_class or not fields_text:
-                continue
-
-            # Extraire les champs
-            fields = {}
-            for match in re.finditer(r'\*\*(\w+)\*\*:\s*([^*]+?)(?=\s+\*\*|$)', fields_text):
-                field_name, value = match.groups()
-                fields[field_name] = value.strip()
-
-            # Créer ou mettre à jour l'objet
-            try:
-                if obj_uuid.lower() == 'new':
-                    fields['uuid'] = uuid.uuid4()
-                    obj = model_class.objects.create(**fields)
-                else:
-                    uuid_obj = uuid.UUID(obj_uuid)
-                    obj = model_class.objects.filter(uuid=uuid_obj).first()
-                    if obj:
-                        for field, value in fields.items():
-                            if hasattr(obj, field) and not field.endswith('_id'):
-                                setattr(obj, field, value)
-                        obj.save()
-                    else:
-                        fields['uuid'] = uuid_obj
-                        obj = model_class.objects.create(**fields)
-
-                model_objects[str(obj.uuid)] = obj
-                objects.append(obj)
-
-            except (ValueError, AttributeError) as e:
-                print(f"Error processing line: {line} - {str(e)}")
-                continue
-
-        # Deuxième passe : Établir les relations
-        for line in lines:
-            header_match = re.match(r'^#+\s+\[@(\w+)::(\S+?)\]\s*(.+)?$', line)
-            if not header_match:
-                continue
-
-            model_name, obj_uuid, fields_text = header_match.groups()
-            if obj_uuid in model_objects:
-                obj = model_objects[obj_uuid]
-                relationships = {}
-                for match in re.finditer(r'\*\*(\w+)\*\*:\s*([^*]+?)(?=\s+\*\*|$)', fields_text):
-                    field_name, value = match.groups()
-                    if field_name.endswith('_id'):
-                        related_name = field_name[:-3]
-                        relationships[related_name] = value.strip()
-
-                # Mettre à jour les relations
-                if isinstance(obj, Session):
-                    if 'client' in relationships and relationships['client'] in model_objects:
-                        obj.client = model_objects[relationships['client']]
-                        obj.save()
-                    if 'programme' in relationships and relationships['programme'] in model_objects:
-                        obj.programme = model_objects[relationships['programme']]
-                        obj.save()
-
-        return objects
+    return import_markdown(markdown_text).objects
 
 
 def create_objects_from_markdown(markdown_text):
     """
     Crée des objets à partir d'un texte Markdown en respectant l'ordre hiérarchique.
+    Les parents sont déduits des niveaux de titre lors de l'import.
     
     Args:
         markdown_text (str): Texte Markdown à convertir
@@ -192,48 +232,16 @@ def create_objects_from_markdown(markdown_text):
     Returns:
         dict: Dictionnaire des objets créés
     """
-    lines = markdown_text.strip().split('\n')
+    objects = from_markdown(markdown_text)
     created_objects = {}
-    
-    # Identifier les lignes par type
-    client_line = next((l for l in lines if '[@Client::' in l), None)
-    programme_line = next((l for l in lines if '[@Programme::' in l), None)
-    session_line = next((l for l in lines if '[@Session::' in l), None)
-    sequence_lines = [l for l in lines if '[@Sequence::' in l]
-    breakout_lines = [l for l in lines if '[@BreakOut::' in l]
-    
-    # Créer les objets dans l'ordre
-    if client_line:
-        client = from_markdown(client_line)[0]
-        created_objects['client'] = client
-        
-        if programme_line:
-            # Ajouter la référence au client
-            programme_line = programme_line.strip() + f" **client_id**: {str(client.uuid)}"
-            programme = from_markdown(programme_line)[0]
-            created_objects['programme'] = programme
-            
-            if session_line:
-                # Ajouter les références au client et au programme
-                session_line = session_line.strip() + f" **client_id**: {str(client.uuid)} **programme_id**: {str(programme.uuid)}"
-                session = from_markdown(session_line)[0]
-                created_objects['session'] = session
-                
-                # Créer les séquences
-                sequences = []
-                for i, seq_line in enumerate(sequence_lines):
-                    seq_line = seq_line.strip() + f" **session_id**: {str(session.uuid)} **order**: {i+1}"
-                    sequence = from_markdown(seq_line)[0]
-                    sequences.append(sequence)
-                created_objects['sequences'] = sequences
-                
-                # Créer les breakouts
-                breakouts = []
-                for i, break_line in enumerate(breakout_lines):
-                    sequence = sequences[i // 2]
-                    break_line = break_line.strip() + f" **sequence_id**: {str(sequence.uuid)}"
-                    breakout = from_markdown(break_line)[0]
-                    breakouts.append(breakout)
-                created_objects['breakouts'] = breakouts
-    
-    return created_objects
\ No newline at end of file
+
+    for key, model in [('client', Client), ('programme', Programme), ('session', Session)]:
+        first = next((obj for obj in objects if isinstance(obj, model)), None)
+        if first is not None:
+            created_objects[key] = first
+
+    if 'session' in created_objects:
+        created_objects['sequences'] = [obj for obj in objects if isinstance(obj, Sequence)]
+        created_objects['breakouts'] = [obj for obj in objects if isinstance(obj, BreakOut)]
+
+    return created_objects
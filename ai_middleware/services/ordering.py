@@ -0,0 +1,172 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from . import markdown_cache
+from .markdown_format import content_fingerprint
+from ..models import Session, Sequence
+
+# Écart entre deux séquences consécutives : déplacer une séquence ne réécrit qu'elle, tant
+# qu'il reste une valeur libre entre ses nouvelles voisines
+ORDER_GAP = 1024
+
+
+def allocate_sequence_orders(counts):
+    """
+    Réserve des ordres de séquence à la fin de chaque session, espacés de ORDER_GAP.
+
+    Un seul UPDATE avance le compteur de toutes les sessions du lot : il verrouille leurs lignes,
+    donc deux requêtes concurrentes reçoivent des blocs distincts. Le compteur ne descend jamais
+    sous le plus grand ordre existant, pour tenir compte des ordres saisis explicitement.
+
+    Args:
+        counts: Nombre d'ordres à réserver par identifiant de session
+
+    Returns:
+        dict: Ordres réservés (range) par identifiant de session
+    """
+    counts = {session_id: n for session_id, n in counts.items() if n}
+    if not counts:
+        return {}
+
+    max_order = (
+        Sequence.objects.filter(session_id=OuterRef('pk'))
+        .values('session_id')
+        .annotate(max_order=Max('order'))
+        .values('max_order')
+    )
+    with transaction.atomic():
+        Session.objects.filter(pk__in=counts).update(
+            last_sequence_order=Greatest(
+                F('last_sequence_order'),
+                Coalesce(Subquery(max_order, output_field=IntegerField()), Value(0)),
+            ) + Case(
+                *[When(pk=session_id, then=Value(n * ORDER_GAP)) for session_id, n in counts.items()],
+                output_field=IntegerField(),
+            )
+        )
+        last_orders = dict(
+            Session.objects.filter(pk__in=counts).values_list('pk', 'last_sequence_order')
+        )
+    return {
+        session_id: range(last_orders[session_id] - (n - 1) * ORDER_GAP, last_orders[session_id] + 1, ORDER_GAP)
+        for session_id, n in counts.items() if session_id in last_orders
+    }
+
+
+def assign_sequence_orders(sequences):
+    """Attribue des ordres à la fin de leur session aux séquences qui n'en ont pas, dans l'ordre donné"""
+    counts = {}
+    for sequence in sequences:
+        if sequence.order is None:
+            counts[sequence.session_id] = counts.get(sequence.session_id, 0) + 1
+    next_orders = {
+        session_id: iter(orders) for session_id, orders in allocate_sequence_orders(counts).items()
+    }
+    for sequence in sequences:
+        if sequence.order is None and sequence.session_id in next_orders:
+            sequence.order = next(next_orders[sequence.session_id])
+
+
+def release_orders(pks):
+    """
+    Libère les ordres de séquences qui vont être renumérotées, en leur donnant une valeur
+    négative unique : une mise à jour en lot ne heurte plus la contrainte (session, order).
+    """
+    if pks:
+        Sequence.objects.filter(pk__in=pks).update(order=-F('pk'))
+
+
+def order_between(before, after):
+    """
+    Ordre libre strictement entre deux voisines, ou None s'il n'en reste pas.
+    `before` vaut None en tête de session, `after` vaut None en fin de session.
+    """
+    low = before if before is not None else 0
+    if after is None:
+        return low + ORDER_GAP
+    middle = (low + after) // 2
+    return middle if low < middle < after else None
+
+
+def lock_session(session_id):
+    """
+    Verrouille la ligne de la session jusqu'à la fin de la transaction : les déplacements
+    concurrents de ses séquences s'exécutent l'un après l'autre, chacun lisant les ordres
+    laissés par le précédent. À appeler dans une transaction.
+    """
+    list(Session.objects.select_for_update().filter(pk=session_id).values_list('pk', flat=True))
+
+
+def move_sequence(sequence, position):
+    """
+    Place une séquence à la position donnée (à partir de 1) parmi celles de sa session.
+
+    Dans le cas courant, seule la séquence déplacée est réécrite, avec un ordre pris entre ses
+    nouvelles voisines. S'il n'y a plus de place entre elles, toute la session est renumérotée.
+    À appeler dans une transaction : la session reste verrouillée jusqu'à sa fin.
+    """
+    # Sans verrou, deux déplacements simultanés peuvent calculer le même ordre libre
+    lock_session(sequence.session_id)
+    siblings = Sequence.objects.filter(session_id=sequence.session_id).exclude(pk=sequence.pk)
+    position = max(position, 1)
+    neighbours = list(
+        siblings.order_by('order').values_list('order', flat=True)[max(position - 2, 0):position]
+    )
+    if position == 1:
+        before, after = None, (neighbours[0] if neighbours else None)
+    else:
+        before = neighbours[0] if neighbours else None
+        after = neighbours[1] if len(neighbours) > 1 else None
+        if before is None:
+            # Position au-delà de la fin : la séquence est placée en dernier
+            before = siblings.aggregate(max_order=Max('order'))['max_order']
+
+    order = order_between(before, after)
+    if order is None:
+        pks = list(siblings.order_by('order').values_list('pk', flat=True))
+        pks.insert(position - 1, sequence.pk)
+        moved = next(obj for obj in apply_sequence_order(sequence.session_id, pks) if obj.pk == sequence.pk)
+        sequence.order, sequence.updated_at = moved.order, moved.updated_at
+        return
+    if order != sequence.order:
+        sequence.order = order
+        sequence.save(update_fields=['order', 'fingerprint', 'updated_at'])
+
+
+def apply_sequence_order(session_id, pks):
+    """
+    Renumérote les séquences d'une session dans l'ordre donné, en un seul UPDATE.
+
+    Les nouveaux ordres sont pris dans une plage disjointe des ordres actuels (sous le plus petit
+    s'il y a la place, sinon au-dessus du plus grand) : aucune ligne ne heurte la contrainte
+    (session, order) pendant la mise à jour, et les valeurs restent bornées d'un appel à l'autre.
+
+    Args:
+        session_id: Session dont toutes les séquences sont listées, verrouillée jusqu'à la fin
+            de la transaction en cours
+        pks: Clés primaires des séquences, dans le nouvel ordre
+
+    Returns:
+        list: Séquences renumérotées, dans le nouvel ordre
+    """
+    lock_session(session_id)
+    sequences = Sequence.objects.filter(session_id=session_id, pk__in=pks).in_bulk()
+    sequences = [sequences[pk] for pk in pks if pk in sequences]
+    if not sequences:
+        return []
+    orders = [sequence.order for sequence in sequences]
+    span = len(sequences) * ORDER_GAP
+    start = ORDER_GAP if min(orders) > span else max(orders) + ORDER_GAP
+
+    now = timezone.now()
+    for index, sequence in enumerate(sequences):
+        sequence.order = start + index * ORDER_GAP
+        # Les écritures en lot ne déclenchent pas les signaux des modèles
+        sequence.fingerprint = content_fingerprint(sequence)
+        sequence.updated_at = now
+    # bulk_update écrit les lignes en une instruction UPDATE ... CASE (par lot si la base limite
+    # le nombre de paramètres)
+    Sequence.objects.bulk_update(sequences, ['order', 'fingerprint', 'updated_at'])
+    markdown_cache.invalidate_tree_paths(Sequence, [sequence.uuid for sequence in sequences])
+    return sequences
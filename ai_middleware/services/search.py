@@ -0,0 +1,280 @@
+import logging
+import re
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from ..models import Client, Programme, Session, Sequence, BreakOut, SearchEntry, UuidIndex
+
+logger = logging.getLogger(__name__)
+
+# Champs indexés par modèle : (titre, champs du corps)
+SEARCH_FIELDS = {
+    Client: ('name', ['context', 'objectives']),
+    Programme: ('name', ['description']),
+    Session: ('title', ['context', 'objectives']),
+    Sequence: ('title', ['objective']),
+    BreakOut: ('title', ['description', 'objective']),
+}
+INDEXED_MODELS = {model.__name__: model for model in SEARCH_FIELDS}
+
+# Annotation posée par filter_queryset : rang de l'objet dans les résultats, à partir de 0
+POSITION = 'search_position'
+
+# Nombre maximal de mots retenus dans une requête
+MAX_TERMS = 10
+
+TABLE = SearchEntry._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+UUID_TABLE = UuidIndex._meta.db_table
+
+TERM_RE = re.compile(r'\w+')
+
+
+def get_max_results():
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+
+def get_terms(query):
+    """Mots de la requête : la ponctuation et les opérateurs sont ignorés"""
+    return TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+
+class Hit:
+    """Résultat d'une recherche, plus pertinent quand `score` est plus grand"""
+
+    def __init__(self, model, object_id, uuid, title, score):
+        self.model = model
+        self.object_id = object_id
+        self.uuid = uuid
+        self.title = title
+        self.score = score
+
+
+class FallbackBackend:
+    """Autres bases : filtre LIKE sans index, les titres qui contiennent un mot d'abord"""
+
+    def install(self, connection):
+        pass
+
+    def match(self, connection, terms, model_names, limit):
+        registry = UuidIndex.objects.using(connection.alias)
+        entries = SearchEntry.objects.using(connection.alias).exclude(status='deleted')
+        if model_names:
+            entries = entries.filter(uuid__in=registry.filter(model__in=model_names).values('uuid'))
+        for term in terms:
+            entries = entries.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        entries = entries.annotate(score=Case(
+            *[When(title__icontains=term, then=Value(1)) for term in terms],
+            default=Value(0),
+            output_field=IntegerField(),
+        )).order_by('-score', 'title')
+        entries = list(entries.only('uuid', 'title')[:limit])
+        # Le modèle et la clé de chaque entité viennent du registre des UUID
+        objects = registry.in_bulk([entry.uuid for entry in entries])
+        return [Hit(objects[entry.uuid].model, objects[entry.uuid].object_id, entry.uuid, entry.title,
+                    float(entry.score))
+                for entry in entries if entry.uuid in objects]
+
+    def model_filter(self, model_names):
+        if not model_names:
+            return '', []
+        return f" AND u.model IN ({', '.join(['%s'] * len(model_names))})", list(model_names)
+
+
+class SQLiteBackend(FallbackBackend):
+    """
+    Table virtuelle FTS5 à contenu externe : elle indexe les lignes de SearchEntry par leur clé
+    entière, que VACUUM ne renumérote pas, et est tenue à jour par des déclencheurs. Le classement
+    est celui de bm25, le titre pesant plus que le corps.
+    """
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"title, body, content='{TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    ]
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            created = cursor.fetchone() is None
+            for statement in self.statements:
+                cursor.execute(statement)
+            if created:
+                # Indexe les lignes écrites avant la création de la table virtuelle
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def match(self, connection, terms, model_names, limit):
+        # Chaque mot est cité (aucun opérateur FTS5 possible) et cherché comme préfixe
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        model_sql, model_params = self.model_filter(model_names)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT u.model, u.object_id, e.uuid, e.title, bm25({FTS_TABLE}, 10.0, 1.0) AS rank "
+                f"FROM {FTS_TABLE} JOIN {TABLE} e ON e.id = {FTS_TABLE}.rowid "
+                f"JOIN {UUID_TABLE} u ON u.uuid = e.uuid "
+                f"WHERE {FTS_TABLE} MATCH %s AND e.status <> 'deleted'{model_sql} "
+                f"ORDER BY rank LIMIT %s",
+                [expression, *model_params, limit],
+            )
+            rows = cursor.fetchall()
+        # bm25 est négatif, d'autant plus petit que la ligne est pertinente
+        return [Hit(model, object_id, to_uuid(obj_uuid), title, -rank)
+                for model, object_id, obj_uuid, title, rank in rows]
+
+
+class PostgresBackend(FallbackBackend):
+    """
+    Colonne tsvector générée à partir du titre (poids A) et du corps (poids B), indexée par GIN.
+    La configuration 'simple' ne retire ni mots vides ni suffixes : les contenus mêlent les langues.
+    """
+    statements = [
+        f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_vector_idx ON {TABLE} USING GIN (search_vector)",
+    ]
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            for statement in self.statements:
+                cursor.execute(statement)
+
+    def match(self, connection, terms, model_names, limit):
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        model_sql, model_params = self.model_filter(model_names)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT u.model, u.object_id, e.uuid, e.title, ts_rank(e.search_vector, query) AS rank "
+                f"FROM {TABLE} e JOIN {UUID_TABLE} u ON u.uuid = e.uuid, to_tsquery('simple', %s) query "
+                f"WHERE e.search_vector @@ query AND e.status <> 'deleted'{model_sql} "
+                f"ORDER BY rank DESC LIMIT %s",
+                [expression, *model_params, limit],
+            )
+            rows = cursor.fetchall()
+        return [Hit(model, object_id, to_uuid(obj_uuid), title, rank)
+                for model, object_id, obj_uuid, title, rank in rows]
+
+
+BACKENDS = {'sqlite': SQLiteBackend(), 'postgresql': PostgresBackend()}
+FALLBACK = FallbackBackend()
+
+
+def to_uuid(value):
+    return SearchEntry._meta.get_field('uuid').to_python(value)
+
+
+def get_backend(connection):
+    return BACKENDS.get(connection.vendor, FALLBACK)
+
+
+def install(using='default'):
+    """Crée l'index plein texte propre à la base, si besoin ; appelé après chaque migration"""
+    connection = connections[using]
+    if TABLE not in connection.introspection.table_names():
+        return
+    get_backend(connection).install(connection)
+
+
+def search(query, models=None, limit=20, using='default'):
+    """
+    Recherche plein texte dans les entités de la hiérarchie, hors entités supprimées.
+    Chaque mot de la requête doit apparaître, éventuellement comme début d'un mot du texte.
+
+    Args:
+        query: Texte saisi par l'utilisateur
+        models: Modèles où chercher, tous par défaut
+
+    Returns:
+        list: Hit, du plus pertinent au moins pertinent
+    """
+    terms = get_terms(query)
+    if not terms:
+        return []
+    model_names = [model.__name__ for model in models] if models else []
+    connection = connections[using]
+    return get_backend(connection).match(connection, terms, model_names, limit)
+
+
+def filter_queryset(queryset, query):
+    """
+    Restreint un queryset aux objets trouvés par la recherche, annotés de leur rang (POSITION).
+    Seuls les get_max_results() premiers résultats sont retenus.
+    """
+    hits = search(query, models=[queryset.model], limit=get_max_results(), using=queryset.db)
+    if not hits:
+        return queryset.none()
+    pks = [hit.object_id for hit in hits]
+    return queryset.filter(pk__in=pks).annotate(**{POSITION: Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(pks)],
+        output_field=IntegerField(),
+    )})
+
+
+# Écritures : SearchEntry suit les entités, l'index propre à la base suit SearchEntry
+
+def get_entry(instance):
+    title_field, body_fields = SEARCH_FIELDS[type(instance)]
+    return SearchEntry(
+        uuid=instance.uuid,
+        status=instance.status,
+        title=getattr(instance, title_field) or '',
+        body='\n'.join(filter(None, (getattr(instance, name) for name in body_fields))),
+    )
+
+
+def touches_index(model, fields):
+    """Indique si la modification de ces champs change le texte ou le statut indexés"""
+    if model not in SEARCH_FIELDS:
+        return False
+    if fields is None:
+        return True
+    title_field, body_fields = SEARCH_FIELDS[model]
+    return bool({title_field, 'status', *body_fields} & set(fields))
+
+
+def index(objs, batch_size=None):
+    """Indexe des objets en mémoire, dont les champs indexés sont chargés ; une requête par lot"""
+    entries = [get_entry(obj) for obj in objs if type(obj) in SEARCH_FIELDS]
+    if entries:
+        SearchEntry.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['uuid'],
+            update_fields=['status', 'title', 'body'],
+        )
+
+
+def index_pks(model, pks, batch_size=500):
+    """Indexe des objets d'après leur état en base, par exemple après une mise à jour en lot"""
+    if model not in SEARCH_FIELDS:
+        return
+    title_field, body_fields = SEARCH_FIELDS[model]
+    pks = list(pks)
+    for start in range(0, len(pks), batch_size):
+        objs = model.objects.filter(pk__in=pks[start:start + batch_size]).only(
+            'uuid', 'status', title_field, *body_fields
+        )
+        index(list(objs), batch_size=batch_size)
+
+
+def set_status(uuids, status):
+    """Reporte un changement de statut fait par un UPDATE en lot"""
+    SearchEntry.objects.filter(uuid__in=list(uuids)).update(status=status)
+
+
+def set_queryset_status(queryset, status):
+    """Reporte un statut sur les entrées des objets d'un queryset qui l'ont, en un UPDATE sans les charger"""
+    SearchEntry.objects.filter(
+        uuid__in=queryset.filter(status=status).values('uuid'),
+    ).exclude(status=status).update(status=status)
+
+
+def remove(uuids):
+    SearchEntry.objects.filter(uuid__in=list(uuids)).delete()
@@ -0,0 +1,129 @@
+import hashlib
+from django.db.models import Count, Max
+from ..models import Session, Sequence, BreakOut
+
+# Niveaux du résumé : la session, ses séquences, puis leurs breakouts
+LEVELS = {'session': Session, 'sequences': Sequence, 'breakouts': BreakOut}
+
+# Champs renvoyés sans paramètre `fields`
+DEFAULT_FIELDS = {
+    'session': ['title', 'context', 'objectives', 'participants', 'design_principles'],
+    'sequences': ['title', 'objective', 'order'],
+    'breakouts': ['title', 'objective'],
+}
+
+# Nombre maximal de sessions résumées en un appel
+MAX_SESSIONS = 100
+
+INTERNAL_FIELDS = {'id', 'uuid', 'fingerprint', 'last_sequence_order'}
+
+
+def get_allowed_fields(model):
+    return [model_field.name for model_field in model._meta.concrete_fields
+            if not model_field.is_relation and model_field.name not in INTERNAL_FIELDS]
+
+
+def parse_fields(value):
+    """
+    Interprète le paramètre `fields`, par exemple `title,sequences.title,sequences.breakouts`.
+    Un niveau nommé seul (`sequences`) reçoit ses champs par défaut ; un niveau seulement
+    traversé par un chemin plus profond ne renvoie que l'UUID de ses objets.
+
+    Returns:
+        dict: Champs par niveau ; un niveau absent n'est pas renvoyé
+
+    Raises:
+        ValueError: Si un champ est inconnu
+    """
+    if not value:
+        return {level: list(names) for level, names in DEFAULT_FIELDS.items()}
+
+    selected = {'session': []}
+    named = set()
+    for path in filter(None, (part.strip() for part in value.split(','))):
+        parts = path.split('.')
+        if parts[:2] == ['sequences', 'breakouts']:
+            level, rest = 'breakouts', parts[2:]
+        elif parts[0] == 'sequences':
+            level, rest = 'sequences', parts[1:]
+        else:
+            level, rest = 'session', parts
+        if level == 'breakouts':
+            selected.setdefault('sequences', [])
+        names = selected.setdefault(level, [])
+        if not rest:
+            named.add(level)
+        elif len(rest) == 1 and rest[0] in get_allowed_fields(LEVELS[level]):
+            if rest[0] not in names:
+                names.append(rest[0])
+        else:
+            raise ValueError(f"Champ inconnu : {path}")
+
+    for level in named:
+        if not selected[level]:
+            selected[level] = list(DEFAULT_FIELDS[level])
+    return selected
+
+
+def get_summaries(sessions, uuids, fields):
+    """
+    Résume des sessions avec leurs séquences et breakouts, en une requête par niveau
+    quel que soit le nombre de sessions.
+
+    Args:
+        sessions: Queryset des sessions visibles, par exemple celui du ViewSet
+
+    Returns:
+        list: Résumés dans l'ordre des UUID demandés ; les UUID inconnus sont ignorés
+    """
+    sessions = {
+        row['uuid']: row
+        for row in sessions.filter(uuid__in=uuids).values('id', 'uuid', *fields['session'])
+    }
+    by_id = {row.pop('id'): row for row in sessions.values()}
+
+    if 'sequences' in fields:
+        for row in by_id.values():
+            row['sequences'] = []
+        sequences = {}
+        rows = Sequence.objects.filter(session_id__in=by_id).order_by('session_id', 'order').values(
+            'id', 'session_id', 'uuid', *fields['sequences']
+        )
+        for row in rows:
+            sequence_id, session_id = row.pop('id'), row.pop('session_id')
+            if 'breakouts' in fields:
+                row['breakouts'] = []
+            sequences[sequence_id] = row
+            by_id[session_id]['sequences'].append(row)
+
+        if 'breakouts' in fields:
+            rows = BreakOut.objects.filter(sequence__session_id__in=by_id).order_by('sequence_id', 'pk').values(
+                'sequence_id', 'uuid', *fields['breakouts']
+            )
+            for row in rows:
+                sequences[row.pop('sequence_id')]['breakouts'].append(row)
+
+    return [sessions[obj_uuid] for obj_uuid in uuids if obj_uuid in sessions]
+
+
+def get_version(sessions, uuids, fields):
+    """
+    Validateurs HTTP des résumés, calculés en une requête sans construire les résumés :
+    toute écriture change une date de modification, toute suppression change un nombre.
+    `sessions` est le même queryset que pour get_summaries.
+
+    Returns:
+        tuple: (ETag, date de dernière modification ou None)
+    """
+    stats = sessions.filter(uuid__in=uuids).order_by().aggregate(
+        session_count=Count('id', distinct=True),
+        session_updated=Max('updated_at'),
+        sequence_count=Count('sequences', distinct=True),
+        sequence_updated=Max('sequences__updated_at'),
+        breakout_count=Count('sequences__breakouts', distinct=True),
+        breakout_updated=Max('sequences__breakouts__updated_at'),
+    )
+    dates = [stats[name] for name in ('session_updated', 'sequence_updated', 'breakout_updated')
+             if stats[name] is not None]
+    key = repr((sorted(str(obj_uuid) for obj_uuid in uuids), sorted(fields.items()), sorted(stats.items())))
+    return hashlib.md5(key.encode('utf-8')).hexdigest(), max(dates, default=None)
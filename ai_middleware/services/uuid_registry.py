@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from ..models import Client, Programme, Sponsor, Session, Sequence, BreakOut, UuidIndex
+
+# Modèles dont les UUID sont enregistrés dans UuidIndex
+INDEXED_MODELS = {model.__name__: model for model in (Client, Programme, Sponsor, Session, Sequence, BreakOut)}
+
+
+class LRUCache:
+    """Cache borné du processus, partagé par les threads du worker"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Une entrée ne change jamais tant que l'objet existe : seules les suppressions l'invalident
+lru = LRUCache(getattr(settings, 'UUID_REGISTRY_CACHE_SIZE', 10000))
+
+
+def register(instance):
+    UuidIndex.objects.update_or_create(
+        uuid=instance.uuid,
+        defaults={'model': type(instance).__name__, 'object_id': instance.pk}
+    )
+
+
+def register_many(model, objs, batch_size=None):
+    """À appeler après des écritures en lot, qui ne déclenchent pas les signaux"""
+    UuidIndex.objects.bulk_create(
+        [UuidIndex(uuid=obj.uuid, model=model.__name__, object_id=obj.pk) for obj in objs],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def unregister(uuids):
+    uuids = list(uuids)
+    UuidIndex.objects.filter(uuid__in=uuids).delete()
+    lru.discard(uuids)
+
+
+def resolve(obj_uuid):
+    """
+    Retourne le modèle et la clé primaire d'une entité à partir de son seul UUID.
+
+    Returns:
+        tuple: (modèle, pk) ou None si l'UUID est inconnu
+    """
+    entry = lru.get(obj_uuid)
+    if entry is None:
+        row = UuidIndex.objects.filter(uuid=obj_uuid).values_list('model', 'object_id').first()
+        if row is None or row[0] not in INDEXED_MODELS:
+            return None
+        entry = (INDEXED_MODELS[row[0]], row[1])
+        lru.set(obj_uuid, entry)
+    return entry
+
+
+def get_object(obj_uuid):
+    """
+    Charge l'entité d'un UUID, quel que soit son modèle.
+
+    Returns:
+        L'instance, ou None si l'UUID est inconnu
+    """
+    entry = resolve(obj_uuid)
+    if entry is None:
+        return None
+    model, pk = entry
+    # Le filtre sur l'UUID écarte une entrée périmée dont la clé aurait été réutilisée
+    obj = model.objects.filter(pk=pk, uuid=obj_uuid).first()
+    if obj is None:
+        lru.discard([obj_uuid])
+    return obj
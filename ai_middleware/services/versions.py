@@ -0,0 +1,97 @@
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from .markdown_format import HIERARCHY
+from ..models import Client, Programme, Sponsor, Session, Sequence, BreakOut
+
+# Objets dont dépend le tableau de bord d'un client : (modèle, chemin vers le client)
+DASHBOARD_DESCENDANTS = [
+    (Programme, 'client'),
+    (Sponsor, 'client'),
+    (Session, 'client'),
+    (Sequence, 'session__client'),
+    (BreakOut, 'sequence__session__client'),
+]
+
+# Descendants lus par l'arbre d'un client, y compris les sessions sans programme
+CLIENT_TREE_DESCENDANTS = [
+    (Programme, 'client'),
+    (Session, 'client'),
+    (Sequence, 'session__client'),
+    (BreakOut, 'sequence__session__client'),
+]
+
+
+def get_tree_descendants(model):
+    """Descendants d'un modèle dans l'export Markdown : (modèle, chemin vers l'ancêtre)"""
+    descendants, path = [], None
+    while model in HIERARCHY:
+        model, fk, _ = HIERARCHY[model]
+        path = fk if path is None else f'{fk}__{path}'
+        descendants.append((model, path))
+    return descendants
+
+
+def get_queryset_version(queryset):
+    """
+    Version d'une liste : toute modification avance la date maximale, toute suppression ou sortie
+    du filtre change le nombre. Une requête d'agrégat, sans charger les objets.
+
+    Returns:
+        tuple: ({'count', 'updated'}, date de dernière modification ou None)
+    """
+    stats = queryset.order_by().aggregate(count=Count('pk'), updated=Max('updated_at'))
+    return stats, stats['updated']
+
+
+def get_object_version(obj):
+    """Version d'un objet déjà chargé, identique à get_queryset_version sur ce seul objet"""
+    return {'count': 1, 'updated': obj.updated_at}, obj.updated_at
+
+
+def get_tree_version(model, pk, descendants, queryset=None):
+    """
+    Version d'un objet et de son sous-arbre : nombre et date maximale de modification de chaque
+    niveau de descendants, lus par des sous-requêtes d'une seule requête.
+
+    Args:
+        descendants: Liste de (modèle, chemin vers l'objet), par exemple get_tree_descendants(model)
+        queryset: Objets visibles, par exemple le queryset d'un ViewSet ; tous par défaut
+
+    Returns:
+        tuple: (statistiques, date de dernière modification), ou None si l'objet n'existe pas
+    """
+    annotations = {}
+    for index, (child, path) in enumerate(descendants):
+        rows = child.objects.filter(**{path: OuterRef('pk')}).order_by().values(path)
+        annotations[f'count_{index}'] = Subquery(
+            rows.annotate(count=Count('pk')).values('count'), output_field=IntegerField()
+        )
+        annotations[f'updated_{index}'] = Subquery(rows.annotate(updated=Max('updated_at')).values('updated'))
+    queryset = model.objects.all() if queryset is None else queryset
+    stats = queryset.filter(pk=pk).order_by().values('updated_at').annotate(**annotations).first()
+    if stats is None:
+        return None
+    dates = [value for name, value in stats.items() if name.startswith('updated') and value is not None]
+    return stats, max(dates)
+
+
+def get_sections_version(sections):
+    """
+    Version d'un export composé de plusieurs sous-arbres, comme ceux de
+    markdown_service.get_export_sections : celle de chaque sous-arbre, une requête par section.
+
+    Returns:
+        tuple: (statistiques, date de dernière modification), ou None si une section n'existe plus
+    """
+    stats, dates = [], []
+    for section, _ in sections:
+        model = type(section)
+        version = get_tree_version(model, section.pk, get_tree_descendants(model))
+        if version is None:
+            return None
+        stats.append((model.__name__, section.pk, version[0]))
+        dates.append(version[1])
+    return stats, max(dates)
+
+
+def get_dashboard_version(client_id, queryset=None):
+    return get_tree_version(Client, client_id, DASHBOARD_DESCENDANTS, queryset)
@@ -0,0 +1,119 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.utils import timezone
+from .models import Client, Programme, Session, Sequence, BreakOut
+from .services import counters, dashboard_cache, markdown_cache, search, uuid_registry
+from .services.markdown_format import content_fingerprint
+
+HIERARCHY_MODELS = (Client, Programme, Session, Sequence, BreakOut)
+
+
+def update_fingerprint(sender, instance, **kwargs):
+    """Tient à jour l'empreinte utilisée par l'import pour ignorer les lignes inchangées"""
+    instance.fingerprint = content_fingerprint(instance)
+
+
+def remember_markdown_ancestors(sender, instance, **kwargs):
+    """Mémorise les ancêtres actuels, au cas où l'objet change de parent ou disparaît"""
+    instance._markdown_ancestors = markdown_cache.get_ancestor_uuids(instance)
+
+
+def invalidate_markdown_on_save(sender, instance, **kwargs):
+    """Invalide le rendu Markdown de l'objet et de ses anciens et nouveaux ancêtres"""
+    markdown_cache.invalidate([
+        instance.uuid,
+        *getattr(instance, '_markdown_ancestors', []),
+        *markdown_cache.get_ancestor_uuids(instance),
+    ])
+
+
+def invalidate_markdown_on_delete(sender, instance, **kwargs):
+    """Invalide le rendu Markdown de l'objet supprimé et de ses ancêtres"""
+    markdown_cache.invalidate([instance.uuid, *getattr(instance, '_markdown_ancestors', [])])
+
+
+def register_uuid(sender, instance, created, **kwargs):
+    """Enregistre l'UUID d'une nouvelle entité dans le registre"""
+    if created:
+        uuid_registry.register(instance)
+
+
+def unregister_uuid(sender, instance, **kwargs):
+    uuid_registry.unregister([instance.uuid])
+
+
+
+def remember_counter_contribution(sender, instance, **kwargs):
+    """Mémorise ce que l'objet enregistré apporte aux compteurs, avant modification ou suppression"""
+    instance._counter_contribution = counters.get_stored_contribution(instance)
+
+
+def update_counters_on_save(sender, instance, created, **kwargs):
+    counters.record_save(instance, getattr(instance, '_counter_contribution', None), created)
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    counters.record_delete(getattr(instance, '_counter_contribution', None))
+
+
+def invalidate_dashboard(sender, instance, **kwargs):
+    """Périme le tableau de bord du client de l'objet enregistré ou supprimé"""
+    dashboard_cache.invalidate(dashboard_cache.get_client_ids(sender, [instance]))
+
+
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Réindexe le texte de l'objet enregistré, sauf si seuls des champs non indexés ont changé"""
+    if search.touches_index(sender, update_fields):
+        search.index([instance])
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove([instance.uuid])
+
+
+def touch_sessions_on_sponsors_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Les sponsors font partie de la représentation d'une session : modifier la liaison avance
+    sa date de modification, dont dépendent les validateurs des requêtes conditionnelles.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        sessions = Session.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        sessions = Session.objects.filter(sponsors=instance)
+    else:
+        sessions = Session.objects.filter(pk__in=pk_set)
+    sessions.update(updated_at=timezone.now())
+
+
+def install_search_index(sender, using, **kwargs):
+    """Crée l'index plein texte propre à la base après les migrations"""
+    search.install(using)
+
+
+for model in uuid_registry.INDEXED_MODELS.values():
+    post_save.connect(register_uuid, sender=model)
+    post_delete.connect(unregister_uuid, sender=model)
+
+for model in HIERARCHY_MODELS:
+    pre_save.connect(update_fingerprint, sender=model)
+    pre_save.connect(remember_markdown_ancestors, sender=model)
+    pre_delete.connect(remember_markdown_ancestors, sender=model)
+    post_save.connect(invalidate_markdown_on_save, sender=model)
+    post_delete.connect(invalidate_markdown_on_delete, sender=model)
+
+for model in counters.COUNTED_MODELS:
+    pre_save.connect(remember_counter_contribution, sender=model)
+    pre_delete.connect(remember_counter_contribution, sender=model)
+    post_save.connect(update_counters_on_save, sender=model)
+    post_delete.connect(update_counters_on_delete, sender=model)
+
+for model in dashboard_cache.DASHBOARD_MODELS:
+    post_save.connect(invalidate_dashboard, sender=model)
+    post_delete.connect(invalidate_dashboard, sender=model)
+
+for model in search.SEARCH_FIELDS:
+    post_save.connect(update_search_index, sender=model)
+    post_delete.connect(remove_from_search_index, sender=model)
+
+m2m_changed.connect(touch_sessions_on_sponsors_change, sender=Session.sponsors.through)
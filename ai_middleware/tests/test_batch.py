@@ -0,0 +1,142 @@
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..models import Client, Sponsor, Session, Sequence, BreakOut
+from ..views.base_views import SequenceViewSet
+
+SESSION_TEXTS = ['context', 'objectives', 'inputs', 'outputs', 'participants', 'design_principles', 'deliverables']
+
+
+class BatchViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('batch')
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.sponsor = Sponsor.objects.create(client=self.client_obj, name='Sponsor', job_title='DG', objectives='-')
+
+    def session_body(self, title):
+        return {
+            'client': self.client_obj.pk, 'title': title, 'sponsors': [self.sponsor.pk],
+            **{name: '-' for name in SESSION_TEXTS}
+        }
+
+    def post(self, operations, **options):
+        return self.client.post(self.url, {'operations': operations, **options}, content_type='application/json')
+
+    def test_operations_reference_earlier_results(self):
+        response = self.post([
+            {'id': 's', 'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Session')},
+            {'id': 'q', 'method': 'POST', 'path': '/api/sequences/', 'body': {
+                'session': '{{s.id}}', 'title': 'Séquence', 'objective': '-', 'input_text': '-',
+                'output_text': '-', 'order': 1
+            }},
+            {'method': 'POST', 'path': '/api/breakouts/', 'body': {
+                'sequence': '{{q.id}}', 'title': 'Breakout de {{q.title}}', 'description': '-', 'objective': '-'
+            }},
+            {'method': 'PATCH', 'path': '/api/sessions/{{s.id}}/', 'body': {'title': 'Renommée'}},
+            {'method': 'GET', 'path': '/api/sequences/{{q.id}}/?fields=uuid,title'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], [201, 201, 201, 200, 200])
+        session = Session.objects.get()
+        self.assertEqual(session.title, 'Renommée')
+        self.assertEqual(str(session.uuid), results[0]['body']['uuid'])
+        self.assertEqual(BreakOut.objects.get().title, 'Breakout de Séquence')
+        self.assertEqual(results[4]['body'], {'id': results[1]['body']['id'], 'uuid': results[1]['body']['uuid'], 'title': 'Séquence'})
+
+    def test_failed_dependency_does_not_stop_other_operations(self):
+        response = self.post([
+            {'id': 's', 'method': 'POST', 'path': '/api/sessions/', 'body': {'title': 'Incomplète'}},
+            {'method': 'DELETE', 'path': '/api/sessions/{{s.id}}/'},
+            {'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Complète')},
+        ])
+
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], [400, 424, 201])
+        self.assertEqual(Session.objects.get().title, 'Complète')
+
+    def test_atomic_batch_is_rolled_back_on_failure(self):
+        response = self.post([
+            {'id': 's', 'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Session')},
+            {'method': 'POST', 'path': '/api/sequences/', 'body': {'session': '{{s.id}}', 'title': 'Sans ordre'}},
+            {'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Jamais exécutée')},
+        ], atomic=True)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.json()['rolled_back'])
+        self.assertEqual(response.json()['failed'], 1)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(Sequence.objects.exists())
+
+    def test_atomic_batch_commits_on_success(self):
+        response = self.post([
+            {'id': 's', 'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Session')},
+            {'method': 'PATCH', 'path': '/api/sessions/{{s.id}}/', 'body': {'status': 'archived'}},
+        ], atomic=True)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Session.objects.get().status, 'archived')
+
+    def failing_create(self):
+        """La vue écrit la séquence puis lève une exception"""
+        def perform_create(viewset, serializer):
+            serializer.save()
+            raise RuntimeError('panne')
+        return mock.patch.object(SequenceViewSet, 'perform_create', perform_create)
+
+    def sequence_body(self, session):
+        return {'session': session, 'title': 'Séquence', 'objective': '-', 'input_text': '-',
+                'output_text': '-', 'order': 1}
+
+    def test_view_exception_only_fails_its_operation(self):
+        with self.failing_create(), self.assertLogs('ai_middleware.views.batch_views', 'ERROR'):
+            response = self.post([
+                {'id': 's', 'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Session')},
+                {'method': 'POST', 'path': '/api/sequences/', 'body': self.sequence_body('{{s.id}}')},
+                {'method': 'PATCH', 'path': '/api/sessions/{{s.id}}/', 'body': {'title': 'Renommée'}},
+            ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.json()['results']], [201, 500, 200])
+        self.assertEqual(Session.objects.get().title, 'Renommée')
+        self.assertFalse(Sequence.objects.exists())
+
+    def test_view_exception_rolls_back_an_atomic_batch(self):
+        with self.failing_create(), self.assertLogs('ai_middleware.views.batch_views', 'ERROR'):
+            response = self.post([
+                {'id': 's', 'method': 'POST', 'path': '/api/sessions/', 'body': self.session_body('Session')},
+                {'method': 'POST', 'path': '/api/sequences/', 'body': self.sequence_body('{{s.id}}')},
+            ], atomic=True)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.json()['rolled_back'])
+        self.assertEqual(response.json()['results'][-1]['status'], 500)
+        self.assertFalse(Session.objects.exists())
+
+    def test_invalid_batches_are_rejected(self):
+        operation = {'method': 'GET', 'path': '/api/sessions/'}
+        for payload in (
+            {'operations': []},
+            {'operations': [{'method': 'TRACE', 'path': '/api/sessions/'}]},
+            {'operations': [{'method': 'GET', 'path': 'api/sessions/'}]},
+            {'operations': [{'id': 'a', **operation}, {'id': 'a', **operation}]},
+            {'operations': [operation], 'atomic': True},
+        ):
+            response = self.client.post(self.url, payload, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+
+        with self.settings(BATCH_MAX_OPERATIONS=2):
+            self.assertEqual(self.post([operation] * 3).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paths_outside_the_api_are_refused(self):
+        results = self.post([
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'operations': []}},
+            {'method': 'GET', 'path': '/api/inconnu/'},
+            {'method': 'GET', 'path': '/api/sessions/{{0.id}}/'},
+        ]).json()['results']
+
+        self.assertEqual([r['status'] for r in results], [400, 400, 404, 424])
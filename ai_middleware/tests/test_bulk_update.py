@@ -0,0 +1,164 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from ..models import Client, Programme, Sponsor, Session, Sequence, BreakOut, SearchEntry
+from ..services import counters
+from ..services.markdown_format import content_fingerprint
+
+
+def count_updates(queries, model):
+    table = model._meta.db_table
+    return sum(1 for query in queries.captured_queries if query['sql'].startswith(f'UPDATE "{table}"'))
+
+
+class BulkUpdateTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.programme = Programme.objects.create(client=self.client_obj, name='Programme', description='-')
+        self.sessions = [
+            Session.objects.create(client=self.client_obj, programme=self.programme, title=f'Session {i}')
+            for i in range(3)
+        ]
+        self.other = Session.objects.create(client=self.client_obj, title='Hors programme')
+        counters.get_client_counters(self.client_obj)
+
+    def bulk_update(self, basename, data, params=''):
+        url = reverse(f'{basename}-bulk-update') + params
+        return self.client.patch(url, data, content_type='application/json')
+
+    def test_filtered_update_runs_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk_update('session', {'values': {'status': 'archived'}},
+                                        f'?programme={self.programme.pk}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': {'Session': 3}})
+        self.assertEqual(count_updates(queries, Session), 1)
+        self.assertEqual(Session.objects.filter(status='archived').count(), 3)
+        self.assertEqual(Session.objects.get(pk=self.other.pk).status, 'normal')
+        self.assertEqual(counters.get_client_counters(self.client_obj).sessions_archived, 3)
+        self.assertEqual(SearchEntry.objects.get(uuid=self.sessions[0].uuid).status, 'archived')
+
+    def test_text_update_refreshes_fingerprints_and_index(self):
+        ids = [session.pk for session in self.sessions[:2]]
+        response = self.bulk_update('session', {'ids': ids, 'values': {'title': 'Renommée'}})
+
+        self.assertEqual(response.data, {'updated': {'Session': 2}})
+        session = Session.objects.get(pk=ids[0])
+        self.assertEqual(session.title, 'Renommée')
+        self.assertEqual(session.fingerprint, content_fingerprint(session))
+        self.assertEqual(SearchEntry.objects.get(uuid=session.uuid).title, 'Renommée')
+        self.assertEqual(Session.objects.get(pk=self.sessions[2].pk).title, 'Session 2')
+
+    def test_invalid_updates_are_rejected(self):
+        sequence = Sequence.objects.create(session=self.sessions[0], title='Séquence', order=1)
+        sponsor = Sponsor.objects.create(client=self.client_obj, name='Sponsor', job_title='DG', objectives='-')
+        ids = [self.sessions[0].pk]
+        for viewset, data, params in (
+            ('session', {'values': {'status': 'archived'}}, ''),
+            ('session', {'ids': ids, 'values': {}}, ''),
+            ('session', {'ids': ids, 'values': {'status': 'inconnu'}}, ''),
+            ('session', {'ids': ids, 'values': {'sponsors': [sponsor.pk]}}, ''),
+            ('session', {'ids': ids, 'values': {'uuid': 'x', 'title': 'Titre'}}, ''),
+            ('session', {'ids': 'tous', 'values': {'title': 'Titre'}}, ''),
+            ('sequence', {'values': {'order': 5}}, f'?session={sequence.session_id}'),
+        ):
+            response = self.bulk_update(viewset, data, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.assertEqual(Session.objects.get(pk=ids[0]).title, 'Session 0')
+
+    def test_only_recognised_filters_select_rows(self):
+        data = {'values': {'status': 'archived'}}
+        for params in ('?programe=1', '?cursor=abc', '?ordering=title', '?programme=', '?search=,'):
+            response = self.bulk_update('session', data, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        self.assertFalse(Session.objects.filter(status='archived').exists())
+
+        response = self.bulk_update('session', data, '?search=Hors')
+        self.assertEqual(response.data, {'updated': {'Session': 1}})
+        self.assertEqual(Session.objects.get(status='archived').pk, self.other.pk)
+
+    def test_unique_conflicts_are_rejected(self):
+        moved = Sequence.objects.create(session=self.sessions[0], title='Déplacée', order=1)
+        Sequence.objects.create(session=self.sessions[1], title='En place', order=1)
+
+        response = self.bulk_update('sequence', {'ids': [moved.pk], 'values': {'session': self.sessions[1].pk}})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Sequence.objects.get(pk=moved.pk).session_id, self.sessions[0].pk)
+
+
+class CascadeStatusTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.programme = self.add_programme('Programme', sessions=2)
+        self.loose = Session.objects.create(client=self.client_obj, title='Hors programme')
+        counters.get_client_counters(self.client_obj)
+        counters.get_programme_counters(self.programme)
+
+    def add_programme(self, name, sessions):
+        programme = Programme.objects.create(client=self.client_obj, name=name, description='-')
+        for index in range(sessions):
+            session = Session.objects.create(client=self.client_obj, programme=programme, title=f'{name}.{index}')
+            for order in (1, 2):
+                sequence = Sequence.objects.create(session=session, title=f'Séquence {order}', order=order)
+                BreakOut.objects.create(sequence=sequence, title=f'Breakout {order}')
+        return programme
+
+    def cascade(self, basename, pk, value):
+        url = reverse(f'{basename}-cascade-status', kwargs={'pk': pk})
+        return self.client.post(url, {'status': value}, content_type='application/json')
+
+    def test_archiving_a_client_reaches_every_level(self):
+        deleted = BreakOut.objects.first()
+        deleted.status = 'deleted'
+        deleted.save()
+
+        response = self.cascade('client', self.client_obj.pk, 'archived')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], {
+            'Client': 1, 'Programme': 1, 'Session': 3, 'Sequence': 4, 'BreakOut': 3,
+        })
+        self.assertFalse(Session.objects.exclude(status='archived').exists())
+        # Archiver ne ramène pas un objet supprimé
+        self.assertEqual(BreakOut.objects.get(pk=deleted.pk).status, 'deleted')
+        self.assertEqual(SearchEntry.objects.get(uuid=self.loose.uuid).status, 'archived')
+        self.assertEqual(counters.get_client_counters(self.client_obj).sessions_archived, 3)
+        self.assertEqual(counters.get_programme_counters(self.programme).sessions_normal, 0)
+
+    def test_statement_count_does_not_depend_on_size(self):
+        def count_queries():
+            Client.objects.filter(pk=self.client_obj.pk).update(status='normal')
+            with CaptureQueriesContext(connection) as queries:
+                self.cascade('client', self.client_obj.pk, 'deleted')
+            self.assertEqual(count_updates(queries, BreakOut), 1)
+            return len(queries.captured_queries)
+
+        small = count_queries()
+        Session.objects.update(status='normal')
+        Sequence.objects.update(status='normal')
+        BreakOut.objects.update(status='normal')
+        self.add_programme('Autre', sessions=5)
+        self.assertEqual(count_queries(), small)
+
+    def test_cascade_stays_in_the_subtree(self):
+        other = self.add_programme('Autre', sessions=1)
+
+        response = self.cascade('programme', self.programme.pk, 'deleted')
+
+        self.assertEqual(response.data['updated'], {'Programme': 1, 'Session': 2, 'Sequence': 4, 'BreakOut': 4})
+        self.assertEqual(Session.objects.get(pk=self.loose.pk).status, 'normal')
+        self.assertFalse(Sequence.objects.filter(session__programme=other).exclude(status='normal').exists())
+        self.assertEqual(counters.get_client_counters(self.client_obj).sessions_deleted, 2)
+
+        response = self.cascade('session', self.loose.pk, 'archived')
+        self.assertEqual(response.data['updated'], {'Session': 1, 'Sequence': 0, 'BreakOut': 0})
+
+    def test_only_archived_and_deleted_cascade(self):
+        for value in ('normal', None):
+            response = self.cascade('client', self.client_obj.pk, value)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Client.objects.get().status, 'normal')
@@ -0,0 +1,208 @@
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+from ..models import Client, Sponsor, Session, Sequence, BreakOut
+from ..services import ordering, uuid_registry
+from ..views.base_views import BreakOutViewSet, SequenceViewSet
+from ..views.intermediate_views import SessionViewSet
+
+
+class BulkCreateTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.session = Session.objects.create(client=self.client_obj, title='Session')
+        self.sequence = Sequence.objects.create(session=self.session, title='Sequence', order=1)
+
+    def bulk_create(self, viewset, data):
+        request = self.factory.post('/bulk_create/', data, format='json')
+        return viewset.as_view({'post': 'bulk_create'})(request)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def count_queries(size):
+            data = [
+                {'sequence': self.sequence.pk, 'title': f'Breakout {i}', 'description': '-', 'objective': '-'}
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.bulk_create(BreakOutViewSet, data)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data['success']), size)
+            return len(queries.captured_queries)
+
+        # SQLite limite le nombre de paramètres : un lot de 300 lignes est découpé en quelques requêtes
+        with self.settings(BULK_CREATE_BATCH_SIZE=1000):
+            self.assertLessEqual(count_queries(300), count_queries(10) + 5)
+        breakout = BreakOut.objects.last()
+        self.assertEqual(uuid_registry.get_object(breakout.uuid), breakout)
+        self.assertTrue(breakout.fingerprint)
+
+    def session_data(self, title, sponsors):
+        return {
+            'client': self.client_obj.pk, 'title': title, 'sponsors': sponsors,
+            **{name: '-' for name in ('context', 'objectives', 'inputs', 'outputs',
+                                      'participants', 'design_principles', 'deliverables')},
+        }
+
+    def test_sponsors_and_per_index_errors(self):
+        sponsor = Sponsor.objects.create(client=self.client_obj, name='Sponsor', job_title='CEO', objectives='-')
+        other_client = Client.objects.create(name='Autre', context='-', objectives='-')
+        foreign = Sponsor.objects.create(client=other_client, name='Autre', job_title='CFO', objectives='-')
+
+        response = self.bulk_create(SessionViewSet, [
+            self.session_data('S1', [sponsor.pk]),
+            self.session_data('S2', [foreign.pk]),
+            self.session_data('S3', [sponsor.pk]),
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertEqual([s['title'] for s in response.data['success']], ['S1', 'S3'])
+        self.assertEqual(response.data['success'][0]['sponsors'], [sponsor.pk])
+        self.assertEqual(list(Session.objects.get(title='S1').sponsors.all()), [sponsor])
+        self.assertFalse(Session.objects.filter(title='S2').exists())
+
+    def test_bulk_create_is_routed(self):
+        sponsor = Sponsor.objects.create(client=self.client_obj, name='Sponsor', job_title='CEO', objectives='-')
+        response = self.client.post(
+            reverse('session-bulk-create'),
+            [self.session_data('S1', [sponsor.pk]), self.session_data('S2', [sponsor.pk])],
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([s['title'] for s in response.json()['success']], ['S1', 'S2'])
+        # Les objets supprimés restent hors de l'API routée
+        Session.objects.filter(title='S2').update(status='deleted')
+        titles = [s['title'] for s in self.client.get(reverse('session-list')).json()['results']]
+        self.assertNotIn('S2', titles)
+
+
+class SequenceOrderTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.session = Session.objects.create(client=self.client_obj, title='Session')
+        Sequence.objects.create(session=self.session, title='Sequence', order=1)
+
+    def sequence_data(self, session, title, **extra):
+        return {'session': session.pk, 'title': title, 'objective': '-', 'input_text': '-',
+                'output_text': '-', **extra}
+
+    def test_bulk_create_allocates_one_block_per_session(self):
+        other = Session.objects.create(client=self.client_obj, title='Autre session')
+        data = [self.sequence_data(self.session, 'A'), self.sequence_data(other, 'B'),
+                self.sequence_data(self.session, 'C')]
+        request = self.factory.post('/bulk_create/', data, format='json')
+        response = SequenceViewSet.as_view({'post': 'bulk_create'})(request)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(Sequence.objects.order_by('pk').values_list('title', 'order')),
+            [('Sequence', 1), ('A', 1025), ('B', 1024), ('C', 2049)]
+        )
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.last_sequence_order, 2049)
+
+    def test_allocation_cost_does_not_depend_on_count(self):
+        # UPDATE et relecture du compteur, dans un savepoint
+        with self.assertNumQueries(4):
+            first = ordering.allocate_sequence_orders({self.session.pk: 500})
+        self.assertEqual(first[self.session.pk], range(1025, 500 * 1024 + 2, 1024))
+        self.assertEqual(ordering.allocate_sequence_orders({self.session.pk: 1})[self.session.pk][0], 500 * 1024 + 1025)
+
+    def reorder(self, sequence, position):
+        return self.client.post(reverse('sequence-reorder', kwargs={'pk': sequence.pk}), {'order': position},
+                                content_type='application/json')
+
+    def test_reorder_rewrites_only_the_moved_row(self):
+        for order in (2048, 3072):
+            Sequence.objects.create(session=self.session, title=f'Sequence {order}', order=order)
+        first = Sequence.objects.get(order=1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reorder(first, 3)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Sequence.objects.values_list('title', flat=True)),
+            ['Sequence 2048', 'Sequence 3072', 'Sequence']
+        )
+
+    def test_reorder_locks_the_session_before_reading_orders(self):
+        Sequence.objects.create(session=self.session, title='Sequence 2', order=2048)
+        first = Sequence.objects.get(order=1)
+        with mock.patch('ai_middleware.services.ordering.lock_session', wraps=ordering.lock_session) as lock:
+            self.reorder(first, 2)
+        lock.assert_called_once_with(self.session.pk)
+
+    def test_reorder_rebalances_when_no_gap_is_left(self):
+        for order in (2, 3):
+            Sequence.objects.create(session=self.session, title=f'Sequence {order}', order=order)
+        last = Sequence.objects.get(order=3)
+        response = self.reorder(last, 2)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(Sequence.objects.values_list('title', 'order')),
+            [('Sequence', 1027), ('Sequence 3', 2051), ('Sequence 2', 3075)]
+        )
+        self.assertEqual(response.data['order'], 2051)
+
+    def test_bulk_reorder_applies_full_order_in_one_update(self):
+        for order in (2, 3):
+            Sequence.objects.create(session=self.session, title=f'Sequence {order}', order=order)
+        uuids = [str(obj_uuid) for obj_uuid in Sequence.objects.order_by('-order').values_list('uuid', flat=True)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('sequence-bulk-reorder'), {'sequences': uuids},
+                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(Sequence.objects.values_list('title', flat=True)),
+            ['Sequence 3', 'Sequence 2', 'Sequence']
+        )
+        self.assertEqual([s['title'] for s in response.json()], ['Sequence 3', 'Sequence 2', 'Sequence'])
+
+    def test_bulk_reorder_requires_every_sequence_of_the_session(self):
+        Sequence.objects.create(session=self.session, title='Sequence 2', order=2)
+        first = Sequence.objects.get(order=1)
+        request = self.factory.post('/bulk_reorder/', {'sequences': [str(first.uuid)]}, format='json')
+        response = SequenceViewSet.as_view({'post': 'bulk_reorder'})(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(first.order, Sequence.objects.get(pk=first.pk).order)
+
+    def test_duplicate_order_is_rejected_per_index(self):
+        data = [self.sequence_data(self.session, 'A', order=1), self.sequence_data(self.session, 'B', order=5)]
+        request = self.factory.post('/bulk_create/', data, format='json')
+        response = SequenceViewSet.as_view({'post': 'bulk_create'})(request)
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0])
+        self.assertEqual([s['title'] for s in response.data['success']], ['B'])
+
+    def test_routed_create_allocates_order_and_rejects_duplicates(self):
+        url = reverse('sequence-list')
+        response = self.client.post(url, self.sequence_data(self.session, 'Sans ordre'),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(response.json()['order'], 1)
+
+        response = self.client.post(url, self.sequence_data(self.session, 'Doublon', order=1),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('order', response.json())
+
+        created = Sequence.objects.get(title='Sans ordre')
+        response = self.client.patch(reverse('sequence-detail', kwargs={'pk': created.pk}), {'order': 1},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Sequence.objects.count(), 2)
@@ -0,0 +1,83 @@
+import json
+import uuid
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..models import Client, Programme, Session, Sequence, BreakOut
+
+
+class ClientTreeTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.url = reverse('client-tree', kwargs={'uuid': self.client_obj.uuid})
+        self.add_programme('Programme 1', sessions=2)
+        self.loose = Session.objects.create(client=self.client_obj, title='Sans programme')
+
+    def add_programme(self, name, sessions):
+        programme = Programme.objects.create(client=self.client_obj, name=name)
+        for index in range(sessions):
+            session = Session.objects.create(client=self.client_obj, programme=programme, title=f'{name}.{index}')
+            for order in (2, 1):
+                sequence = Sequence.objects.create(session=session, title=f'Séquence {order}', order=order)
+                BreakOut.objects.create(sequence=sequence, title=f'Breakout {order}')
+        return programme
+
+    def test_tree_is_nested_in_order(self):
+        tree = self.client.get(self.url).data
+
+        self.assertEqual(tree['uuid'], self.client_obj.uuid)
+        self.assertEqual([s['title'] for s in tree['sessions']], ['Sans programme'])
+        programme = tree['programmes'][0]
+        self.assertEqual([s['title'] for s in programme['sessions']], ['Programme 1.0', 'Programme 1.1'])
+        sequences = programme['sessions'][0]['sequences']
+        self.assertEqual([s['title'] for s in sequences], ['Séquence 1', 'Séquence 2'])
+        self.assertEqual([b['title'] for b in sequences[0]['breakouts']], ['Breakout 1'])
+
+    def test_query_count_does_not_depend_on_size(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(6):  # version, client et un niveau par requête
+            self.client.get(self.url)
+
+        self.add_programme('Programme 2', sessions=5)
+        with self.assertNumQueries(6):
+            tree = self.client.get(self.url).data
+        self.assertEqual(len(tree['programmes']), 2)
+
+    def test_depth_limits_levels(self):
+        tree = self.client.get(self.url, {'depth': 1}).data
+
+        self.assertEqual(len(tree['programmes']), 1)
+        self.assertNotIn('sessions', tree['programmes'][0])
+        self.assertNotIn('sessions', tree)
+        self.assertNotIn('programmes', self.client.get(self.url, {'depth': 0}).data)
+
+    def test_status_filter_drops_subtrees(self):
+        session = Session.objects.get(title='Programme 1.0')
+        session.status = 'archived'
+        session.save()
+        Sequence.objects.filter(session__title='Programme 1.1', order=1).update(status='deleted')
+
+        programme = self.client.get(self.url).data['programmes'][0]
+        self.assertEqual(len(programme['sessions']), 2)
+        self.assertEqual([s['title'] for s in programme['sessions'][1]['sequences']], ['Séquence 2'])
+
+        programme = self.client.get(self.url, {'status': 'normal'}).data['programmes'][0]
+        self.assertEqual([s['title'] for s in programme['sessions']], ['Programme 1.1'])
+
+        # Le client lui-même doit avoir un des statuts retenus
+        self.assertEqual(self.client.get(self.url, {'status': 'archived'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_streamed_tree_matches(self):
+        response = self.client.get(self.url, {'stream': '1'})
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, json.loads(self.client.get(self.url).content))
+
+    def test_invalid_parameters_and_unknown_client(self):
+        self.assertEqual(self.client.get(self.url, {'depth': 9}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'status': 'nope'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('client-tree', kwargs={'uuid': uuid.uuid4()}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('client-tree', kwargs={'uuid': self.loose.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
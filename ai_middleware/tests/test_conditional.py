@@ -0,0 +1,101 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+from ..models import Client, Programme, Sponsor, Session, Sequence, BreakOut
+from ..services import uuid_registry
+from ..views.high_level_views import ClientViewSet
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.programme = Programme.objects.create(client=self.client_obj, name='Programme')
+        self.session = Session.objects.create(client=self.client_obj, programme=self.programme, title='Session')
+        self.sequence = Sequence.objects.create(session=self.session, title='Séquence', order=1)
+        self.breakout = BreakOut.objects.create(sequence=self.sequence, title='Breakout')
+
+    def revalidate(self, url, etag, queries=1, **params):
+        with self.assertNumQueries(queries):
+            return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_list_is_not_modified_until_a_write(self):
+        url = reverse('session-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(self.client.get(url, {'fields': 'title'})['ETag'], etag)
+
+        Session.objects.create(client=self.client_obj, title='Nouvelle')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_retrieve_is_not_modified_until_a_write(self):
+        url = reverse('session-detail', kwargs={'pk': self.session.pk})
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.session.sponsors.add(Sponsor.objects.create(client=self.client_obj, name='Sponsor', job_title='-'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['sponsors']), 1)
+
+        missing = reverse('session-detail', kwargs={'pk': self.session.pk + 100})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', self.client.get(missing))
+
+    def test_markdown_export_follows_the_whole_subtree(self):
+        url = reverse('markdown-export-uuid', kwargs={'uuid': self.client_obj.uuid})
+        etag = self.client.get(url)['ETag']
+        uuid_registry.resolve(self.client_obj.uuid)
+
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.breakout.title = 'Renommé'
+        self.breakout.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Renommé', response.data['markdown'])
+
+        etag = response['ETag']
+        self.breakout.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_markdown_export_follows_the_exported_ancestors(self):
+        sibling = Session.objects.create(client=self.client_obj, programme=self.programme, title='Voisine')
+        url = reverse('markdown-export-uuid', kwargs={'uuid': self.session.uuid})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        for obj, field in ((self.client_obj, 'name'), (sibling, 'title')):
+            setattr(obj, field, 'Renommé')
+            obj.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('Renommé', response.data['markdown'])
+            etag = response['ETag']
+
+    def test_dashboard_is_not_modified_until_a_write(self):
+        view = ClientViewSet.as_view({'get': 'dashboard'})
+        factory = APIRequestFactory()
+        url = f'/clients/{self.client_obj.pk}/dashboard/'
+        response = view(factory.get(url), pk=str(self.client_obj.pk))
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = view(factory.get(url, HTTP_IF_NONE_MATCH=etag), pk=str(self.client_obj.pk))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Sequence.objects.create(session=self.session, title='Autre', order=2)
+        response = view(factory.get(url, HTTP_IF_NONE_MATCH=etag), pk=str(self.client_obj.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['statistics']['total_sequences'], 2)
+
+        response = view(factory.get('/clients/0/dashboard/'), pk='0')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
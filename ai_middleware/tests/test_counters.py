@@ -0,0 +1,189 @@
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..management.commands.benchmark_markdown import generate_programme_markdown
+from ..models import Client, Programme, Sponsor, Session, Sequence, BreakOut, ClientCounters, ProgrammeCounters
+from ..services import counters, dashboard_cache
+from ..services.markdown_import import import_markdown
+
+COUNTER_FIELDS = counters.CLIENT_FIELDS
+
+
+class HierarchyCountersTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.programme = Programme.objects.create(client=self.client_obj, name='Programme', description='-')
+        self.other = Programme.objects.create(client=self.client_obj, name='Autre', description='-')
+        # Les lignes de compteurs existent : les écritures suivantes les mettent à jour
+        counters.get_client_counters(self.client_obj)
+        counters.get_programme_counters(self.programme)
+        counters.get_programme_counters(self.other)
+
+    def snapshot(self):
+        stored = [
+            model_to_dict(ClientCounters.objects.get(pk=self.client_obj.pk), fields=COUNTER_FIELDS),
+            model_to_dict(ProgrammeCounters.objects.get(pk=self.programme.pk), fields=COUNTER_FIELDS),
+            model_to_dict(ProgrammeCounters.objects.get(pk=self.other.pk), fields=COUNTER_FIELDS),
+        ]
+        counters.rebuild_clients([self.client_obj.pk])
+        counters.rebuild_programmes([self.programme.pk, self.other.pk])
+        rebuilt = [
+            model_to_dict(ClientCounters.objects.get(pk=self.client_obj.pk), fields=COUNTER_FIELDS),
+            model_to_dict(ProgrammeCounters.objects.get(pk=self.programme.pk), fields=COUNTER_FIELDS),
+            model_to_dict(ProgrammeCounters.objects.get(pk=self.other.pk), fields=COUNTER_FIELDS),
+        ]
+        return stored, rebuilt
+
+    def test_writes_update_counters_incrementally(self):
+        session = Session.objects.create(client=self.client_obj, programme=self.programme, title='S1',
+                                         participants='Alice, Bob')
+        Session.objects.create(client=self.client_obj, programme=self.programme, title='S2')
+        sequence = Sequence.objects.create(session=session, title='Q1', order=1)
+        Sequence.objects.create(session=session, title='Q2', order=2)
+        BreakOut.objects.create(sequence=sequence, title='B1', description='-', objective='-')
+        BreakOut.objects.create(sequence=sequence, title='B2', description='-', objective='-')
+
+        counters_row = ProgrammeCounters.objects.get(pk=self.programme.pk)
+        self.assertEqual((counters_row.sessions, counters_row.sequences, counters_row.breakouts,
+                          counters_row.participants), (2, 2, 2, 2))
+
+        session.status = 'archived'
+        session.participants = 'Alice, Bob, Carol'
+        session.save()
+        session.programme = self.other
+        session.save()
+        sequence.delete()
+
+        stored, rebuilt = self.snapshot()
+        self.assertEqual(stored, rebuilt)
+        self.assertEqual(rebuilt[2]['sessions_archived'], 1)
+        self.assertEqual(rebuilt[2]['sequences'], 1)
+        self.assertEqual(rebuilt[0]['programmes'], 2)
+
+    def test_bulk_import_refreshes_counters(self):
+        import_markdown(generate_programme_markdown(sessions=3, sequences=2, breakouts=2))
+        programme = Programme.objects.get(name='Benchmark Programme')
+
+        stats = counters.get_programme_counters(programme)
+        self.assertEqual((stats.sessions, stats.sequences, stats.breakouts), (3, 6, 12))
+
+    def test_statistics_is_a_single_row_read(self):
+        for index in range(5):
+            session = Session.objects.create(client=self.client_obj, programme=self.programme,
+                                             title=f'S{index}', participants='A, B')
+            Sequence.objects.create(session=session, title='Q', order=1)
+        # Le programme, puis ses compteurs
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('programme-statistics', kwargs={'pk': self.programme.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_sessions'], 5)
+        self.assertEqual(response.data['total_sequences'], 5)
+        self.assertEqual(response.data['participants_count'], 10)
+        self.assertEqual(response.data['sessions_by_status'], [{'status': 'normal', 'count': 5}])
+
+    def test_dashboard_reads_client_counters(self):
+        Session.objects.create(client=self.client_obj, programme=self.programme, title='S1')
+        response = self.client.get(reverse('client-dashboard', kwargs={'pk': self.client_obj.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['statistics']['total_sessions'], 1)
+        self.assertEqual(response.data['statistics']['total_programmes'], 2)
+        self.assertEqual([p['name'] for p in response.data['active_programmes']], ['Programme'])
+
+    def test_rebuild_command_repairs_counters(self):
+        Session.objects.create(client=self.client_obj, programme=self.programme, title='S1')
+        ProgrammeCounters.objects.filter(pk=self.programme.pk).update(sessions=42)
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+
+        self.assertEqual(ProgrammeCounters.objects.get(pk=self.programme.pk).sessions, 1)
+        self.assertIn('1 clients et 2 programmes', out.getvalue())
+
+
+class InlineExecutor:
+    """Recalcule le tableau de bord immédiatement, dans la connexion du test"""
+    def submit(self, fn, *args):
+        dashboard_cache.store(args[0], args[1], dashboard_cache.get_generation(args[0]))
+
+
+class ClientDashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.programme = Programme.objects.create(client=self.client_obj, name='Programme', description='-')
+
+    def get_dashboard(self):
+        return self.client.get(reverse('client-dashboard', kwargs={'pk': self.client_obj.pk}))
+
+    def test_repeated_reads_hit_the_cache(self):
+        self.assertEqual(self.get_dashboard()['X-Cache'], 'MISS')
+        # Seule la version du tableau de bord est lue
+        with self.assertNumQueries(1):
+            response = self.get_dashboard()
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(dashboard_cache.get_stats()['hits'], 1)
+        self.assertEqual(dashboard_cache.get_stats()['misses'], 1)
+
+    def test_session_save_invalidates_the_client_dashboard(self):
+        self.get_dashboard()
+        other = Client.objects.create(name='Autre', context='-', objectives='-')
+        Session.objects.create(client=other, title='Ailleurs')
+        self.assertEqual(self.get_dashboard()['X-Cache'], 'HIT')
+
+        session = Session.objects.create(client=self.client_obj, programme=self.programme, title='S1')
+        response = self.get_dashboard()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['statistics']['total_sessions'], 1)
+
+        session.title = 'S1 renommée'
+        session.save()
+        response = self.get_dashboard()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['recent_sessions'][0]['title'], 'S1 renommée')
+
+    def test_sequence_import_invalidates_through_counters(self):
+        session = Session.objects.create(client=self.client_obj, programme=self.programme, title='S1')
+        self.get_dashboard()
+        import_markdown(
+            f"### [@Session::{session.uuid}]\n"
+            "#### [@Sequence::new] **title**: Q **objective**: - **input_text**: - **output_text**: -"
+        )
+
+        response = self.get_dashboard()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['statistics']['total_sequences'], 1)
+
+    def test_stale_while_revalidate_serves_previous_payload(self):
+        self.get_dashboard()
+        Sponsor.objects.create(client=self.client_obj, name='Sponsor', job_title='-', objectives='-')
+
+        with self.settings(DASHBOARD_STALE_WHILE_REVALIDATE=True), \
+                mock.patch('ai_middleware.services.dashboard_cache.get_executor', return_value=InlineExecutor()):
+            stale = self.get_dashboard()
+            fresh = self.get_dashboard()
+
+        self.assertEqual(stale['X-Cache'], 'STALE')
+        self.assertEqual(stale.data['statistics']['total_sponsors'], 0)
+        self.assertEqual(fresh['X-Cache'], 'HIT')
+        self.assertEqual(fresh.data['statistics']['total_sponsors'], 1)
+        self.assertEqual(dashboard_cache.get_stats()['stale'], 1)
+
+    def test_deleted_client_is_not_served_from_the_cache(self):
+        self.get_dashboard()
+        self.client_obj.status = 'deleted'
+        self.client_obj.save()
+
+        with self.settings(DASHBOARD_STALE_WHILE_REVALIDATE=True), \
+                mock.patch('ai_middleware.services.dashboard_cache.schedule_refresh') as schedule_refresh:
+            response = self.get_dashboard()
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('X-Cache', response)
+        schedule_refresh.assert_not_called()
@@ -0,0 +1,145 @@
+from django.core.cache import cache
+from django.test import TestCase
+from ..models import Client, Programme, Session, Sequence, BreakOut
+from ..services import markdown_cache
+from ..services.markdown_service import to_markdown
+
+
+class MarkdownTreeTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def build_tree(self, programmes=1, sessions=1, sequences=1, breakouts=1):
+        client = Client.objects.create(
+            name='Test Client',
+            context='Test\nContext',
+            objectives='Test Objectives'
+        )
+        for p in range(programmes):
+            programme = Programme.objects.create(
+                name=f'Programme {p}',
+                client=client,
+                description='Test Description'
+            )
+            for s in range(sessions):
+                session = Session.objects.create(
+                    title=f'Session {s}',
+                    programme=programme,
+                    client=client,
+                    context='Test Context',
+                    objectives='Test Objectives',
+                    inputs='Test Inputs',
+                    outputs='Test Outputs',
+                    participants='Test Participants',
+                    design_principles='Test Principles',
+                    deliverables='Test Deliverables'
+                )
+                for q in range(sequences):
+                    sequence = Sequence.objects.create(
+                        title=f'Sequence {q}',
+                        session=session,
+                        objective='Test Objective',
+                        input_text='Test Input',
+                        output_text='Test Output',
+                        order=sequences - q
+                    )
+                    for b in range(breakouts):
+                        BreakOut.objects.create(
+                            title=f'Breakout {b}',
+                            sequence=sequence,
+                            description='Test Description',
+                            objective='Test Objective'
+                        )
+        return client
+
+
+class MarkdownExportTests(MarkdownTreeTestCase):
+    def test_client_export_format(self):
+        client = self.build_tree()
+        programme = client.programmes.get()
+        session = programme.sessions.get()
+        sequence = session.sequences.get()
+        breakout = sequence.breakouts.get()
+
+        expected = (
+            f"# [@Client::{client.uuid}] **name**: Test Client **context**: Test Context "
+            f"**objectives**: Test Objectives\n"
+            f"## [@Programme::{programme.uuid}] **name**: Programme 0 **description**: Test Description\n"
+            f"### [@Session::{session.uuid}] **title**: Session 0 **context**: Test Context "
+            f"**objectives**: Test Objectives **inputs**: Test Inputs **outputs**: Test Outputs "
+            f"**participants**: Test Participants **design_principles**: Test Principles "
+            f"**deliverables**: Test Deliverables\n"
+            f"#### [@Sequence::{sequence.uuid}] **title**: Sequence 0 **objective**: Test Objective "
+            f"**input_text**: Test Input **output_text**: Test Output **order**: 1\n"
+            f"##### [@BreakOut::{breakout.uuid}] **title**: Breakout 0 "
+            f"**description**: Test Description **objective**: Test Objective\n"
+        )
+        self.assertEqual(to_markdown(client), expected)
+
+    def test_sequences_follow_order(self):
+        client = self.build_tree(sequences=3, breakouts=0)
+        markdown = to_markdown(client)
+        positions = [markdown.index(f'**title**: Sequence {q}') for q in (2, 1, 0)]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_breakout_export_includes_ancestors(self):
+        client = self.build_tree()
+        breakout = BreakOut.objects.get()
+        lines = to_markdown(breakout).splitlines()
+        self.assertTrue(lines[0].startswith(f'# [@Client::{client.uuid}]'))
+        self.assertTrue(lines[-1].startswith(f'# [@BreakOut::{breakout.uuid}]'))
+
+    def test_query_count_does_not_grow_with_tree(self):
+        small = self.build_tree()
+        large = self.build_tree(programmes=3, sessions=3, sequences=3, breakouts=3)
+
+        with self.assertNumQueries(4):
+            to_markdown(small)
+        with self.assertNumQueries(4):
+            to_markdown(large)
+        cache.clear()
+
+        small_breakout = BreakOut.objects.filter(sequence__session__client=small).first()
+        large_breakout = BreakOut.objects.filter(sequence__session__client=large).first()
+        with self.assertNumQueries(5):
+            to_markdown(small_breakout)
+        with self.assertNumQueries(5):
+            to_markdown(large_breakout)
+
+
+class MarkdownRenderCacheTests(MarkdownTreeTestCase):
+    def test_warm_export_reads_cache(self):
+        client = self.build_tree(programmes=2, sessions=2, sequences=2, breakouts=2)
+        markdown = to_markdown(client)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(to_markdown(client), markdown)
+
+    def test_breakout_edit_invalidates_path_to_root(self):
+        client = self.build_tree(programmes=2, sessions=2, sequences=2, breakouts=2)
+        to_markdown(client)
+
+        breakout = BreakOut.objects.filter(sequence__session__client=client).first()
+        breakout.title = 'Renamed Breakout'
+        breakout.save()
+
+        sibling = Programme.objects.filter(client=client).exclude(
+            sessions__sequences__breakouts=breakout
+        ).get()
+        self.assertIsNotNone(cache.get(markdown_cache.subtree_key(sibling.uuid, 2)))
+        self.assertIsNone(cache.get(markdown_cache.subtree_key(client.uuid, 1)))
+        self.assertIsNone(cache.get(markdown_cache.subtree_key(breakout.sequence.uuid, 4)))
+
+        markdown = to_markdown(client)
+        self.assertIn('**title**: Renamed Breakout', markdown)
+        cache.clear()
+        self.assertEqual(to_markdown(client), markdown)
+
+    def test_delete_invalidates_parent(self):
+        client = self.build_tree(breakouts=2)
+        to_markdown(client)
+
+        breakout = BreakOut.objects.filter(sequence__session__client=client).first()
+        breakout.delete()
+
+        self.assertNotIn(str(breakout.uuid), to_markdown(client))
@@ -0,0 +1,320 @@
+import gzip
+import io
+import tempfile
+import uuid
+from pathlib import Path
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ..management.commands.benchmark_markdown import (
+    generate_programme_markdown, legacy_tokenize_line, lengthen_values
+)
+from ..models import Client, Programme, Session, Sequence, BreakOut
+from ..services.markdown_format import escape_value, tokenize_fields, tokenize_line
+from ..services.markdown_import import MarkdownImporter, import_markdown, iter_text_lines
+from ..services.markdown_service import to_markdown
+
+
+class MarkdownImportTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            name='Test Client',
+            context='Test Context',
+            objectives='Test Objectives'
+        )
+
+    def test_create_and_update_report(self):
+        new_uuid = uuid.uuid4()
+        markdown = (
+            f"# [@Client::{self.client_obj.uuid}] **name**: Updated Client\n"
+            f"## [@Programme::{new_uuid}] **name**: New Programme **description**: Description "
+            f"**client_id**: {self.client_obj.uuid}"
+        )
+        result = import_markdown(markdown)
+
+        self.assertEqual(result.details(), {
+            'created': [f"Programme ({new_uuid})"],
+            'updated': [f"Client ({self.client_obj.uuid})"],
+            'unchanged': [],
+        })
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.name, 'Updated Client')
+        self.assertEqual(Programme.objects.get(uuid=new_uuid).client, self.client_obj)
+
+    def test_invalid_lines_are_reported(self):
+        markdown = (
+            "# [@Client::not-a-uuid] **name**: Broken\n"
+            "## [@Programme::new] **name**: Orphan Programme **description**: Description"
+        )
+        result = import_markdown(markdown)
+
+        self.assertEqual(result.objects, [])
+        self.assertEqual([error['line'] for error in result.errors], [1, 2])
+        self.assertFalse(Programme.objects.exists())
+
+    def test_full_document(self):
+        result = import_markdown(generate_programme_markdown(sessions=3, sequences=2, breakouts=2))
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(Session.objects.count(), 3)
+        self.assertEqual(Sequence.objects.count(), 6)
+        self.assertEqual(BreakOut.objects.filter(sequence__session__programme__name='Benchmark Programme').count(), 12)
+
+    def count_queries(self, markdown):
+        with CaptureQueriesContext(connection) as queries:
+            import_markdown(markdown, batch_size=1000)
+        return len(queries.captured_queries)
+
+    def test_query_count_does_not_grow_with_document(self):
+        small = generate_programme_markdown(sessions=2)
+        large = generate_programme_markdown(sessions=6)
+
+        # Création puis mise à jour des mêmes objets
+        self.assertEqual(self.count_queries(small), self.count_queries(large))
+        self.assertEqual(self.count_queries(small), self.count_queries(large))
+
+
+class MarkdownHierarchyImportTests(TestCase):
+    def test_parents_follow_heading_levels(self):
+        markdown = (
+            "# [@Client::new] **name**: Client **context**: Contexte **objectives**: Objectifs\n"
+            "## [@Programme::new] **name**: Programme A **description**: Description\n"
+            "### [@Session::new] **title**: Session A1 **context**: Contexte\n"
+            "#### [@Sequence::new] **title**: Sequence A1-1 **objective**: Objectif\n"
+            "##### [@BreakOut::new] **title**: Breakout A1-1-1 **description**: Description\n"
+            "#### [@Sequence::new] **title**: Sequence A1-2 **objective**: Objectif\n"
+            "##### [@BreakOut::new] **title**: Breakout A1-2-1 **description**: Description\n"
+            "##### [@BreakOut::new] **title**: Breakout A1-2-2 **description**: Description\n"
+            "## [@Programme::new] **name**: Programme B **description**: Description\n"
+            "### [@Session::new] **title**: Session B1 **context**: Contexte\n"
+        )
+        result = import_markdown(markdown)
+
+        self.assertEqual(result.errors, [])
+        client = Client.objects.get()
+        self.assertEqual(
+            sorted(Session.objects.values_list('title', 'programme__name', 'client')),
+            [('Session A1', 'Programme A', client.pk), ('Session B1', 'Programme B', client.pk)]
+        )
+        self.assertEqual(
+            list(Sequence.objects.values_list('title', 'order')),
+            [('Sequence A1-1', 1024), ('Sequence A1-2', 2048)]
+        )
+        self.assertEqual(
+            sorted(BreakOut.objects.values_list('title', 'sequence__title')),
+            [('Breakout A1-1-1', 'Sequence A1-1'), ('Breakout A1-2-1', 'Sequence A1-2'),
+             ('Breakout A1-2-2', 'Sequence A1-2')]
+        )
+
+    def test_header_only_line_is_a_parent(self):
+        client = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        markdown = (
+            f"# [@Client::{client.uuid}]\n"
+            "## [@Programme::new] **name**: Programme **description**: Description\n"
+        )
+        result = import_markdown(markdown)
+
+        self.assertEqual(result.details()['updated'], [])
+        self.assertEqual(Programme.objects.get().client, client)
+
+    def test_exported_tree_round_trips(self):
+        markdown = generate_programme_markdown(sessions=3, sequences=3, breakouts=2)
+        import_markdown(markdown)
+        client = Client.objects.get()
+        exported = to_markdown(client)
+
+        for model in (BreakOut, Sequence, Session, Programme, Client):
+            model.objects.all().delete()
+        result = import_markdown(exported)
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(len(result.created), len(exported.splitlines()))
+        self.assertEqual(to_markdown(Client.objects.get()), exported)
+
+
+class MarkdownTokenizerTests(TestCase):
+    def test_stars_are_kept_in_values(self):
+        self.assertEqual(
+            tokenize_fields("**a**: use *bold* and **strong**, 2*3 **b**: x"),
+            [('a', 'use *bold* and **strong**, 2*3'), ('b', 'x')]
+        )
+
+    def test_escaped_values_round_trip(self):
+        value = r"a\b *c* **d**: e \*"
+        self.assertEqual(
+            tokenize_fields(f"**x**: {escape_value(value)} **y**: z"),
+            [('x', value), ('y', 'z')]
+        )
+
+    def test_header(self):
+        self.assertEqual(tokenize_line("### [@Session::new]"), (3, 'Session', 'new', []))
+        self.assertIsNone(tokenize_line("#[@Session::new] **title**: T"))
+        self.assertIsNone(tokenize_line("## Titre libre"))
+
+    def test_exported_stars_survive_import(self):
+        client = Client.objects.create(
+            name='Client', context='**Principe 1**: tester *vite*', objectives='a ** b'
+        )
+        markdown = to_markdown(client)
+        client.delete()
+
+        import_markdown(markdown)
+        self.assertEqual(
+            Client.objects.values_list('context', 'objectives').get(),
+            ('**Principe 1**: tester *vite*', 'a ** b')
+        )
+
+
+class MarkdownChangeDetectionTests(TestCase):
+    def setUp(self):
+        import_markdown(generate_programme_markdown(sessions=2, sequences=2, breakouts=1))
+        self.client_obj = Client.objects.get()
+        self.exported = to_markdown(self.client_obj)
+
+    def test_unchanged_export_writes_nothing(self):
+        updated_at = Session.objects.values_list('updated_at', flat=True).first()
+        with CaptureQueriesContext(connection) as queries:
+            result = import_markdown(self.exported)
+
+        self.assertEqual(result.created + result.updated, [])
+        self.assertEqual(len(result.unchanged), len(self.exported.splitlines()))
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+        self.assertEqual(Session.objects.values_list('updated_at', flat=True).first(), updated_at)
+
+    def test_only_edited_line_is_updated(self):
+        session = Session.objects.get(title='Session 1')
+        edited = self.exported.replace('**title**: Session 1 ', '**title**: Session renommée ')
+        result = import_markdown(edited)
+
+        self.assertEqual(result.updated, [session])
+        session.refresh_from_db()
+        self.assertEqual(session.title, 'Session renommée')
+        self.assertEqual(import_markdown(edited).updated, [])
+
+    def test_dry_run_reports_changeset_without_writing(self):
+        sequence = Sequence.objects.filter(session__title='Session 1').first()
+        removed = [str(sequence.uuid), str(sequence.breakouts.get().uuid)]
+        lines = [line for line in self.exported.splitlines()
+                 if not any(obj_uuid in line for obj_uuid in removed)]
+        new_uuid = uuid.uuid4()
+        lines.append(f"### [@Session::{new_uuid}] **title**: Nouvelle session")
+        lines[0] = lines[0].replace('**name**: Benchmark Client', '**name**: Client renommé')
+
+        changes = import_markdown('\n'.join(lines), dry_run=True).changeset()
+
+        self.assertEqual(changes['create'], [f"Session ({new_uuid})"])
+        self.assertEqual(changes['update'], [f"Client ({self.client_obj.uuid})"])
+        self.assertEqual(changes['delete'], [f"Sequence ({sequence.uuid})"])
+        self.assertFalse(Session.objects.filter(uuid=new_uuid).exists())
+        self.assertEqual(Client.objects.get().name, self.client_obj.name)
+
+    def test_prune_soft_deletes_missing_children(self):
+        sequence = Sequence.objects.filter(session__title='Session 1').first()
+        removed = [str(sequence.uuid), str(sequence.breakouts.get().uuid)]
+        lines = [line for line in self.exported.splitlines()
+                 if not any(obj_uuid in line for obj_uuid in removed)]
+        result = import_markdown('\n'.join(lines), prune=True)
+
+        self.assertEqual(result.deleted, [sequence])
+        sequence.refresh_from_db()
+        self.assertEqual(sequence.status, 'deleted')
+        self.assertEqual(sequence.breakouts.get().status, 'normal')
+
+    def test_swapped_orders_respect_unique_constraint(self):
+        first, second = Sequence.objects.filter(session__title='Session 1').order_by('order')
+        # Échange les ordres des deux séquences de chaque session
+        swapped = (self.exported.replace('**order**: 1', '**order**: 0')
+                   .replace('**order**: 2', '**order**: 1').replace('**order**: 0', '**order**: 2'))
+        result = import_markdown(swapped)
+
+        self.assertEqual(result.errors, [])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.order, second.order), (2, 1))
+
+    def test_new_sequence_is_appended_to_existing_session(self):
+        session = Session.objects.get(title='Session 1')
+        new_uuid = uuid.uuid4()
+        import_markdown(
+            f"### [@Session::{session.uuid}]\n"
+            f"#### [@Sequence::{new_uuid}] **title**: Ajoutée **objective**: - "
+            f"**input_text**: - **output_text**: -"
+        )
+
+        self.assertEqual(Sequence.objects.get(uuid=new_uuid).order, 2 + 1024)
+
+
+class MarkdownStreamImportTests(TestCase):
+    def test_text_lines_from_gzip_chunks(self):
+        text = 'é' * 10 + '\nline two\n\nline four'
+        stream = io.BytesIO(gzip.compress(text.encode()))
+        self.assertEqual(list(iter_text_lines(stream, chunk_size=3)), text.split('\n'))
+
+    def test_parents_survive_batch_boundaries(self):
+        markdown = generate_programme_markdown(sessions=4, sequences=2, breakouts=2)
+        reports = list(MarkdownImporter(batch_size=3).run_stream(iter(markdown.split('\n'))))
+
+        self.assertEqual(len(reports), len(markdown.split('\n')) // 3 + 1)
+        self.assertEqual(reports[-1]['created'], len(markdown.split('\n')))
+        self.assertEqual(reports[-1]['errors'], [])
+        self.assertFalse(BreakOut.objects.filter(sequence__session__programme__isnull=True).exists())
+        self.assertEqual(Sequence.objects.filter(session__title='Session 3').count(), 2)
+
+
+class LoadMarkdownCommandTests(TestCase):
+    def test_loads_directory_and_deduplicates_uuids(self):
+        first = generate_programme_markdown(sessions=2, sequences=2, breakouts=1)
+        client_line = first.splitlines()[0]
+        client_uuid = client_line.split('::')[1].split(']')[0]
+        # Le second fichier redéclare le client avec un autre nom, puis y ajoute un programme
+        second = (
+            f"# [@Client::{client_uuid}] **name**: Doublon\n"
+            "## [@Programme::new] **name**: Programme B **description**: Description\n"
+            "### [@Session::bad] **title**: Broken"
+        )
+        # Lignes vides entre les lignes du premier fichier, puis une ligne invalide
+        spaced = '\n\n'.join(first.splitlines()) + '\n\n### [@Session::bad] **title**: Broken'
+        broken_line = 2 * len(first.splitlines()) + 1
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, 'a.md').write_text(spaced)
+            Path(directory, 'nested').mkdir()
+            Path(directory, 'nested', 'b.md').write_bytes(gzip.compress(second.encode()))
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('load_markdown', directory, pattern='*.md', workers=2, batch_size=4,
+                         stdout=stdout, stderr=stderr)
+
+        client = Client.objects.get()
+        self.assertEqual(client.name, 'Benchmark Client')
+        self.assertEqual(sorted(client.programmes.values_list('name', flat=True)),
+                         ['Benchmark Programme', 'Programme B'])
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertIn('1 doublons ignorés', stdout.getvalue())
+        self.assertIn('lignes/s', stdout.getvalue())
+        self.assertIn(f'a.md:{broken_line}:', stderr.getvalue())
+        self.assertIn('nested/b.md:3:', stderr.getvalue())
+
+
+class BenchmarkMarkdownCommandTests(TestCase):
+    def test_compares_against_saved_baseline(self):
+        options = {'sessions': [2], 'sequences': 2, 'breakouts': 1, 'stdout': io.StringIO()}
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = str(Path(directory, 'baseline.json'))
+            call_command('benchmark_markdown', save_baseline=baseline, **options)
+            stdout = io.StringIO()
+            call_command('benchmark_markdown', **{**options, 'stdout': stdout},
+                         baseline=baseline, tolerance=100, memory=False)
+
+        report = stdout.getvalue()
+        for scenario in ('parse', 'tokenizer', 'regex', 'import', 'reimport', 'dry-run', 'export', 'round-trip'):
+            self.assertIn(f'{scenario:>10}       12 ', report)
+        self.assertIn('queries +0', report)
+        self.assertNotIn('REGRESSION', report)
+        self.assertFalse(Client.objects.exists())
+
+    def test_legacy_regex_parses_like_the_tokenizer(self):
+        lines = lengthen_values(generate_programme_markdown(sessions=1, sequences=1, breakouts=1).split('\n'), 300)
+
+        self.assertEqual([legacy_tokenize_line(line) for line in lines], [tokenize_line(line) for line in lines])
+        self.assertGreater(len(tokenize_line(lines[0])[3][0][1]), 300)
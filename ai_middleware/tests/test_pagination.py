@@ -0,0 +1,131 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from ..models import Client, Session, Sequence
+from ..pagination import KeysetPagination
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        Session.objects.bulk_create([
+            Session(client=self.client_obj, title=f'Session {index}', context='x' * 1000,
+                    objectives='-', inputs='-', outputs='-', participants='-',
+                    design_principles='-', deliverables='-')
+            for index in range(25)
+        ])
+        self.url = reverse('session-list')
+
+    def collect(self, url):
+        titles, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [session['title'] for session in response.data['results']]
+            url, pages = response.data['next'], pages + 1
+        return titles, pages
+
+    def test_pages_cover_the_list_newest_first(self):
+        titles, pages = self.collect(f'{self.url}?page_size=10')
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, [f'Session {index}' for index in reversed(range(25))])
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get(f'{self.url}?page_size=10').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+
+        self.assertEqual([s['id'] for s in back['results']], [s['id'] for s in first['results']])
+        self.assertIsNone(back['previous'])
+
+    def test_page_cost_does_not_depend_on_position(self):
+        first = self.client.get(f'{self.url}?page_size=5').data
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+        # version de la liste (validateurs HTTP), page et sponsors des sessions
+        self.assertEqual(len(queries.captured_queries), 3)
+        self.assertNotIn('OFFSET', queries.captured_queries[1]['sql'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(f'{self.url}?cursor=nope')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pages_follow_the_requested_ordering(self):
+        for name in ('b', 'a', 'c', 'a'):
+            Client.objects.create(name=name, context='-', objectives='-')
+
+        names = []
+        url = f"{reverse('client-list')}?ordering=name&page_size=2"
+        while url:
+            data = self.client.get(url).data
+            names += [client['name'] for client in data['results']]
+            url = data['next']
+
+        self.assertEqual(names, ['Client', 'a', 'a', 'b', 'c'])
+        # Le curseur d'un autre tri n'est pas réutilisable
+        first = self.client.get(f"{reverse('client-list')}?ordering=name&page_size=2").data
+        other = first['next'].replace('ordering=name', 'ordering=-created_at')
+        self.assertEqual(self.client.get(other).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pages_follow_the_model_ordering(self):
+        session = Session.objects.first()
+        for order in (2000, 1000, 3000, 1500):
+            Sequence.objects.create(session=session, title=f'Séquence {order}', order=order)
+
+        def orders(query):
+            collected, url = [], f"{reverse('sequence-list')}?page_size=3{query}"
+            while url:
+                data = self.client.get(url).data
+                collected += [sequence['order'] for sequence in data['results']]
+                url = data['next']
+            return collected
+
+        self.assertEqual(orders(''), [1000, 1500, 2000, 3000])
+        self.assertEqual(orders('&ordering=-order'), [3000, 2000, 1500, 1000])
+
+    def test_unsupported_ordering_is_rejected(self):
+        request = Request(APIRequestFactory().get('/'))
+        with self.assertRaises(ValidationError):
+            KeysetPagination().paginate_queryset(Session.objects.order_by('programme'), request)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.session = Session.objects.create(client=self.client_obj, title='Session', context='Long contexte',
+                                              objectives='-', participants='A, B')
+        self.url = reverse('session-list')
+
+    def test_list_omits_large_text_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        row = response.data['results'][0]
+
+        self.assertIn('title', row)
+        self.assertNotIn('context', row)
+        # La première requête lit la version de la liste
+        self.assertNotIn('"context"', queries.captured_queries[1]['sql'])
+
+    def test_fields_selects_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{self.url}?fields=title,context')
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'uuid', 'title', 'context'})
+        self.assertNotIn('"participants"', queries.captured_queries[1]['sql'])
+        # Version et page, pas de requête des sponsors : le champ n'est pas demandé
+        self.assertEqual(len(queries.captured_queries), 2)
+
+    def test_retrieve_keeps_all_fields_unless_asked(self):
+        url = reverse('session-detail', args=[self.session.pk])
+        self.assertIn('context', self.client.get(url).data)
+        self.assertEqual(set(self.client.get(f'{url}?fields=title').data), {'id', 'uuid', 'title'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(f'{self.url}?fields=title,nope')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
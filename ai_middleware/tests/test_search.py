@@ -0,0 +1,109 @@
+import uuid
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..models import Client, Programme, Session, Sequence, BreakOut, SearchEntry
+from ..services import bulk_write, search
+from ..services.markdown_import import import_markdown
+from ..services.markdown_service import to_markdown
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Acme', context='Industrie', objectives='Croissance')
+        self.programme = Programme.objects.create(client=self.client_obj, name='Transformation',
+                                                  description='Programme de transformation numérique')
+        self.session = Session.objects.create(client=self.client_obj, programme=self.programme,
+                                              title='Atelier stratégie', context='Vision produit',
+                                              objectives='Aligner les équipes')
+        self.sequence = Sequence.objects.create(session=self.session, title='Brainstorming', order=1,
+                                                objective='Idées de produit')
+        self.breakout = BreakOut.objects.create(sequence=self.sequence, title='Groupe stratégie',
+                                                description='Priorisation', objective='Choisir')
+
+    def test_search_ranks_title_matches_first(self):
+        hits = search.search('produit')
+        self.assertEqual({hit.uuid for hit in hits}, {self.session.uuid, self.sequence.uuid})
+
+        sequence = Sequence.objects.create(session=self.session, title='Produit', objective='-', order=2)
+        self.assertEqual(search.search('produit')[0].uuid, sequence.uuid)
+
+    def test_search_matches_prefixes_and_ignores_accents(self):
+        self.assertEqual([hit.uuid for hit in search.search('transfo')], [self.programme.uuid])
+        self.assertEqual(len(search.search('strategie')), 2)
+        self.assertEqual(search.search('"OR ('), [])
+
+    def test_fallback_backend_filters_without_index(self):
+        hits = search.FALLBACK.match(connection, ['groupe', 'prior'], [], 10)
+        self.assertEqual([hit.uuid for hit in hits], [self.breakout.uuid])
+        self.assertEqual(search.FALLBACK.match(connection, ['groupe'], ['Session'], 10), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.sequence.title = 'Cartographie'
+        self.sequence.save()
+        self.assertEqual([hit.uuid for hit in search.search('cartographie')], [self.sequence.uuid])
+        self.assertEqual(search.search('brainstorming'), [])
+
+        self.sequence.status = 'deleted'
+        self.sequence.save()
+        self.assertEqual(search.search('cartographie'), [])
+
+        breakout_uuid = self.breakout.uuid
+        self.breakout.delete()
+        self.assertFalse(SearchEntry.objects.filter(uuid=breakout_uuid).exists())
+
+    def test_entries_keep_their_key_and_resolve_through_the_uuid_registry(self):
+        entry_id = SearchEntry.objects.get(uuid=self.sequence.uuid).pk
+        self.sequence.title = 'Cartographie'
+        self.sequence.save()
+        self.assertEqual(SearchEntry.objects.get(uuid=self.sequence.uuid).pk, entry_id)
+
+        for backend in (search.get_backend(connection), search.FALLBACK):
+            hits = backend.match(connection, ['cartographie'], ['Sequence'], 10)
+            self.assertEqual([(hit.model, hit.object_id) for hit in hits], [('Sequence', self.sequence.pk)])
+
+    def test_bulk_writes_are_indexed(self):
+        bulk_write.bulk_create(Session, [{'client': self.client_obj, 'title': 'Rétrospective'}])
+
+        new_uuid = uuid.uuid4()
+        markdown = to_markdown(self.session).replace('Atelier stratégie', 'Atelier roadmap')
+        import_markdown(f"{markdown}\n#### [@Sequence::{new_uuid}] **title**: Restitution **objective**: Synthèse")
+
+        self.assertEqual([hit.uuid for hit in search.search('roadmap')], [self.session.uuid])
+        self.assertEqual([hit.uuid for hit in search.search('restitution')], [new_uuid])
+        self.assertEqual([hit.title for hit in search.search('rétrospective')], ['Rétrospective'])
+
+        removed = (str(self.sequence.uuid), str(self.breakout.uuid))
+        import_markdown('\n'.join(line for line in markdown.splitlines()
+                                  if not any(obj_uuid in line for obj_uuid in removed)), prune=True)
+        self.assertEqual(search.search('brainstorming'), [])
+
+    def test_list_endpoint_orders_by_relevance(self):
+        Session.objects.create(client=self.client_obj, title='Bilan', context='Suite de l\'atelier stratégie')
+        url = reverse('session-list')
+
+        response = self.client.get(url, {'q': 'stratégie', 'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s['title'] for s in response.data['results']], ['Atelier stratégie'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([s['title'] for s in response.data['results']], ['Bilan'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(url, {'q': 'inconnu'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_endpoint_mixes_entity_types(self):
+        response = self.client.get(reverse('search'), {'q': 'stratégie'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({(hit['type'], hit['uuid']) for hit in response.data['results']},
+                         {('session', self.session.uuid), ('breakout', self.breakout.uuid)})
+
+        response = self.client.get(reverse('search'), {'q': 'stratégie', 'types': 'breakout'})
+        self.assertEqual([hit['uuid'] for hit in response.data['results']], [self.breakout.uuid])
+
+    def test_search_endpoint_validates_parameters(self):
+        self.assertEqual(self.client.get(reverse('search')).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('search'), {'q': 'x', 'types': 'sponsor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
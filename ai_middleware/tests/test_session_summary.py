@@ -0,0 +1,85 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..management.commands.benchmark_markdown import generate_programme_markdown
+from ..models import Session, Sequence, BreakOut
+from ..services.markdown_import import import_markdown
+from ..services.session_summary import parse_fields
+
+
+class SessionSummaryTests(TestCase):
+    def setUp(self):
+        import_markdown(generate_programme_markdown(sessions=6, sequences=3, breakouts=2))
+        self.sessions = list(Session.objects.order_by('title'))
+
+    def export_summary(self, session, **params):
+        return self.client.get(reverse('session-export-summary', kwargs={'pk': session.pk}), params)
+
+    def summaries(self, sessions, headers=None, **params):
+        params['uuids'] = ','.join(str(session.uuid) for session in sessions)
+        return self.client.get(reverse('session-summaries'), params, **(headers or {}))
+
+    def test_summary_is_nested_in_order(self):
+        session = self.sessions[0]
+        response = self.export_summary(session)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], session.title)
+        self.assertEqual([s['order'] for s in response.data['sequences']], [1, 2, 3])
+        self.assertEqual(len(response.data['sequences'][0]['breakouts']), 2)
+        self.assertEqual(set(response.data['sequences'][0]['breakouts'][0]), {'uuid', 'title', 'objective'})
+
+    def test_batch_query_count_does_not_depend_on_size(self):
+        # Validateurs, puis une requête par niveau
+        with self.assertNumQueries(4):
+            response = self.summaries(self.sessions[:2])
+        with self.assertNumQueries(4):
+            response = self.summaries(self.sessions)
+
+        self.assertEqual([s['uuid'] for s in response.data['results']], [s.uuid for s in self.sessions])
+        self.assertEqual(response.data['missing'], [])
+
+    def test_fields_selector(self):
+        response = self.summaries(self.sessions[:1], fields='title,sequences.breakouts.title')
+        summary = response.data['results'][0]
+
+        self.assertEqual(set(summary), {'uuid', 'title', 'sequences'})
+        self.assertEqual(set(summary['sequences'][0]), {'uuid', 'breakouts'})
+        self.assertEqual(set(summary['sequences'][0]['breakouts'][0]), {'uuid', 'title'})
+        self.assertEqual(set(parse_fields('title')), {'session'})
+        with self.assertRaises(ValueError):
+            parse_fields('sequences.fingerprint')
+        self.assertEqual(self.summaries(self.sessions[:1], fields='nope').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_conditional_request_skips_the_build(self):
+        response = self.summaries(self.sessions)
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.summaries(self.sessions, headers={'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        BreakOut.objects.filter(sequence__session=self.sessions[0]).first().delete()
+        response = self.summaries(self.sessions, headers={'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        sequence = Sequence.objects.filter(session=self.sessions[1]).first()
+        sequence.title = 'Renommée'
+        sequence.save()
+        self.assertEqual(
+            self.summaries(self.sessions, headers={'HTTP_IF_NONE_MATCH': response['ETag']}).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_deleted_sessions_are_missing(self):
+        deleted = self.sessions[1]
+        etag = self.summaries(self.sessions[:2])['ETag']
+        Session.objects.filter(pk=deleted.pk).update(status='deleted')
+
+        response = self.summaries(self.sessions[:2], headers={'HTTP_IF_NONE_MATCH': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([s['uuid'] for s in response.data['results']], [self.sessions[0].uuid])
+        self.assertEqual(response.data['missing'], [deleted.uuid])
+        self.assertEqual(self.export_summary(deleted).status_code, status.HTTP_404_NOT_FOUND)
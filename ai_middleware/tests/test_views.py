@@ -1,6 +1,18 @@
+import gzip
+import json
+import os
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client as TestClient
 from django.urls import reverse
-from ..models import Client, Session
+from ..management.commands.benchmark_markdown import generate_programme_markdown
+from ..models import Client, Programme, Session, ImportJob
+from ..services import uuid_registry
+from ..services.import_jobs import fail_interrupted_jobs, fail_stale_jobs, run_import_job
+from ..services.markdown_import import MarkdownImporter, import_markdown
+from ..services.markdown_service import to_markdown, iter_markdown
 from rest_framework import status
 
 class MarkdownViewsTests(TestCase):
@@ -59,4 +71,234 @@ class MarkdownViewsTests(TestCase):
         url = reverse('markdown-import')
         response = self.client.post(url, {'markdown': 'Invalid markdown'}, content_type='application/json')
         
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class MarkdownStreamingExportTests(TestCase):
+    def setUp(self):
+        self.test_client = Client.objects.create(
+            name='Test Client',
+            context='Test Context',
+            objectives='Test Objectives'
+        )
+        self.programme = Programme.objects.create(
+            name='Test Programme',
+            client=self.test_client,
+            description='Test Description'
+        )
+        for index in range(3):
+            Session.objects.create(
+                title=f'Session {index}',
+                programme=self.programme,
+                client=self.test_client,
+                context='Test Context',
+                objectives='Test Objectives',
+                inputs='Test Inputs',
+                outputs='Test Outputs',
+                participants='Test Participants',
+                design_principles='Test Principles',
+                deliverables='Test Deliverables'
+            )
+        self.url = reverse('markdown-export', kwargs={
+            'model_type': 'client',
+            'pk': self.test_client.pk
+        })
+
+    def test_stream_query_param(self):
+        response = self.client.get(self.url, {'stream': '1'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/markdown; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content, to_markdown(self.test_client))
+
+    def test_stream_accept_header(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/markdown')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+    def test_iter_markdown_matches_to_markdown_across_batches(self):
+        lines = list(iter_markdown(self.test_client, batch_size=2))
+        self.assertEqual(''.join(lines), to_markdown(self.test_client))
+        self.assertEqual(len(lines), 5)
+
+
+class MarkdownExportByUuidTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='Client', context='Contexte', objectives='Objectifs')
+        self.session = Session.objects.create(client=self.client_obj, title='Session')
+
+    def test_any_model_is_found_by_uuid(self):
+        url = reverse('markdown-export-uuid', kwargs={'uuid': self.session.uuid})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(f'[@Session::{self.session.uuid}]', response.data['markdown'])
+
+    def test_unknown_or_deleted_uuid(self):
+        for obj_uuid in (uuid.uuid4(), self.session.uuid):
+            Session.objects.filter(pk=self.session.pk).delete()
+            response = self.client.get(reverse('markdown-export-uuid', kwargs={'uuid': obj_uuid}))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_registry_resolves_in_one_query(self):
+        uuid_registry.lru.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(uuid_registry.resolve(self.session.uuid), (Session, self.session.pk))
+        with self.assertNumQueries(0):
+            uuid_registry.resolve(self.session.uuid)
+
+    def test_bulk_imported_objects_are_registered(self):
+        result = import_markdown(generate_programme_markdown(sessions=1, sequences=1, breakouts=1))
+        for obj in result.created:
+            self.assertEqual(uuid_registry.get_object(obj.uuid), obj)
+
+
+class MarkdownStreamingImportTests(TestCase):
+    def setUp(self):
+        self.url = reverse('markdown-import')
+        self.markdown = generate_programme_markdown(sessions=3, sequences=2, breakouts=1)
+
+    def read_reports(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_raw_markdown_body(self):
+        with self.settings(MARKDOWN_IMPORT_BATCH_SIZE=5):
+            response = self.client.post(self.url, self.markdown, content_type='text/markdown')
+        reports = self.read_reports(response)
+
+        self.assertGreater(len(reports), 1)
+        self.assertEqual([r['lines'] for r in reports], sorted(r['lines'] for r in reports))
+        self.assertTrue(reports[-1]['success'])
+        self.assertEqual(reports[-1]['created'], len(self.markdown.splitlines()))
+        self.assertEqual(Session.objects.filter(programme__name='Benchmark Programme').count(), 3)
+
+    def test_gzip_body(self):
+        response = self.client.post(
+            self.url, gzip.compress(self.markdown.encode()), content_type='application/gzip'
+        )
+        reports = self.read_reports(response)
+
+        self.assertEqual(reports[-1]['created'], len(self.markdown.splitlines()))
+
+    def test_multipart_upload(self):
+        upload = SimpleUploadedFile('programme.md', self.markdown.encode(), content_type='text/markdown')
+        response = self.client.post(self.url, {'file': upload})
+        reports = self.read_reports(response)
+
+        self.assertTrue(reports[-1]['done'])
+        self.assertEqual(reports[-1]['errors'], [])
+        self.assertEqual(Client.objects.filter(name='Benchmark Client').count(), 1)
+
+
+class InlineExecutor:
+    """Exécute le job immédiatement, dans la connexion du test"""
+    def submit(self, fn, job_id):
+        run_import_job(job_id)
+
+
+class MarkdownAsyncImportTests(TestCase):
+    def setUp(self):
+        self.url = reverse('markdown-import')
+        self.markdown = generate_programme_markdown(sessions=3, sequences=2, breakouts=1)
+
+    def post_async(self, *args, **kwargs):
+        with mock.patch('ai_middleware.services.import_jobs.get_executor', return_value=InlineExecutor()):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(*args, **kwargs)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    def test_job_runs_and_reports_progress(self):
+        with self.settings(MARKDOWN_IMPORT_BATCH_SIZE=5):
+            response = self.post_async(
+                f'{self.url}?async=1', self.markdown + '\n### [@Session::bad] **title**: Broken',
+                content_type='text/markdown'
+            )
+        job = ImportJob.objects.get(uuid=response.data['job_id'])
+
+        self.assertEqual(response.data['total'], len(self.markdown.splitlines()) + 1)
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.processed, job.total)
+        self.assertEqual(job.result['created'], len(self.markdown.splitlines()))
+        self.assertEqual([error['line'] for error in job.errors], [job.total])
+        self.assertFalse(os.path.exists(job.source))
+
+        status_response = self.client.get(response['Location'])
+        self.assertEqual(status_response.data['status'], 'done')
+        self.assertEqual(status_response.data['processed'], job.total)
+        self.assertNotIn('source', status_response.data)
+
+    def test_json_dry_run_job(self):
+        response = self.post_async(
+            self.url, {'markdown': self.markdown, 'async': True, 'dry_run': True},
+            content_type='application/json'
+        )
+        job = ImportJob.objects.get(uuid=response.data['job_id'])
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(len(job.result['changes']['create']), len(self.markdown.splitlines()))
+        self.assertFalse(Session.objects.exists())
+
+    def test_whole_document_job_reports_parse_progress(self):
+        progress = []
+        importer = MarkdownImporter(batch_size=5, dry_run=True)
+        importer.run_lines(self.markdown.splitlines(), on_progress=progress.append)
+        self.assertEqual(progress, sorted(progress))
+        self.assertGreater(len(progress), 2)
+        self.assertEqual(progress[-1], len(self.markdown.splitlines()))
+
+        # La progression de l'analyse est enregistrée avant l'import du document
+        seen = []
+        import_records = MarkdownImporter.import_records
+
+        def spy(importer, records, result):
+            seen.append(ImportJob.objects.values_list('processed', flat=True).get())
+            return import_records(importer, records, result)
+
+        with self.settings(MARKDOWN_IMPORT_BATCH_SIZE=5), \
+                mock.patch.object(MarkdownImporter, 'import_records', spy):
+            response = self.post_async(f'{self.url}?async=1&prune=1', self.markdown, content_type='text/markdown')
+        job = ImportJob.objects.get(uuid=response.data['job_id'])
+
+        self.assertEqual(seen, [job.total])
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.result['created'], len(self.markdown.splitlines()))
+
+    def test_interrupted_jobs_are_failed_at_startup(self):
+        with mock.patch('ai_middleware.services.import_jobs.get_executor'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'{self.url}?async=1', self.markdown, content_type='text/markdown')
+        job = ImportJob.objects.get(uuid=response.data['job_id'])
+        recent = ImportJob.objects.create(source='/nonexistent', status='running')
+        done = ImportJob.objects.create(source='/nonexistent', status='done')
+
+        # Au démarrage, même un job interrompu à l'instant ne reprendra pas
+        self.assertEqual(fail_interrupted_jobs(), 2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(os.path.exists(job.source))
+        self.assertEqual(ImportJob.objects.get(pk=recent.pk).status, 'failed')
+        self.assertEqual(ImportJob.objects.get(pk=done.pk).status, 'done')
+        # Un thread qui recevrait encore le job ne le relance pas
+        self.assertEqual(run_import_job(job.pk).status, 'failed')
+
+    def test_stale_jobs_are_failed_while_running(self):
+        stale = ImportJob.objects.create(source='/nonexistent', status='running')
+        recent = ImportJob.objects.create(source='/nonexistent', status='running')
+
+        self.assertEqual(fail_stale_jobs(), 0)
+        ImportJob.objects.filter(pk=stale.pk).update(updated_at=stale.updated_at - timedelta(hours=1))
+        self.assertEqual(fail_stale_jobs(), 1)
+
+        self.assertEqual(ImportJob.objects.get(pk=stale.pk).status, 'failed')
+        self.assertEqual(ImportJob.objects.get(pk=recent.pk).status, 'running')
+
+    def test_unknown_job(self):
+        response = self.client.get(reverse('markdown-import-job', kwargs={'uuid': uuid.uuid4()}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,21 +1,27 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    ConversationViewSet, MarkdownExportView, MarkdownImportView,
-    ClientViewSet, ProgrammeViewSet, SessionViewSet, SequenceViewSet, BreakOutViewSet
+    ConversationViewSet, MarkdownExportView, MarkdownImportView, ImportJobView,
+    ClientViewSet, ProgrammeViewSet, SponsorViewSet, SessionViewSet, SequenceViewSet, BreakOutViewSet, SearchView,
+    ClientTreeView, BatchView
 )
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet)
 router.register(r'clients', ClientViewSet)
 router.register(r'programmes', ProgrammeViewSet)
+router.register(r'sponsors', SponsorViewSet)
 router.register(r'sessions', SessionViewSet)
 router.register(r'sequences', SequenceViewSet)
 router.register(r'breakouts', BreakOutViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('clients/<uuid:uuid>/tree/', ClientTreeView.as_view(), name='client-tree'),
     path('markdown/export/<uuid:uuid>/', MarkdownExportView.as_view(), name='markdown-export-uuid'),
     path('markdown/export/<str:model_type>/<int:pk>/', MarkdownExportView.as_view(), name='markdown-export'),
     path('markdown/import/', MarkdownImportView.as_view(), name='markdown-import'),
+    path('markdown/import/jobs/<uuid:uuid>/', ImportJobView.as_view(), name='markdown-import-job'),
 ]
\ No newline at end of file
@@ -1,14 +1,24 @@
 from .conversation_views import ConversationViewSet
-from .markdown_views import MarkdownExportView, MarkdownImportView
-from .model_views import ClientViewSet, ProgrammeViewSet, SessionViewSet, SequenceViewSet, BreakOutViewSet
+from .markdown_views import MarkdownExportView, MarkdownImportView, ImportJobView
+from .model_views import (
+    ClientViewSet, ProgrammeViewSet, SponsorViewSet, SessionViewSet, SequenceViewSet, BreakOutViewSet
+)
+from .search_views import SearchView
+from .tree_views import ClientTreeView
+from .batch_views import BatchView
 
 __all__ = [
     'ConversationViewSet',
     'MarkdownExportView',
     'MarkdownImportView',
+    'ImportJobView',
     'ClientViewSet',
     'ProgrammeViewSet',
+    'SponsorViewSet',
     'SessionViewSet',
     'SequenceViewSet',
-    'BreakOutViewSet'
+    'BreakOutViewSet',
+    'SearchView',
+    'ClientTreeView',
+    'BatchView'
 ]
\ No newline at end of file
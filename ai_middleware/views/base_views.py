@@ -1,15 +1,23 @@
+import uuid
 from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db import models
+from django.db import IntegrityError, transaction
 from ..models import BreakOut, Sequence
 from ..serializers import BreakOutSerializer, SequenceSerializer
+from ..services import ordering
+from ..filters import FullTextSearchFilter
+from .mixins import (
+    BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin, ConditionalGetMixin, SparseFieldsMixin
+)
 
-class BreakOutViewSet(viewsets.ModelViewSet):
+class BreakOutViewSet(ConditionalGetMixin, SparseFieldsMixin, BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin,
+                      viewsets.ModelViewSet):
     queryset = BreakOut.objects.all()
     serializer_class = BreakOutSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['sequence']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'title']
@@ -21,40 +29,16 @@ class BreakOutViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(sequence_id=sequence_id)
         return queryset
 
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-        
-        breakouts = []
-        errors = []
-        
-        for index, item in enumerate(serializer.validated_data):
-            try:
-                breakout = BreakOut.objects.create(**item)
-                breakouts.append(breakout)
-            except Exception as e:
-                errors.append({
-                    "index": index,
-                    "error": str(e)
-                })
-        
-        response_data = {
-            "success": self.get_serializer(breakouts, many=True).data
-        }
-        if errors:
-            response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-            
-        return Response(response_data, status=status.HTTP_201_CREATED)
-
-class SequenceViewSet(viewsets.ModelViewSet):
+class SequenceViewSet(ConditionalGetMixin, SparseFieldsMixin, BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin,
+                      viewsets.ModelViewSet):
     queryset = Sequence.objects.all()
     serializer_class = SequenceSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['session']
     search_fields = ['title', 'objective']
     ordering_fields = ['order', 'created_at', 'title']
+    # L'ordre est unique dans une session
+    bulk_update_excluded_fields = ('order',)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -63,42 +47,60 @@ class SequenceViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(session_id=session_id)
         return queryset
 
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-        
-        sequences = []
-        errors = []
-        
-        for index, item in enumerate(serializer.validated_data):
-            try:
-                # Si l'ordre n'est pas spécifié, le mettre à la fin
-                if 'order' not in item:
-                    max_order = Sequence.objects.filter(
-                        session_id=item['session'].id
-                    ).aggregate(max_order=models.Max('order'))['max_order'] or 0
-                    item['order'] = max_order + 1
-                
-                sequence = Sequence.objects.create(**item)
-                sequences.append(sequence)
-            except Exception as e:
-                errors.append({
-                    "index": index,
-                    "error": str(e)
-                })
-        
-        response_data = {
-            "success": self.get_serializer(sequences, many=True).data
+    def perform_create(self, serializer):
+        # Si l'ordre n'est pas spécifié, placer la séquence à la fin de sa session
+        if serializer.validated_data.get('order') is None:
+            session = serializer.validated_data['session']
+            order = ordering.allocate_sequence_orders({session.id: 1})[session.id][0]
+            self.save_with_unique_order(serializer, order=order)
+        else:
+            self.save_with_unique_order(serializer)
+
+    def perform_update(self, serializer):
+        self.save_with_unique_order(serializer)
+
+    def save_with_unique_order(self, serializer, **kwargs):
+        """
+        L'unicité de (session, order) n'est vérifiée que par la base : un ordre déjà pris
+        donne une erreur de validation plutôt qu'une erreur serveur.
+        """
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            data = {**serializer.validated_data, **kwargs}
+            instance = serializer.instance
+            session = data.get('session', getattr(instance, 'session', None))
+            order = data.get('order', getattr(instance, 'order', None))
+            taken = Sequence.objects.filter(session=session, order=order)
+            if instance is not None:
+                taken = taken.exclude(pk=instance.pk)
+            if not taken.exists():
+                raise
+            raise ValidationError({'order': ["Cet ordre est déjà utilisé dans la session"]})
+
+    def prepare_bulk_items(self, items):
+        # Si l'ordre n'est pas spécifié, placer les séquences à la fin de leur session,
+        # avec un seul bloc d'ordres réservé par session pour tout le lot
+        counts = {}
+        for item in items:
+            if item.get('order') is None:
+                counts[item['session'].id] = counts.get(item['session'].id, 0) + 1
+        next_orders = {
+            session_id: iter(orders)
+            for session_id, orders in ordering.allocate_sequence_orders(counts).items()
         }
-        if errors:
-            response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-            
-        return Response(response_data, status=status.HTTP_201_CREATED)
+        for item in items:
+            if item.get('order') is None:
+                item['order'] = next(next_orders[item['session'].id])
+        return items
 
     @action(detail=True, methods=['post'])
     def reorder(self, request, pk=None):
+        """
+        Déplace une séquence à la position `order` (à partir de 1) dans sa session.
+        Les ordres sont espacés : seule la séquence déplacée est réécrite dans le cas courant.
+        """
         sequence = self.get_object()
         new_order = request.data.get('order')
         
@@ -107,22 +109,48 @@ class SequenceViewSet(viewsets.ModelViewSet):
                 {'error': 'Le paramètre order est requis'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        # Déplacer les autres séquences si nécessaire
-        if new_order > sequence.order:
-            Sequence.objects.filter(
-                session=sequence.session,
-                order__gt=sequence.order,
-                order__lte=new_order
-            ).update(order=models.F('order') - 1)
-        else:
-            Sequence.objects.filter(
-                session=sequence.session,
-                order__gte=new_order,
-                order__lt=sequence.order
-            ).update(order=models.F('order') + 1)
-            
-        sequence.order = new_order
-        sequence.save()
+        try:
+            new_order = int(new_order)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Le paramètre order doit être un entier'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            ordering.move_sequence(sequence, new_order)
         
-        return Response(self.get_serializer(sequence).data)
\ No newline at end of file
+        return Response(self.get_serializer(sequence).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_reorder(self, request):
+        """
+        Applique l'ordre complet des séquences d'une session, donné par la liste de leurs UUID,
+        en une seule instruction UPDATE.
+        """
+        uuids = request.data.get('sequences')
+        if not isinstance(uuids, list) or not uuids:
+            return Response(
+                {'error': 'Le paramètre sequences doit être une liste non vide d\'UUID'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            uuids = [uuid.UUID(str(value)) for value in uuids]
+        except ValueError:
+            return Response({'error': 'UUID invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(set(uuids)) != len(uuids):
+            return Response({'error': 'UUID en double'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = list(Sequence.objects.filter(
+            session__in=Sequence.objects.filter(uuid=uuids[0]).values('session')
+        ).values_list('uuid', 'pk', 'session_id'))
+        pks = {row[0]: row[1] for row in rows}
+        if set(pks) != set(uuids):
+            return Response(
+                {'error': 'La liste doit contenir exactement les séquences d\'une même session'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            sequences = ordering.apply_sequence_order(rows[0][2], [pks[obj_uuid] for obj_uuid in uuids])
+        return Response(self.get_serializer(sequences, many=True).data)
@@ -0,0 +1,214 @@
+import io
+import json
+import logging
+import re
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import views, status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Référence au résultat d'une opération précédente : {{nom.champ}} ou {{index.champ.sous_champ}}
+REFERENCE_RE = re.compile(r'\{\{\s*([\w-]+)((?:\.[\w-]+)*)\s*\}\}')
+
+# En-têtes de la requête englobante à ne pas transmettre aux sous-requêtes
+DROPPED_HEADERS = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def get_max_operations():
+    return getattr(settings, 'BATCH_MAX_OPERATIONS', 100)
+
+
+class UnresolvedReference(Exception):
+    """Référence impossible à résoudre ; `status_code` est le code renvoyé pour l'opération"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Rollback(Exception):
+    """Annule la transaction d'un lot atomique après l'échec d'une opération"""
+
+
+def lookup(results, name, attributes):
+    if name not in results:
+        raise UnresolvedReference(f"Opération inconnue : {name}", status.HTTP_400_BAD_REQUEST)
+    result = results[name]
+    if result['status'] >= 400:
+        raise UnresolvedReference(f"L'opération {name} a échoué", status.HTTP_424_FAILED_DEPENDENCY)
+    value = result['body']
+    for attribute in attributes:
+        try:
+            value = value[int(attribute)] if isinstance(value, list) else value[attribute]
+        except (KeyError, IndexError, ValueError, TypeError):
+            path = '.'.join([name, *attributes])
+            raise UnresolvedReference(f"Champ introuvable : {path}", status.HTTP_400_BAD_REQUEST)
+    return value
+
+
+def substitute(value, results):
+    """
+    Remplace les références aux résultats précédents dans une valeur du corps ou le chemin.
+    Une chaîne réduite à une référence prend la valeur référencée telle quelle (nombre, liste…),
+    une référence au milieu d'un texte y est insérée sous forme de chaîne.
+    """
+    if isinstance(value, dict):
+        return {key: substitute(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, results) for item in value]
+    if not isinstance(value, str) or '{{' not in value:
+        return value
+
+    def get(match):
+        return lookup(results, match.group(1), [part for part in match.group(2).split('.') if part])
+
+    whole = REFERENCE_RE.fullmatch(value.strip())
+    if whole:
+        return get(whole)
+    return REFERENCE_RE.sub(lambda match: str(get(match)), value)
+
+
+class BatchView(views.APIView):
+    """
+    Exécute une liste ordonnée d'opérations sur l'API en une seule requête HTTP, en appelant
+    directement les vues concernées : le coût HTTP, l'authentification et les middlewares
+    ne sont payés qu'une fois.
+
+    Corps : {"atomic": false, "operations": [{"id": "s", "method": "POST", "path": "/api/sessions/",
+    "body": {...}}, {"method": "POST", "path": "/api/sequences/", "body": {"session": "{{s.id}}"}}]}
+
+    Une opération peut référencer le résultat d'une précédente, par son `id` ou son index.
+    Une exception levée par une vue devient un résultat 500 pour cette opération seule.
+    En mode atomique, toutes les opérations s'exécutent dans une transaction annulée au premier
+    échec ; seules les écritures y sont acceptées, pour qu'aucune lecture ne mette en cache des
+    données qui seraient ensuite annulées.
+    """
+
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        atomic = bool(request.data.get('atomic')) if isinstance(request.data, dict) else False
+        error = self.validate(operations, atomic)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not atomic:
+            return Response({'results': self.run(request, operations)})
+
+        results = []
+        try:
+            with transaction.atomic():
+                results = self.run(request, operations, stop_on_error=True)
+                if results and results[-1]['status'] >= 400:
+                    raise Rollback()
+        except Rollback:
+            return Response(
+                {'rolled_back': True, 'failed': len(results) - 1, 'results': results},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'results': results})
+
+    def validate(self, operations, atomic):
+        if not isinstance(operations, list) or not operations:
+            return 'operations doit être une liste non vide'
+        if len(operations) > get_max_operations():
+            return f'{get_max_operations()} opérations au plus par lot'
+        names = set()
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                return f'Opération {index} : objet attendu'
+            method = str(operation.get('method', '')).upper()
+            if method not in METHODS:
+                return f'Opération {index} : méthode invalide'
+            if atomic and method not in WRITE_METHODS:
+                return f'Opération {index} : un lot atomique ne contient que des écritures'
+            if not isinstance(operation.get('path'), str) or not operation['path'].startswith('/'):
+                return f'Opération {index} : chemin invalide'
+            name = str(operation.get('id', index))
+            if name in names:
+                return f'Opération {index} : identifiant {name} déjà utilisé'
+            names.add(name)
+        return None
+
+    def run(self, request, operations, stop_on_error=False):
+        results, by_name = [], {}
+        for index, operation in enumerate(operations):
+            name = str(operation.get('id', index))
+            result = {'id': name, **self.execute(request, operation, by_name)}
+            results.append(result)
+            by_name[name] = by_name[str(index)] = result
+            if stop_on_error and result['status'] >= 400:
+                break
+        return results
+
+    def execute(self, request, operation, results):
+        """
+        Returns:
+            dict: {'status', 'body'} de l'opération
+        """
+        method = operation['method'].upper()
+        try:
+            path = str(substitute(operation['path'], results))
+            body = substitute(operation.get('body'), results)
+        except UnresolvedReference as e:
+            return {'status': e.status_code, 'body': {'error': str(e)}}
+
+        path, _, query = path.partition('?')
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': {'error': 'Not found'}}
+        view_class = getattr(match.func, 'cls', None)
+        if (view_class is None or view_class is BatchView
+                or not view_class.__module__.startswith('ai_middleware.views')):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'error': 'Chemin hors de l\'API'}}
+
+        sub_request = self.make_request(request, method, path, query, body)
+        try:
+            # Chaque opération a son point de sauvegarde : une erreur n'annule que ses propres écritures
+            with transaction.atomic():
+                response = match.func(sub_request, *match.args, **match.kwargs)
+                content = self.read_content(response)
+        except Exception:
+            logger.exception("Batch operation %s %s failed", method, path)
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'error': 'Erreur interne'}}
+        return {'status': response.status_code, 'body': content}
+
+    def read_content(self, response):
+        if hasattr(response, 'data'):
+            return response.data
+        if response.streaming:
+            return b''.join(response.streaming_content).decode('utf-8')
+        return response.content.decode('utf-8') or None
+
+    def make_request(self, request, method, path, query, body):
+        """Sous-requête qui reprend l'utilisateur et les en-têtes de la requête du lot"""
+        outer = request._request
+        payload = json.dumps(body, cls=JSONEncoder).encode('utf-8') if body is not None else b''
+        sub = HttpRequest()
+        sub.method = method
+        sub.path = sub.path_info = path
+        sub.META = {key: value for key, value in outer.META.items() if key not in DROPPED_HEADERS}
+        sub.META.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+        })
+        sub.GET = QueryDict(query)
+        sub.COOKIES = outer.COOKIES
+        sub._stream = io.BytesIO(payload)
+        sub._read_started = False
+        if hasattr(outer, 'user'):
+            sub.user = outer.user
+        # La requête du lot a déjà passé la vérification CSRF
+        sub._dont_enforce_csrf_checks = True
+        return sub
@@ -0,0 +1,36 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def is_conditional(request):
+    """Indique si la requête porte des validateurs à comparer"""
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def conditional_response(request, version, build):
+    """
+    Répond 304 si le client a déjà la version courante, sinon avec `build()`. Les validateurs
+    ETag et Last-Modified viennent de `version`, calculée sans construire la réponse.
+
+    Args:
+        version: (statistiques, date de dernière modification) ; l'ETag les combine avec l'URL
+            et l'en-tête Accept, qui changent la représentation renvoyée
+        build: Fonction qui construit la réponse complète
+    """
+    stats, last_modified = version
+    key = repr((request.get_full_path(), request.META.get('HTTP_ACCEPT'), stats))
+    etag = quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest())
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Le client garde la réponse mais la revalide à chaque usage
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -4,8 +4,9 @@ from rest_framework.response import Response
 from ..models import Conversation
 from ..serializers import ConversationSerializer
 from ..services import AIService
+from .mixins import ConditionalGetMixin, SparseFieldsMixin
 
-class ConversationViewSet(viewsets.ModelViewSet):
+class ConversationViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Conversation.objects.all()
     serializer_class = ConversationSerializer
 
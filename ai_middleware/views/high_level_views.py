@@ -2,15 +2,22 @@ from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count
-from ..models import Programme, Client
+from django.db.models import Exists, OuterRef
+from ..models import Programme, Client, Session
 from ..serializers import (ProgrammeSerializer, ClientSerializer,
                          ClientLightSerializer, SessionSerializer)
-
-class ProgrammeViewSet(viewsets.ModelViewSet):
+from ..services import counters, dashboard_cache, versions
+from ..filters import FullTextSearchFilter
+from .conditional import conditional_response
+from .mixins import (
+    BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin, ConditionalGetMixin, SparseFieldsMixin
+)
+
+class ProgrammeViewSet(ConditionalGetMixin, SparseFieldsMixin, BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin,
+                       viewsets.ModelViewSet):
     queryset = Programme.objects.all()
     serializer_class = ProgrammeSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['client']
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
@@ -22,65 +29,29 @@ class ProgrammeViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(client_id=client_id)
         return queryset
 
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-
-        programmes = []
-        errors = []
-
-        for index, item in enumerate(serializer.validated_data):
-            try:
-                # Vérifie que le client existe
-                client_id = item.get('client').id if item.get('client') else None
-                if not client_id:
-                    raise ValueError('Client est requis pour créer un programme')
-
-                # Crée le programme
-                sessions_data = item.pop('sessions', [])  # Extrait les sessions si présentes
-                programme = Programme.objects.create(**item)
-
-                # Associe les sessions si spécifiées
-                if sessions_data:
-                    programme.sessions.set(sessions_data)
-
-                programmes.append(programme)
-
-            except Exception as e:
-                errors.append({
-                    "index": index,
-                    "error": str(e)
-                })
-
-        response_data = {
-            "success": self.get_serializer(programmes, many=True).data
-        }
-        if errors:
-            response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-
-        return Response(response_data, status=status.HTTP_201_CREATED)
+    def validate_bulk_item(self, item, relations):
+        # Vérifie que le client existe
+        if not item.get('client'):
+            raise ValueError('Client est requis pour créer un programme')
 
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
-        """Retourne des statistiques sur le programme"""
+        """Retourne des statistiques sur le programme, lues dans ses compteurs"""
         programme = self.get_object()
+        programme_counters = counters.get_programme_counters(programme)
         stats = {
-            'total_sessions': programme.sessions.count(),
-            'total_sequences': sum(session.sequences.count() 
-                                 for session in programme.sessions.all()),
-            'sessions_by_status': programme.sessions.values('status')
-                .annotate(count=Count('id')),
-            'participants_count': sum(len(session.participants.split(',')) 
-                                   for session in programme.sessions.all() 
-                                   if session.participants)
+            'total_sessions': programme_counters.sessions,
+            'total_sequences': programme_counters.sequences,
+            'total_breakouts': programme_counters.breakouts,
+            'sessions_by_status': counters.sessions_by_status(programme_counters),
+            'participants_count': programme_counters.participants,
         }
         return Response(stats)
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ConditionalGetMixin, SparseFieldsMixin, BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin,
+                    viewsets.ModelViewSet):
     queryset = Client.objects.all()
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.SearchFilter, FullTextSearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'context', 'objectives']
     ordering_fields = ['name', 'created_at']
 
@@ -90,79 +61,65 @@ class ClientViewSet(viewsets.ModelViewSet):
             return ClientLightSerializer
         return ClientSerializer
 
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        # Utiliser le sérialiseur complet pour la création
-        serializer = ClientSerializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-
-        clients = []
-        errors = []
-
-        for index, item in enumerate(serializer.validated_data):
-            try:
-                # Gérer les relations
-                sponsors_data = item.pop('sponsors', [])
-                programmes_data = item.pop('programmes', [])
-                sessions_data = item.pop('sessions', [])
-
-                # Créer le client
-                client = Client.objects.create(**item)
-
-                # Associer les relations si présentes
-                if sponsors_data:
-                    client.sponsors.set(sponsors_data)
-                if programmes_data:
-                    client.programmes.set(programmes_data)
-                if sessions_data:
-                    client.sessions.set(sessions_data)
-
-                clients.append(client)
-
-            except Exception as e:
-                errors.append({
-                    "index": index,
-                    "error": str(e),
-                })
-
-        response_data = {
-            "success": ClientSerializer(clients, many=True).data
-        }
-        if errors:
-            response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-
-        return Response(response_data, status=status.HTTP_201_CREATED)
-
     @action(detail=True, methods=['get'])
     def dashboard(self, request, pk=None):
-        """Retourne un tableau de bord pour le client"""
-        client = self.get_object()
-        
-        # Statistiques générales
-        total_sessions = client.sessions.count()
-        total_programmes = client.programmes.count()
-        total_sponsors = client.sponsors.count()
+        """
+        Retourne un tableau de bord pour le client, depuis le cache tant qu'aucune écriture
+        ne l'a périmé. L'en-tête X-Cache indique HIT, STALE ou MISS.
+
+        La version du tableau de bord est lue en une requête avant le cache : un client qui
+        a déjà la version courante reçoit un 304. Elle est lue dans le queryset du ViewSet :
+        un client supprimé n'a pas de version et le cache n'est pas consulté.
+        """
+        try:
+            version = versions.get_dashboard_version(int(pk), self.get_queryset())
+        except (TypeError, ValueError):
+            version = None
+        if version is None:
+            # Client inconnu ou hors du queryset : get_object répond 404
+            self.get_object()
+
+        def build():
+            # Le client n'est chargé que si le tableau de bord doit être recalculé
+            dashboard_data, state = dashboard_cache.get_dashboard(
+                int(pk), lambda: self.build_dashboard(self.get_object())
+            )
+            response = Response(dashboard_data)
+            response['X-Cache'] = state.upper()
+            return response
+
+        return conditional_response(request, version, build)
+
+    def build_dashboard(self, client):
+        # Statistiques générales, lues dans les compteurs du client
+        client_counters = counters.get_client_counters(client)
         
         # Sessions récentes
         recent_sessions = client.sessions.order_by('-created_at')[:5]
         
         # Programmes actifs
-        active_programmes = client.programmes.annotate(
-            session_count=Count('sessions')
-        ).filter(session_count__gt=0)
+        active_programmes = client.programmes.filter(
+            Exists(Session.objects.filter(programme=OuterRef('pk')))
+        )
         
-        dashboard_data = {
+        return {
             'statistics': {
-                'total_sessions': total_sessions,
-                'total_programmes': total_programmes,
-                'total_sponsors': total_sponsors,
+                'total_sessions': client_counters.sessions,
+                'total_programmes': client_counters.programmes,
+                'total_sponsors': client_counters.sponsors,
+                'total_sequences': client_counters.sequences,
+                'total_breakouts': client_counters.breakouts,
+                'participants_count': client_counters.participants,
+                'sessions_by_status': counters.sessions_by_status(client_counters),
             },
             'recent_sessions': SessionSerializer(recent_sessions, many=True).data,
             'active_programmes': ProgrammeSerializer(active_programmes, many=True).data
         }
-        
-        return Response(dashboard_data)
+
+    @action(detail=False, methods=['get'])
+    def dashboard_stats(self, request):
+        """Compteurs de succès et d'échecs du cache des tableaux de bord"""
+        return Response(dashboard_cache.get_stats())
 
     @action(detail=True, methods=['post'])
     def analyze_with_ai(self, request, pk=None):
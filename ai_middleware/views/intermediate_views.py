@@ -1,11 +1,19 @@
+import uuid
 from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from ..models import Sponsor, Session
 from ..serializers import SponsorSerializer, SessionSerializer
-
-class SponsorViewSet(viewsets.ModelViewSet):
+from ..services import session_summary
+from ..filters import FullTextSearchFilter
+from .conditional import conditional_response
+from .mixins import (
+    BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin, ConditionalGetMixin, SparseFieldsMixin
+)
+
+class SponsorViewSet(ConditionalGetMixin, SparseFieldsMixin, BulkCreateMixin, BulkUpdateMixin,
+                     viewsets.ModelViewSet):
     queryset = Sponsor.objects.all()
     serializer_class = SponsorSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -20,45 +28,20 @@ class SponsorViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(client_id=client_id)
         return queryset
 
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-
-        sponsors = []
-        errors = []
-
-        for index, item in enumerate(serializer.validated_data):
-            try:
-                # Vérifie que le client existe
-                client_id = item.get('client').id if item.get('client') else None
-                if not client_id:
-                    raise ValueError('Client est requis pour créer un sponsor')
-
-                sponsor = Sponsor.objects.create(**item)
-                sponsors.append(sponsor)
-            except Exception as e:
-                errors.append({
-                    "index": index,
-                    "error": str(e)
-                })
-
-        response_data = {
-            "success": self.get_serializer(sponsors, many=True).data
-        }
-        if errors:
-            response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-
-        return Response(response_data, status=status.HTTP_201_CREATED)
-
-class SessionViewSet(viewsets.ModelViewSet):
+    def validate_bulk_item(self, item, relations):
+        # Vérifie que le client existe
+        if not item.get('client'):
+            raise ValueError('Client est requis pour créer un sponsor')
+
+class SessionViewSet(ConditionalGetMixin, SparseFieldsMixin, BulkCreateMixin, BulkUpdateMixin, CascadeStatusMixin,
+                     viewsets.ModelViewSet):
     queryset = Session.objects.all()
     serializer_class = SessionSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['client', 'programme']
     search_fields = ['title', 'context', 'objectives']
     ordering_fields = ['created_at', 'title']
+    bulk_m2m_fields = ('sponsors',)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -72,51 +55,18 @@ class SessionViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-    @action(detail=False, methods=['post'])
-    def bulk_create(self, request):
-        serializer = self.get_serializer(data=request.data, many=True)
-        serializer.is_valid(raise_exception=True)
-
-        sessions = []
-        errors = []
-
-        for index, item in enumerate(serializer.validated_data):
-            try:
-                # Vérification des relations requises
-                client_id = item.get('client').id if item.get('client') else None
-                if not client_id:
-                    raise ValueError('Client est requis pour créer une session')
-
-                # Crée la session
-                sponsors_data = item.pop('sponsors', [])
-                session = Session.objects.create(**item)
-
-                # Ajoute les sponsors si spécifiés
-                if sponsors_data:
-                    for sponsor in sponsors_data:
-                        # Vérifie que le sponsor appartient au même client
-                        if sponsor.client_id != session.client_id:
-                            raise ValueError(
-                                f'Le sponsor {sponsor.id} doit appartenir au même client que la session'
-                            )
-                    session.sponsors.set(sponsors_data)
-
-                sessions.append(session)
-
-            except Exception as e:
-                errors.append({
-                    "index": index,
-                    "error": str(e)
-                })
-
-        response_data = {
-            "success": self.get_serializer(sessions, many=True).data
-        }
-        if errors:
-            response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-
-        return Response(response_data, status=status.HTTP_201_CREATED)
+    def validate_bulk_item(self, item, relations):
+        # Vérification des relations requises
+        client = item.get('client')
+        if not client:
+            raise ValueError('Client est requis pour créer une session')
+
+        for sponsor in relations.get('sponsors', []):
+            # Vérifie que le sponsor appartient au même client
+            if sponsor.client_id != client.id:
+                raise ValueError(
+                    f'Le sponsor {sponsor.id} doit appartenir au même client que la session'
+                )
 
     @action(detail=True, methods=['post'])
     def add_sponsor(self, request, pk=None):
@@ -171,26 +121,58 @@ class SessionViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def export_summary(self, request, pk=None):
-        """Exporte un résumé de la session avec ses séquences"""
+        """
+        Exporte un résumé de la session avec ses séquences et leurs breakouts, en un nombre
+        fixe de requêtes. Le paramètre `fields` choisit les champs de chaque niveau.
+        """
         session = self.get_object()
-        summary = {
-            'title': session.title,
-            'context': session.context,
-            'objectives': session.objectives,
-            'participants': session.participants,
-            'design_principles': session.design_principles,
-            'sequences': [
-                {
-                    'title': seq.title,
-                    'objective': seq.objective,
-                    'order': seq.order,
-                    'breakouts': [
-                        {
-                            'title': bo.title,
-                            'objective': bo.objective
-                        } for bo in seq.breakouts.all()
-                    ]
-                } for seq in session.sequences.all().order_by('order')
-            ]
-        }
-        return Response(summary)
\ No newline at end of file
+        return self.summary_response(request, [session.uuid], lambda summaries: summaries[0])
+
+    @action(detail=False, methods=['get'])
+    def summaries(self, request):
+        """
+        Résume plusieurs sessions, données par `uuids` (séparés par des virgules), en un appel.
+        Les requêtes ne dépendent pas du nombre de sessions.
+        """
+        values = [value.strip() for param in request.query_params.getlist('uuids')
+                  for value in param.split(',') if value.strip()]
+        if not values:
+            return Response(
+                {'error': 'Le paramètre uuids est requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(values) > session_summary.MAX_SESSIONS:
+            return Response(
+                {'error': f'{session_summary.MAX_SESSIONS} sessions au plus par appel'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            uuids = list(dict.fromkeys(uuid.UUID(value) for value in values))
+        except ValueError:
+            return Response({'error': 'UUID invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def shape(summaries):
+            found = {summary['uuid'] for summary in summaries}
+            return {
+                'results': summaries,
+                'missing': [obj_uuid for obj_uuid in uuids if obj_uuid not in found],
+            }
+        return self.summary_response(request, uuids, shape)
+
+    def summary_response(self, request, uuids, shape):
+        """
+        Construit la réponse des résumés, ou une réponse 304 si le client en a déjà la version
+        actuelle : les validateurs sont calculés avant les résumés, en une seule requête.
+        """
+        try:
+            fields = session_summary.parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Les sessions hors du queryset du ViewSet, comme les sessions supprimées, sont absentes
+        sessions = self.get_queryset()
+        return conditional_response(
+            request,
+            session_summary.get_version(sessions, uuids, fields),
+            lambda: Response(shape(session_summary.get_summaries(sessions, uuids, fields))),
+        )
@@ -1,22 +1,59 @@
-from rest_framework import views, status
+import json
+from rest_framework import views, status, renderers
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from ..services.markdown_service import to_markdown, from_markdown
-from ..models import Client, Programme, Session, Sequence, BreakOut
+from django.urls import reverse
+from ..services.markdown_service import to_markdown, iter_markdown, get_export_sections
+from ..services.markdown_import import MarkdownImporter, import_markdown, iter_text_lines
+from ..services import uuid_registry, versions
+from ..services.import_jobs import start_import_job
+from ..services.markdown_format import EXPORT_FIELDS
+from ..models import Client, Programme, Session, Sequence, BreakOut, ImportJob
+from ..serializers import ImportJobSerializer
+from .conditional import conditional_response
+
+class MarkdownRenderer(renderers.BaseRenderer):
+    media_type = 'text/markdown'
+    format = 'md'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return data.get('markdown') or data.get('error', '')
+        return data
+
 
 class MarkdownExportView(views.APIView):
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, MarkdownRenderer]
+
+    def wants_stream(self, request):
+        """Le streaming est demandé par ?stream=1 ou par un en-tête Accept: text/markdown"""
+        if request.query_params.get('stream') in ('1', 'true', 'yes'):
+            return True
+        return isinstance(getattr(request, 'accepted_renderer', None), MarkdownRenderer)
+
+    def export(self, request, obj):
+        if self.wants_stream(request):
+            # Les lignes sont envoyées au fil du parcours de l'arbre
+            return StreamingHttpResponse(
+                iter_markdown(obj),
+                content_type='text/markdown; charset=utf-8'
+            )
+        return Response({'markdown': to_markdown(obj)})
+
     def get(self, request, uuid=None, model_type=None, pk=None):
         try:
             if uuid:
-                # Recherche par UUID
-                for model in [Client, Programme, Session, Sequence, BreakOut]:
-                    try:
-                        obj = get_object_or_404(model, uuid=uuid)
-                        markdown = to_markdown(obj)
-                        return Response({'markdown': markdown})
-                    except model.DoesNotExist:
-                        continue
-                return Response({'error': 'Object not found'}, status=status.HTTP_404_NOT_FOUND)
+                # Recherche par UUID, quel que soit le modèle, via le registre des UUID
+                entry = uuid_registry.resolve(uuid)
+                if entry is None or entry[0] not in EXPORT_FIELDS:
+                    return Response({'error': 'Object not found'}, status=status.HTTP_404_NOT_FOUND)
+                model, pk = entry
+
+                def load():
+                    return uuid_registry.get_object(uuid)
                 
             elif model_type and pk:
                 # Recherche par type de modèle et ID
@@ -30,34 +67,76 @@ class MarkdownExportView(views.APIView):
                 model = models.get(model_type.lower())
                 if not model:
                     return Response({'error': 'Invalid model type'}, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Essayer de trouver l'objet par ID ou UUID
-                obj = get_object_or_404(model, pk=pk)
-                markdown = to_markdown(obj)
-                return Response({'markdown': markdown})
-            
-            return Response({'error': 'UUID or model_type and pk are required'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
+
+                def load():
+                    return model.objects.filter(pk=pk).first()
+
+            else:
+                return Response({'error': 'UUID or model_type and pk are required'}, 
+                               status=status.HTTP_400_BAD_REQUEST)
+
+            # Version des sections rendues par l'export : l'objet et ses ancêtres, chacun avec son
+            # sous-arbre, lue avant tout rendu
+            try:
+                sections = get_export_sections(model(pk=pk))
+            except model.DoesNotExist:
+                return Response({'error': 'Object not found'}, status=status.HTTP_404_NOT_FOUND)
+            version = versions.get_sections_version(sections)
+            if version is None:
+                return Response({'error': 'Object not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            def build():
+                obj = load()
+                if obj is None:
+                    return Response({'error': 'Object not found'}, status=status.HTTP_404_NOT_FOUND)
+                return self.export(request, obj)
+
+            return conditional_response(request, version, build)
             
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class MarkdownImportView(views.APIView):
+    # Corps importés en streaming plutôt que via le champ JSON 'markdown'
+    STREAM_CONTENT_TYPES = (
+        'text/markdown', 'text/plain', 'application/gzip', 'application/x-gzip',
+        'application/octet-stream', 'multipart/form-data',
+    )
+
+    def is_stream(self, request):
+        return request.content_type.startswith(self.STREAM_CONTENT_TYPES)
+
+    def get_flag(self, request, name):
+        """Option booléenne passée dans la query string ou dans le corps JSON"""
+        value = request.query_params.get(name)
+        if value is None and not self.is_stream(request):
+            value = request.data.get(name)
+        return value is True or str(value).lower() in ('1', 'true', 'yes')
+
     def post(self, request):
+        if self.get_flag(request, 'async'):
+            return self.post_async(request)
+        if self.is_stream(request):
+            return self.post_stream(request)
+
         try:
             markdown = request.data.get('markdown')
             if not markdown:
                 return Response({'error': 'Markdown content is required'}, 
                                status=status.HTTP_400_BAD_REQUEST)
             
-            # Créer ou mettre à jour les objets
-            result = {'created': [], 'updated': []}
-            for obj in from_markdown(markdown):
-                model_name = obj.__class__.__name__
-                if obj.created_at == obj.updated_at:
-                    result['created'].append(f"{model_name} ({obj.uuid})")
-                else:
-                    result['updated'].append(f"{model_name} ({obj.uuid})")
+            # Sans dry_run, créer ou mettre à jour les objets dont le contenu a changé
+            dry_run = self.get_flag(request, 'dry_run')
+            result = import_markdown(
+                markdown, dry_run=dry_run, prune=self.get_flag(request, 'prune')
+            )
+            if dry_run:
+                return Response({
+                    'success': True,
+                    'dry_run': True,
+                    'changes': result.changeset(),
+                })
+            result = result.details()
             
             return Response({
                 'success': True,
@@ -70,4 +149,70 @@ class MarkdownImportView(views.APIView):
             return Response({
                 'error': str(e),
                 'trace': traceback.format_exc()
-            }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    def get_upload(self, request):
+        """Fichier multipart ou corps brut de la requête"""
+        if request.content_type.startswith('multipart/form-data'):
+            return request.FILES.get('file') or next(iter(request.FILES.values()), None)
+        return request.stream
+
+    def post_async(self, request):
+        """
+        Enregistre un ImportJob et l'exécute en arrière-plan, sans bloquer le worker.
+        La progression se consulte sur l'URL renvoyée dans l'en-tête Location.
+        """
+        if self.is_stream(request):
+            upload = self.get_upload(request)
+            lines = iter_text_lines(upload) if upload is not None else None
+        else:
+            markdown = request.data.get('markdown')
+            lines = markdown.strip().split('\n') if markdown else None
+        if lines is None:
+            return Response({'error': 'Markdown content is required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        job = start_import_job(
+            lines, dry_run=self.get_flag(request, 'dry_run'), prune=self.get_flag(request, 'prune')
+        )
+        location = reverse('markdown-import-job', kwargs={'uuid': job.uuid})
+        return Response(
+            {'success': True, 'job_id': str(job.uuid), 'status': job.status, 'total': job.total},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': location}
+        )
+
+    def post_stream(self, request):
+        """
+        Importe un document envoyé tel quel (éventuellement compressé en gzip) ou comme fichier
+        multipart. Le document est lu ligne par ligne et écrit par lots ; la réponse est un flux
+        NDJSON avec une ligne de progression par lot, puis le résumé final.
+        """
+        upload = self.get_upload(request)
+        if upload is None:
+            return Response({'error': 'Markdown content is required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        importer = MarkdownImporter()
+
+        def progress():
+            try:
+                for report in importer.run_stream(iter_text_lines(upload)):
+                    if report.get('done'):
+                        report = {
+                            'success': True,
+                            'message': f"Processed {report['created'] + report['updated']} objects",
+                            **report
+                        }
+                    yield json.dumps(report) + '\n'
+            except Exception as e:
+                yield json.dumps({'success': False, 'error': str(e)}) + '\n'
+
+        return StreamingHttpResponse(progress(), content_type='application/x-ndjson')
+
+
+class ImportJobView(views.APIView):
+    def get(self, request, uuid):
+        """Progression d'un import asynchrone : lignes traitées, erreurs et résultat final"""
+        job = get_object_or_404(ImportJob, uuid=uuid)
+        return Response(ImportJobSerializer(job).data)
@@ -0,0 +1,238 @@
+from functools import partial
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, models
+from django.db.models import prefetch_related_objects
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField
+from rest_framework.response import Response
+from ..services import bulk_write, search, versions
+from .conditional import conditional_response, is_conditional
+from ..filters import FullTextSearchFilter
+
+
+class BulkCreateMixin:
+    """
+    Action `bulk_create` commune aux ViewSets : les éléments valides sont insérés en lot,
+    les autres sont signalés par leur index avec une réponse 207.
+    """
+    # Champs many-to-many renseignés par insertion directe des lignes de liaison
+    bulk_m2m_fields = ()
+
+    def validate_bulk_item(self, item, relations):
+        """Contrôles propres au modèle ; lever ValueError écarte l'élément"""
+
+    def prepare_bulk_items(self, items):
+        """Complète les éléments avant insertion, par exemple avec des valeurs par défaut calculées"""
+        return items
+
+    @action(detail=False, methods=['post'])
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.get_queryset().model
+        objs, errors = bulk_write.bulk_create(
+            model,
+            self.prepare_bulk_items(serializer.validated_data),
+            m2m_fields=self.bulk_m2m_fields,
+            validate=self.validate_bulk_item,
+        )
+        if self.bulk_m2m_fields:
+            prefetch_related_objects(objs, *self.bulk_m2m_fields)
+
+        response_data = {
+            "success": self.get_serializer(objs, many=True).data
+        }
+        if errors:
+            response_data["errors"] = errors
+            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
+
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+
+class BulkUpdateMixin:
+    """
+    Action `bulk_update` : la même modification partielle, validée par le sérialiseur, est
+    appliquée en un UPDATE à tous les objets retenus par les filtres de la liste et par `ids`.
+
+    Corps : {"ids": [1, 2], "values": {"status": "archived"}} ; `ids` est facultatif si des
+    paramètres de filtre sont passés dans l'URL. Seuls les paramètres reconnus par les filtres
+    de la liste sont acceptés : une faute de frappe ne doit pas élargir la modification.
+    """
+    # Champs qui ne peuvent pas prendre la même valeur sur plusieurs objets
+    bulk_update_excluded_fields = ()
+
+    def get_bulk_filter_params(self):
+        """
+        Returns:
+            set: Paramètres d'URL qui restreignent la liste : champs du filterset et recherches
+        """
+        params, queryset = set(), self.get_queryset()
+        for backend in self.filter_backends:
+            if issubclass(backend, DjangoFilterBackend):
+                filterset = backend().get_filterset(self.request, queryset, self)
+                if filterset is not None:
+                    params |= set(filterset.filters)
+            elif issubclass(backend, filters.SearchFilter) and getattr(self, 'search_fields', None):
+                params.add(backend.search_param)
+            elif issubclass(backend, FullTextSearchFilter) and queryset.model in search.SEARCH_FIELDS:
+                params.add(backend.search_param)
+        return params
+
+    @action(detail=False, methods=['patch'])
+    def bulk_update(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        values, ids = data.get('values'), data.get('ids')
+        if not isinstance(values, dict) or not values:
+            return Response({'error': 'values doit être un objet non vide'}, status=status.HTTP_400_BAD_REQUEST)
+        if ids is not None and (not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids)):
+            return Response({'error': 'ids doit être une liste d\'identifiants'}, status=status.HTTP_400_BAD_REQUEST)
+        unknown = set(request.query_params) - self.get_bulk_filter_params()
+        if unknown:
+            return Response({'error': f"Paramètres de filtre inconnus : {', '.join(sorted(unknown))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Un paramètre vide, ou une recherche sans mot (la virgule les sépare), ne filtre rien
+        if ids is None and not any(value.replace(',', ' ').strip() for value in request.query_params.values()):
+            # Sans filtre, la modification s'appliquerait à toute la table
+            return Response({'error': 'Filtre requis : ids ou paramètres de la liste'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=values, partial=True)
+        serializer.is_valid(raise_exception=True)
+        writable = {name for name, field in serializer.fields.items()
+                    if not field.read_only and not isinstance(field, ManyRelatedField)}
+        refused = (set(values) - writable) | (set(values) & set(self.bulk_update_excluded_fields))
+        if refused:
+            return Response({'error': f"Champs non modifiables en lot : {', '.join(sorted(refused))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        try:
+            updated = bulk_write.bulk_update(queryset, serializer.validated_data)
+        except IntegrityError:
+            # Par exemple deux séquences déplacées vers une session où leur ordre est déjà pris
+            return Response({'error': 'La modification viole une contrainte d\'unicité'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'updated': {queryset.model.__name__: updated}})
+
+
+class CascadeStatusMixin:
+    """
+    Action `cascade_status` : archive ou supprime un objet et tout son sous-arbre, en un UPDATE
+    par niveau. Corps : {"status": "archived"} ; la réponse donne le nombre d'objets modifiés
+    par modèle.
+    """
+
+    @action(detail=True, methods=['post'])
+    def cascade_status(self, request, pk=None):
+        value = request.data.get('status') if isinstance(request.data, dict) else None
+        if value not in bulk_write.CASCADE_STATUSES:
+            return Response(
+                {'error': f"status doit valoir {' ou '.join(bulk_write.CASCADE_STATUSES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        updated = bulk_write.cascade_status(self.get_object(), value)
+        return Response({'status': value, 'updated': updated})
+
+
+
+class SparseFieldsMixin:
+    """
+    Paramètre `fields` des listes et du détail : seuls les champs demandés, séparés par des
+    virgules, sont sérialisés et lus en base avec `.only()`. Sans ce paramètre, les listes
+    omettent les longs champs texte, qui ne sont plus chargés.
+    """
+    sparse_fields_param = 'fields'
+    sparse_actions = ('list', 'retrieve')
+    # Champs toujours renvoyés, qui identifient l'objet
+    sparse_required_fields = ('id', 'uuid')
+
+    def get_sparse_fields(self):
+        """
+        Returns:
+            set: Champs à sérialiser, ou None pour tous
+        """
+        if getattr(self, 'action', None) not in self.sparse_actions:
+            return None
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+
+        available = self.get_serializer_class()().fields
+        value = self.request.query_params.get(self.sparse_fields_param)
+        if value:
+            requested = {name.strip() for name in value.split(',') if name.strip()}
+            unknown = requested - set(available)
+            if unknown:
+                raise ValidationError({self.sparse_fields_param: f"Champs inconnus : {', '.join(sorted(unknown))}"})
+        elif self.action == 'list':
+            model = self.get_serializer_class().Meta.model
+            large = {model_field.name for model_field in model._meta.concrete_fields
+                     if isinstance(model_field, models.TextField)}
+            requested = set(available) - large
+        else:
+            requested = None
+        if requested is not None:
+            requested |= set(self.sparse_required_fields) & set(available)
+        self._sparse_fields = requested
+        return requested
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        model = queryset.model
+        concrete = {model_field.name for model_field in model._meta.concrete_fields}
+        # created_at et la clé servent au curseur de pagination, updated_at aux validateurs HTTP
+        columns = (fields & concrete) | ({'created_at', 'updated_at'} & concrete)
+        queryset = queryset.only(*columns)
+        many_to_many = [model_field.name for model_field in model._meta.many_to_many if model_field.name in fields]
+        if many_to_many:
+            queryset = queryset.prefetch_related(*many_to_many)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        return serializer
+
+
+class ConditionalGetMixin:
+    """
+    Requêtes conditionnelles (If-None-Match, If-Modified-Since) sur les listes et le détail.
+    La version est lue par une requête d'agrégat sur les objets filtrés, avant toute
+    sérialisation : si elle n'a pas changé, la réponse est un 304 sans corps.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version = versions.get_queryset_version(self.filter_queryset(self.get_queryset()))
+        return conditional_response(request, version, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not is_conditional(request):
+            # Rien à comparer : la version se déduit de l'objet chargé, sans requête de plus
+            instance = self.get_object()
+            return conditional_response(
+                request, versions.get_object_version(instance),
+                lambda: Response(self.get_serializer(instance).data),
+            )
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            version = versions.get_queryset_version(queryset)
+        except (TypeError, ValueError, DjangoValidationError):
+            # Clé invalide : le détail répond 404 comme get_object
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(request, version, partial(super().retrieve, request, *args, **kwargs))
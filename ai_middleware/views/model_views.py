@@ -1,25 +1,22 @@
-from rest_framework import viewsets
-from rest_framework.response import Response
-from rest_framework import status
-from ..models import Client, Programme, Session, Sequence, BreakOut
-from ..serializers import ClientSerializer, ProgrammeSerializer, SessionSerializer, SequenceSerializer, BreakOutSerializer
+from ..models import Client, Programme, Sponsor, Session, Sequence, BreakOut
+from . import base_views, high_level_views, intermediate_views
 
-class ClientViewSet(viewsets.ModelViewSet):
+# ViewSets exposés par le routeur : ceux des modules métier, sans les objets supprimés
+
+class ClientViewSet(high_level_views.ClientViewSet):
     queryset = Client.objects.exclude(status='deleted')
-    serializer_class = ClientSerializer
 
-class ProgrammeViewSet(viewsets.ModelViewSet):
+class ProgrammeViewSet(high_level_views.ProgrammeViewSet):
     queryset = Programme.objects.exclude(status='deleted')
-    serializer_class = ProgrammeSerializer
 
-class SessionViewSet(viewsets.ModelViewSet):
+class SponsorViewSet(intermediate_views.SponsorViewSet):
+    queryset = Sponsor.objects.exclude(status='deleted')
+
+class SessionViewSet(intermediate_views.SessionViewSet):
     queryset = Session.objects.exclude(status='deleted')
-    serializer_class = SessionSerializer
 
-class SequenceViewSet(viewsets.ModelViewSet):
+class SequenceViewSet(base_views.SequenceViewSet):
     queryset = Sequence.objects.exclude(status='deleted')
-    serializer_class = SequenceSerializer
 
-class BreakOutViewSet(viewsets.ModelViewSet):
+class BreakOutViewSet(base_views.BreakOutViewSet):
     queryset = BreakOut.objects.exclude(status='deleted')
-    serializer_class = BreakOutSerializer
\ No newline at end of file
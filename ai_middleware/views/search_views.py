@@ -0,0 +1,46 @@
+from rest_framework import views, status
+from rest_framework.response import Response
+from ..services import search
+
+# Nombre de résultats par défaut et maximal d'une recherche
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class SearchView(views.APIView):
+    """
+    Recherche plein texte dans toute la hiérarchie : clients, programmes, sessions, séquences
+    et breakouts, mêlés et triés par pertinence. Chaque résultat donne l'UUID de l'entité,
+    utilisable tel quel par l'export Markdown.
+
+    Paramètres : `q` (obligatoire), `types` (par exemple `session,sequence`), `limit`.
+    """
+    types = {name.lower(): model for name, model in search.INDEXED_MODELS.items()}
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not search.get_terms(query):
+            return Response({'error': 'Parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        names = [name.strip().lower() for name in request.query_params.get('types', '').split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.types]
+        if unknown:
+            return Response({'error': f"Unknown types: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'Parameter limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        hits = search.search(query, models=[self.types[name] for name in names], limit=limit)
+        return Response({
+            'query': query,
+            'results': [{
+                'type': hit.model.lower(),
+                'uuid': hit.uuid,
+                'id': hit.object_id,
+                'title': hit.title,
+                'score': hit.score,
+            } for hit in hits],
+        })
@@ -0,0 +1,43 @@
+from django.http import StreamingHttpResponse
+from rest_framework import views, status
+from rest_framework.response import Response
+from ..models import Client
+from ..services import client_tree, uuid_registry, versions
+from .conditional import conditional_response
+
+
+class ClientTreeView(views.APIView):
+    """
+    Arbre complet d'un client (programmes, sessions, séquences, breakouts) en un appel,
+    lu en une requête par niveau.
+
+    Paramètres : `depth` (0 à 4, tous les niveaux par défaut), `status` (par exemple
+    `normal,archived` ; tous sauf `deleted` par défaut) et `stream=1` pour recevoir le JSON
+    par morceaux. L'arbre est lu en entier dans les deux cas : seul l'encodage est découpé,
+    sans produire le texte JSON complet.
+    """
+
+    def get(self, request, uuid):
+        try:
+            depth = client_tree.parse_depth(request.query_params.get('depth'))
+            statuses = client_tree.parse_statuses(request.query_params.get('status'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        entry = uuid_registry.resolve(uuid)
+        version = None
+        if entry is not None and entry[0] is Client:
+            version = versions.get_tree_version(Client, entry[1], versions.CLIENT_TREE_DESCENDANTS)
+        if version is None:
+            return Response({'error': 'Client not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        def build():
+            client = Client.objects.filter(pk=entry[1], uuid=uuid).first()
+            if client is None or client.status not in statuses:
+                return Response({'error': 'Client not found'}, status=status.HTTP_404_NOT_FOUND)
+            tree = client_tree.get_tree(client, depth, statuses)
+            if request.query_params.get('stream') in ('1', 'true', 'yes'):
+                return StreamingHttpResponse(client_tree.iter_json(tree), content_type='application/json')
+            return Response(tree)
+
+        return conditional_response(request, version, build)
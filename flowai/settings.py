@@ -123,9 +123,44 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
+        # Paramètre `q` : recherche plein texte classée par pertinence
+        'ai_middleware.filters.FullTextSearchFilter',
     ],
+    # Listes paginées par curseur sur (created_at, id) : chaque page a le même coût
+    'DEFAULT_PAGINATION_CLASS': 'ai_middleware.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Durée de conservation des rendus Markdown en cache (secondes)
+MARKDOWN_CACHE_TIMEOUT = int(os.getenv('MARKDOWN_CACHE_TIMEOUT', 60 * 60))
+
+# Nombre de lignes écrites par requête lors d'un import Markdown
+MARKDOWN_IMPORT_BATCH_SIZE = int(os.getenv('MARKDOWN_IMPORT_BATCH_SIZE', 500))
+
+# Nombre de threads du worker qui exécutent les imports Markdown asynchrones
+MARKDOWN_IMPORT_WORKERS = int(os.getenv('MARKDOWN_IMPORT_WORKERS', 2))
+
+# Délai sans progression (secondes) après lequel un import asynchrone est considéré comme interrompu
+MARKDOWN_IMPORT_STALE_AFTER = int(os.getenv('MARKDOWN_IMPORT_STALE_AFTER', 15 * 60))
+
+# Nombre de lignes insérées par requête par les actions bulk_create des ViewSets
+BULK_CREATE_BATCH_SIZE = int(os.getenv('BULK_CREATE_BATCH_SIZE', 500))
+
+# Nombre d'UUID résolus gardés en mémoire par processus
+UUID_REGISTRY_CACHE_SIZE = int(os.getenv('UUID_REGISTRY_CACHE_SIZE', 10000))
+
+# Durée de conservation des tableaux de bord clients en cache (secondes)
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 5 * 60))
+
+# Sert le tableau de bord périmé pendant son recalcul en arrière-plan
+DASHBOARD_STALE_WHILE_REVALIDATE = os.getenv('DASHBOARD_STALE_WHILE_REVALIDATE', 'False') == 'True'
+
+# Nombre maximal de résultats d'une recherche plein texte `?q=` sur une liste
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 1000))
+
+# Nombre maximal d'opérations dans un appel à /api/batch/
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', 100))
+
 # Social Auth settings
 SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = os.getenv('GOOGLE_OAUTH2_CLIENT_ID')
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = os.getenv('GOOGLE_OAUTH2_CLIENT_SECRET')
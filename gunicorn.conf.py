@@ -19,4 +19,16 @@ user = None
 group = None
 tmp_upload_dir = None
 keyfile = None
-certfile = None
\ No newline at end of file
+certfile = None
+
+
+def when_ready(server):
+    # Les imports Markdown interrompus par l'arrêt précédent ne reprendront pas : aucun worker
+    # n'a encore démarré, tous les jobs en attente ou en cours sont orphelins
+    import django
+    django.setup()
+    from django.db import connection
+    from ai_middleware.services.import_jobs import fail_interrupted_jobs
+    fail_interrupted_jobs()
+    # Les workers ne doivent pas hériter de la connexion du processus maître
+    connection.close()